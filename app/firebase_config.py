@@ -2,72 +2,134 @@
 Configuración de Firebase Admin SDK
 """
 import os
-import json
+import threading
+from functools import lru_cache
+import orjson
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import credentials, firestore, firestore_async, auth
 from dotenv import load_dotenv
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Logger del módulo (la configuración de handlers/nivel se hace en app.main)
 logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Leer una sola vez las variables de entorno usadas en la inicialización
+_ENV_JSON = os.getenv('FIREBASE_SERVICE_ACCOUNT_JSON')
+_ENV_CREDS_PATH = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+_ENV_GCP = os.getenv('GOOGLE_CLOUD_PROJECT') or os.getenv('K_SERVICE')
+
+# Cache del JSON de la cuenta de servicio ya parseado (evita volver a parsearlo
+# en reintentos de inicialización, recargas o tests)
+_cred_cache = None
+_cred_lock = threading.Lock()
+
+
+# Rutas candidatas de archivos de credenciales (se calculan una sola vez)
+_CANDIDATE_PATHS = tuple(os.fspath(p) for p in (
+    'dagma-85aad-firebase-adminsdk-fbsvc-1e7612eab5.json',
+    'env/dagma-85aad-b7afe1c0f77f.json',
+    '/app/firebase-credentials.json',  # Path común en Railway
+    '/etc/secrets/firebase-credentials.json'  # Path común en Kubernetes
+))
+# Pares (directorio, nombre de archivo) precalculados para _find_existing_paths
+_CANDIDATE_DIRS = tuple(
+    (os.path.dirname(p) or '.', os.path.basename(p)) for p in _CANDIDATE_PATHS
+)
+
+
+def _find_existing_paths(paths=_CANDIDATE_PATHS, split_paths=_CANDIDATE_DIRS):
+    """
+    Retorna, en el orden original, las rutas de `paths` que existen.
+    Hace un solo os.scandir por directorio en lugar de un stat por ruta.
+    `split_paths` contiene los pares (directorio, nombre) de cada ruta.
+    """
+    entries_by_dir = {}
+    existing = []
+    for path, (dirname, basename) in zip(paths, split_paths):
+        if dirname not in entries_by_dir:
+            try:
+                with os.scandir(dirname) as it:
+                    entries_by_dir[dirname] = {entry.name for entry in it}
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                entries_by_dir[dirname] = set()
+        if basename in entries_by_dir[dirname]:
+            existing.append(path)
+    return existing
+
+
 def initialize_firebase():
     """
     Inicializa Firebase Admin SDK con manejo robusto de errores
     Intenta múltiples métodos de autenticación en orden de prioridad
     """
+    global _cred_cache
+
+    # Si Firebase ya está inicializado no hay nada que hacer
+    if firebase_admin._apps:
+        return True
+
     try:
+        SERVICE_ACCOUNT_JSON = _ENV_JSON
+
+        # Método 0: Application Default Credentials en infraestructura de Google
+        # (Cloud Run, GKE, etc.) - usa tokens del metadata server sin parsear llaves
+        if _ENV_GCP and not SERVICE_ACCOUNT_JSON:
+            logger.info("🔥 Intentando inicializar Firebase con Application Default Credentials")
+            try:
+                cred = credentials.ApplicationDefault()
+                # ApplicationDefault resuelve las credenciales de forma diferida:
+                # se fuerza la obtención de un token para detectar ADC inexistentes aquí
+                # y no en la primera llamada a Firestore
+                cred.get_access_token()
+                firebase_admin.initialize_app(cred)
+                logger.info("✅ Firebase inicializado exitosamente con Application Default Credentials")
+                return True
+            except Exception as e:
+                logger.warning("⚠️ No se pudo usar Application Default Credentials: %s", e)
+
         # Método 1: Usar JSON desde variable de entorno (Railway, Heroku)
-        SERVICE_ACCOUNT_JSON = os.getenv('FIREBASE_SERVICE_ACCOUNT_JSON')
-        
         if SERVICE_ACCOUNT_JSON:
             logger.info("🔥 Intentando inicializar Firebase con FIREBASE_SERVICE_ACCOUNT_JSON")
             try:
-                service_account_info = json.loads(SERVICE_ACCOUNT_JSON)
+                with _cred_lock:
+                    if _cred_cache is None:
+                        _cred_cache = orjson.loads(SERVICE_ACCOUNT_JSON)
+                    service_account_info = _cred_cache
                 cred = credentials.Certificate(service_account_info)
                 firebase_admin.initialize_app(cred)
                 logger.info("✅ Firebase inicializado exitosamente con SERVICE_ACCOUNT_JSON")
                 return True
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Error parseando FIREBASE_SERVICE_ACCOUNT_JSON: {e}")
+            except orjson.JSONDecodeError as e:
+                logger.error("❌ Error parseando FIREBASE_SERVICE_ACCOUNT_JSON: %s", e)
                 logger.info("💡 Verifica que la variable contenga JSON válido")
                 raise ValueError(f"FIREBASE_SERVICE_ACCOUNT_JSON no es un JSON válido: {e}")
             except Exception as e:
-                logger.error(f"❌ Error inicializando Firebase con SERVICE_ACCOUNT_JSON: {e}")
+                logger.error("❌ Error inicializando Firebase con SERVICE_ACCOUNT_JSON: %s", e)
                 raise
         
         # Método 2: Usar ruta de archivo (GOOGLE_APPLICATION_CREDENTIALS)
-        GOOGLE_CREDS_PATH = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+        GOOGLE_CREDS_PATH = _ENV_CREDS_PATH
         if GOOGLE_CREDS_PATH and os.path.exists(GOOGLE_CREDS_PATH):
-            logger.info(f"🔥 Intentando inicializar Firebase con archivo: {GOOGLE_CREDS_PATH}")
+            logger.info("🔥 Intentando inicializar Firebase con archivo: %s", GOOGLE_CREDS_PATH)
             cred = credentials.Certificate(GOOGLE_CREDS_PATH)
             firebase_admin.initialize_app(cred)
             logger.info("✅ Firebase inicializado exitosamente con GOOGLE_APPLICATION_CREDENTIALS")
             return True
         
         # Método 3: Buscar archivos JSON en directorios comunes
-        possible_paths = [
-            'dagma-85aad-firebase-adminsdk-fbsvc-1e7612eab5.json',
-            'env/dagma-85aad-b7afe1c0f77f.json',
-            '/app/firebase-credentials.json',  # Path común en Railway
-            '/etc/secrets/firebase-credentials.json'  # Path común en Kubernetes
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                logger.info(f"🔥 Intentando inicializar Firebase con archivo encontrado: {path}")
-                try:
-                    cred = credentials.Certificate(path)
-                    firebase_admin.initialize_app(cred)
-                    logger.info(f"✅ Firebase inicializado exitosamente con archivo: {path}")
-                    return True
-                except Exception as e:
-                    logger.warning(f"⚠️ No se pudo usar {path}: {e}")
-                    continue
+        for path in _find_existing_paths():
+            logger.info("🔥 Intentando inicializar Firebase con archivo encontrado: %s", path)
+            try:
+                cred = credentials.Certificate(path)
+                firebase_admin.initialize_app(cred)
+                logger.info("✅ Firebase inicializado exitosamente con archivo: %s", path)
+                return True
+            except Exception as e:
+                logger.warning("⚠️ No se pudo usar %s: %s", path, e)
+                continue
         
         # Si no se encuentra ninguna credencial
         error_msg = """
@@ -99,21 +161,48 @@ No se encontraron credenciales válidas. Verifica que exista una de estas opcion
             logger.info("⚠️ Firebase ya estaba inicializado")
             return True
         else:
-            logger.error(f"❌ Error fatal inicializando Firebase: {e}")
+            logger.error("❌ Error fatal inicializando Firebase: %s", e)
             raise
 
+@lru_cache(maxsize=1)
+def get_db():
+    """
+    Retorna el cliente de Firestore compartido, creándolo en el primer uso.
+    Pensado para inyectarse en los endpoints con Depends(get_db).
+    """
+    initialize_firebase()
+    return firestore.client()
+
+
+@lru_cache(maxsize=1)
+def get_async_db():
+    """
+    Retorna el cliente asíncrono de Firestore compartido (gRPC asyncio).
+    Permite leer documentos con `async for` sin bloquear el event loop.
+    """
+    initialize_firebase()
+    return firestore_async.client()
+
+
+def __getattr__(name):
+    # Compatibilidad: `from app.firebase_config import db` retorna el cliente compartido
+    if name == 'db':
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Inicializar Firebase
 try:
     initialize_firebase()
     
     # Obtener referencias a los servicios
-    db = firestore.client()
+    # (el cliente de Firestore se crea de forma diferida con get_db)
     auth_client = auth
     
     logger.info("✅ Firebase Admin SDK configurado correctamente")
     
 except Exception as e:
-    logger.error(f"❌ ERROR CRÍTICO: No se pudo inicializar Firebase: {e}")
+    logger.error("❌ ERROR CRÍTICO: No se pudo inicializar Firebase: %s", e)
     # En producción, queremos que la app falle rápido si Firebase no está disponible
     # En lugar de continuar con un servicio mal configurado
-    raise
\ No newline at end of file
+    raise
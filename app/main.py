@@ -2,28 +2,43 @@
 API Artefacto 360 DAGMA - Main Application
 Configuración basada en gestor_proyecto_api
 """
+import atexit
 import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 # Configurar logging de auditoría
+# Los handlers con I/O (archivo y consola) corren en un hilo de fondo (QueueListener);
+# los loggers solo encolan el registro y no bloquean el event loop
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.FileHandler('audit.log'),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('audit.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
 # Importar configuración de Firebase
-from app.firebase_config import db, auth_client
+from app.firebase_config import auth_client
 
 # Importar routers
 from app.routes import (
@@ -36,13 +51,31 @@ from app.routes import (
     seguimiento_routes
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicia al arrancar la app el worker que reintenta las escrituras de
+    reconocimientos que fallaron en Firebase, y lo detiene al cerrarla
+    """
+    retry_worker = artefacto_360_routes.start_firestore_retry_worker()
+    yield
+    retry_worker.cancel()
+    pendientes = artefacto_360_routes._firestore_retry_queue.qsize()
+    if pendientes:
+        logger.error("❌ %d escrituras de reconocimientos pendientes en la cola de reintentos al detener la app", pendientes)
+
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="API Artefacto 360 DAGMA",
     description="API para gestión de artefacto de captura 360 con Firebase/Firestore - Soporte completo UTF-8 🇪🇸",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # Serialización con orjson en todos los endpoints (más rápida que json estándar)
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configurar rate limiting
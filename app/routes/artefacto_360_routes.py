@@ -1,24 +1,40 @@
 """
 Rutas para gestión de Artefacto de Captura DAGMA
 """
-from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Query, Header, Response, Depends, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from fastapi.encoders import jsonable_encoder
+from typing import List, Optional, Tuple
 from datetime import datetime, timezone
 import json
+import re
 import uuid
+import hashlib
 import math
 import os
-import io
-from pydantic import BaseModel, Field
+import time
+import asyncio
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+import orjson
+from pydantic import BaseModel, ConfigDict, Field
 
 # Importar configuración de Firebase y S3/Storage
-from app.firebase_config import db
+from app.firebase_config import get_db, get_async_db
 from firebase_admin import firestore
 import boto3
-from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import BotoCoreError, ClientError
 
 # Importar librerías para intersecciones geográficas
 from shapely.geometry import Point, shape
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Artefacto de Captura DAGMA"])
 
@@ -105,20 +121,41 @@ def get_location_from_coordinates(coordinates: List) -> tuple:
 
 
 # ==================== FUNCIONES AUXILIARES ====================#
-def clean_nan_values(obj):
-    """
-    Limpia valores NaN, infinitos y otros valores no compatibles con JSON
-    """
-    if isinstance(obj, dict):
-        return {key: clean_nan_values(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_nan_values(item) for item in obj]
-    elif isinstance(obj, float):
-        if math.isnan(obj) or math.isinf(obj):
-            return None
-        return obj
-    else:
-        return obj
+def _orjson_default(obj):
+    """
+    Serializa con jsonable_encoder los tipos que orjson no soporta
+    (ej. GeoPoint de Firestore). orjson ya convierte NaN e infinitos en null.
+    """
+    return jsonable_encoder(obj)
+
+
+def _build_search_blob(direccion: str, descripcion_intervencion: str, tipo_intervencion: str) -> str:
+    """
+    Texto de búsqueda en minúsculas que se guarda en cada reporte (`_search_blob`)
+    """
+    return f"{direccion} {descripcion_intervencion} {tipo_intervencion}".lower()
+
+
+def _validate_points_range(points: list) -> None:
+    """
+    Valida en bloque (vectorizado con NumPy) que una lista de puntos [lon, lat]
+    tenga la forma correcta y esté dentro de los rangos válidos
+    """
+    try:
+        arr = np.asarray(points)
+    except ValueError:
+        # Listas irregulares (puntos con distinta cantidad de valores)
+        raise ValueError("Cada punto debe ser [lon, lat]")
+    if arr.ndim != 2 or arr.shape[1] != 2 or arr.dtype.kind not in 'biuf':
+        raise ValueError("Cada punto debe ser [lon, lat]")
+    
+    lon = arr[:, 0]
+    lat = arr[:, 1]
+    # Las comparaciones con NaN son falsas, así que NaN también cuenta como fuera de rango
+    bad = ~((lon >= -180) & (lon <= 180) & (lat >= -90) & (lat <= 90))
+    if bad.any():
+        bad_lon, bad_lat = points[int(np.argmax(bad))]
+        raise ValueError(f"Coordenadas fuera de rango: [{bad_lon}, {bad_lat}]")
 
 
 def validate_coordinates(coordinates: list, geometry_type: str) -> bool:
@@ -142,12 +179,7 @@ def validate_coordinates(coordinates: list, geometry_type: str) -> bool:
     elif geometry_type in ["LineString", "MultiPoint"]:
         if len(coordinates) < 2:
             raise ValueError(f"{geometry_type} debe tener al menos 2 puntos")
-        for point in coordinates:
-            if not isinstance(point, list) or len(point) != 2:
-                raise ValueError("Cada punto debe ser [lon, lat]")
-            lon, lat = point
-            if not (-180 <= lon <= 180) or not (-90 <= lat <= 90):
-                raise ValueError(f"Coordenadas fuera de rango: [{lon}, {lat}]")
+        _validate_points_range(coordinates)
     
     elif geometry_type == "Polygon":
         if len(coordinates) < 1:
@@ -155,31 +187,65 @@ def validate_coordinates(coordinates: list, geometry_type: str) -> bool:
         for ring in coordinates:
             if not isinstance(ring, list) or len(ring) < 4:
                 raise ValueError("Cada anillo del polígono debe tener al menos 4 puntos")
+            _validate_points_range(ring)
     
     return True
 
 
+# Tipos MIME y extensiones de fotos permitidos (el orden se conserva en los mensajes)
+_ALLOWED_MIME_ORDER = ("image/jpeg", "image/jpg", "image/png", "image/webp", "image/heic")
+_ALLOWED_MIME = frozenset(_ALLOWED_MIME_ORDER)
+_ALLOWED_MIME_STR = ", ".join(_ALLOWED_MIME_ORDER)
+_ALLOWED_EXT = frozenset({".jpg", ".jpeg", ".png", ".webp", ".heic"})
+
+# Tamaño máximo permitido por foto
+_MAX_PHOTO_BYTES = 25 * 1024 * 1024  # 25 MB
+
+# Caracteres no permitidos en el nombre de archivo dentro de la llave S3
+# (\w conserva letras con tilde y ñ, igual que str.isalnum)
+_FILENAME_RE = re.compile(r'[^\w.-]+')
+_MAX_FILENAME_LENGTH = 128
+
+
 def validate_photo_file(file: UploadFile) -> bool:
     """
     Valida que el archivo sea una imagen válida
     """
     # Validar tipo MIME
-    allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/webp", "image/heic"]
-    if file.content_type not in allowed_types:
-        raise ValueError(f"Tipo de archivo no permitido: {file.content_type}. Permitidos: {', '.join(allowed_types)}")
+    if file.content_type not in _ALLOWED_MIME:
+        raise ValueError(f"Tipo de archivo no permitido: {file.content_type}. Permitidos: {_ALLOWED_MIME_STR}")
     
     # Validar extensión
-    allowed_extensions = [".jpg", ".jpeg", ".png", ".webp", ".heic"]
     file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
+    if file_ext not in _ALLOWED_EXT:
         raise ValueError(f"Extensión no permitida: {file_ext}")
     
+    # Validar tamaño (Starlette conoce el tamaño del archivo recibido sin leerlo)
+    file_size = getattr(file, 'size', None)
+    if isinstance(file_size, int) and file_size > _MAX_PHOTO_BYTES:
+        raise ValueError(
+            f"Archivo demasiado grande: {file_size / (1024 * 1024):.1f} MB. "
+            f"Máximo permitido: {_MAX_PHOTO_BYTES // (1024 * 1024)} MB"
+        )
+    
     return True
 
 
+# Configuración del pool de conexiones de S3 (subidas de fotos en paralelo)
+# (el pool debe ser >= a las subidas concurrentes para que urllib3 no las serialice)
+_S3_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True
+)
+
+
+@lru_cache(maxsize=1)
 def get_s3_client():
     """
-    Crear cliente de S3 con las credenciales del entorno
+    Crear cliente de S3 con las credenciales del entorno.
+    El cliente se crea una sola vez y se reutiliza entre requests
+    (boto3 clients son thread-safe).
     """
     aws_access_key = os.getenv('AWS_ACCESS_KEY_ID')
     aws_secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
@@ -192,13 +258,129 @@ def get_s3_client():
         's3',
         aws_access_key_id=aws_access_key,
         aws_secret_access_key=aws_secret_key,
-        region_name=aws_region
+        region_name=aws_region,
+        config=_S3_CONFIG
     )
 
 
+# Precargar el cliente de S3 al iniciar (si hay credenciales configuradas)
+try:
+    get_s3_client()
+    print("✅ Cliente de S3 precargado")
+except ValueError:
+    print("⚠️ Credenciales de AWS no configuradas, el cliente de S3 se creará bajo demanda")
+
+
+# Subidas multipart para fotos grandes (> 8 MB): las partes se envían en paralelo
+# y se leen por bloques directamente desde el archivo temporal de la foto
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True
+)
+
+# Pool de hilos dedicado a las subidas a S3 (no compite con el pool por defecto)
+_S3_EXECUTOR = ThreadPoolExecutor(max_workers=10, thread_name_prefix="s3-upload")
+
+
+async def _upload_photo_to_s3(s3_client, bucket_name: str, photo: UploadFile, s3_key: str) -> str:
+    """
+    Sube una foto a S3 sin bloquear el event loop y retorna su URL pública
+    """
+    try:
+        # Subir directamente el archivo temporal de la foto (sin copiarlo a memoria)
+        await photo.seek(0)
+        
+        # Subir a S3 en el pool dedicado para poder paralelizar varias fotos
+        # Nota: No se usa ACL porque muchos buckets modernos tienen ACLs deshabilitadas
+        # La accesibilidad pública se configura mediante Bucket Policy en AWS Console
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            _S3_EXECUTOR,
+            partial(
+                s3_client.upload_fileobj,
+                photo.file,
+                bucket_name,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': photo.content_type
+                },
+                Config=_TRANSFER_CONFIG
+            )
+        )
+        
+        # Rebobinar el archivo para futuras lecturas si es necesario
+        await photo.seek(0)
+    except (ClientError, S3UploadFailedError, BotoCoreError) as e:
+        # upload_fileobj envuelve los errores de S3 en S3UploadFailedError;
+        # los errores de conexión llegan como BotoCoreError
+        print(f"❌ Error subiendo foto a S3: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error subiendo foto '{photo.filename}' a S3: {str(e)}"
+        )
+    
+    # Generar URL pública
+    return f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
+
+
+# Máximo de llaves que acepta delete_objects por petición
+_S3_DELETE_BATCH = 1000
+
+
+def _delete_s3_keys(s3_client, bucket_name: str, keys: List[str]) -> int:
+    """
+    Elimina una lista de llaves de S3 con delete_objects
+    (hasta 1000 llaves por petición) y retorna la cantidad eliminada
+    """
+    objects = [{'Key': key} for key in keys]
+    for start in range(0, len(objects), _S3_DELETE_BATCH):
+        s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': objects[start:start + _S3_DELETE_BATCH], 'Quiet': True}
+        )
+    return len(objects)
+
+
+def _delete_s3_prefix(s3_client, bucket_name: str, prefix: str) -> int:
+    """
+    Elimina todos los objetos de S3 bajo un prefijo usando delete_objects
+    (hasta 1000 llaves por petición) y retorna la cantidad eliminada
+    """
+    deleted = 0
+    list_kwargs = {'Bucket': bucket_name, 'Prefix': prefix}
+    
+    while True:
+        response = s3_client.list_objects_v2(**list_kwargs)
+        keys = [obj['Key'] for obj in response.get('Contents', [])]
+        deleted += _delete_s3_keys(s3_client, bucket_name, keys)
+        
+        if not response.get('IsTruncated'):
+            break
+        list_kwargs['ContinuationToken'] = response['NextContinuationToken']
+    
+    return deleted
+
+
+def _delete_document_tree(db, doc_ref) -> None:
+    """
+    Elimina un documento y los documentos de sus subcolecciones con un BulkWriter
+    (bloqueante: listar subcolecciones y cerrar el BulkWriter hacen RPCs)
+    """
+    bulk_writer = db.bulk_writer()
+    for subcollection in doc_ref.collections():
+        for sub_doc_ref in subcollection.list_documents():
+            bulk_writer.delete(sub_doc_ref)
+    bulk_writer.delete(doc_ref)
+    bulk_writer.close()
+
+
 # ==================== MODELOS ====================#
 class ReconocimientoResponse(BaseModel):
     """Modelo de respuesta para reconocimientos"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     success: bool
     id: Optional[str] = None
     message: str
@@ -209,7 +391,61 @@ class ReconocimientoResponse(BaseModel):
     timestamp: str
 
 
+class FotoPlanificada(BaseModel):
+    """Foto que el cliente subirá directamente a S3"""
+    filename: str = Field(..., min_length=1, description="Nombre del archivo")
+    content_type: str = Field(..., min_length=1, description="Tipo MIME (ej: image/jpeg)")
+    size: Optional[int] = Field(None, ge=0, description="Tamaño en bytes (opcional)")
+
+
+class ReconocimientoInitRequest(BaseModel):
+    """Solicitud de URLs prefirmadas para subir las fotos de un reconocimiento"""
+    photos: List[FotoPlanificada] = Field(..., min_length=1, description="Fotos a subir")
+
+
+class ReconocimientoCommitRequest(BaseModel):
+    """Datos del reconocimiento cuyas fotos ya fueron subidas directamente a S3"""
+    reconocimiento_id: str = Field(..., min_length=1, description="ID retornado por /reconocimiento/init")
+    tipo_intervencion: str = Field(..., min_length=1, description="Tipo de intervención")
+    descripcion_intervencion: str = Field(..., min_length=1, description="Descripción de la intervención")
+    direccion: str = Field(..., min_length=1, description="Dirección del lugar")
+    nombre_parque: str = Field(..., min_length=1, description="Nombre del parque asociado")
+    coordinates_type: str = Field(..., min_length=1, description="Tipo de geometría")
+    coordinates_data: str = Field(..., description="Coordenadas en formato JSON array. Ejemplo: [-76.5225, 3.4516]")
+    s3_keys: List[str] = Field(..., min_length=1, description="Llaves S3 retornadas por /reconocimiento/init")
+    observaciones: Optional[str] = Field(None, description="Observaciones adicionales (opcional)")
+
+
 # ==================== ENDPOINT 1: Inicialización de Parques ====================#
+# Cache en memoria de la respuesta de /init/parques (los parques cambian muy poco)
+# Se guarda una entrada por combinación (limit, cursor): {clave: (ts, bytes JSON, etag)}
+_PARQUES_CACHE_TTL = 300  # segundos
+_PARQUES_CACHE_MAX_ENTRIES = 128
+_parques_cache = {}
+# Evita que varias peticiones simultáneas consulten Firestore ante el mismo fallo de cache
+_parques_lock = asyncio.Lock()
+
+
+def _get_cached_parques(cache_key):
+    """
+    Retorna (bytes JSON, etag) si la entrada del cache sigue vigente
+    """
+    cached = _parques_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < _PARQUES_CACHE_TTL:
+        return cached[1], cached[2]
+    return None
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Verifica si el header If-None-Match incluye el ETag actual
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+
 @router.get(
     "/init/parques",
     summary="🔵 GET | Inicialización de Parques",
@@ -218,42 +454,105 @@ class ReconocimientoResponse(BaseModel):
 
 **Propósito**: Obtener datos iniciales de parques para el artefacto de captura DAGMA.
 
+### 📄 Paginación (opcional)
+- **limit**: Cantidad máxima de parques por página (1-500). Si se omite se retornan todos.
+- **cursor**: ID del último parque recibido; se obtiene de `next_cursor` en la respuesta anterior.
+
 ### ✅ Respuesta
 Retorna información de parques y zonas verdes del sistema.
+Cuando se pagina, `next_cursor` contiene el cursor de la siguiente página
+(o `null` si no hay más resultados).
+
+### ⚡ Cache
+La respuesta se mantiene en cache durante 5 minutos e incluye un header `ETag`;
+si el cliente envía `If-None-Match` con el mismo valor se responde `304 Not Modified`.
 
 ### 📝 Ejemplo de uso:
 ```javascript
-const response = await fetch('/init/parques');
+const response = await fetch('/init/parques?limit=100');
 const data = await response.json();
+// Siguiente página
+const next = await fetch(`/init/parques?limit=100&cursor=${data.next_cursor}`);
 ```
     """,
 )
-async def get_init_parques():
+async def get_init_parques(
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Cantidad máxima de parques por página"),
+    cursor: Optional[str] = Query(None, min_length=1, description="ID del último parque de la página anterior"),
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_async_db)
+):
     """
     Obtener datos iniciales de parques para DAGMA
     """
+    cache_key = (limit, cursor)
+    entry = _get_cached_parques(cache_key)
+
+    if entry is None:
+        async with _parques_lock:
+            # Otra petición pudo llenar el cache mientras se esperaba el lock
+            entry = _get_cached_parques(cache_key)
+            if entry is None:
+                entry = await _fetch_parques(db, limit, cursor)
+                if len(_parques_cache) >= _PARQUES_CACHE_MAX_ENTRIES:
+                    _parques_cache.clear()
+                _parques_cache[cache_key] = (time.monotonic(), *entry)
+
+    content, etag = entry
+    headers = {
+        "Cache-Control": f"public, max-age={_PARQUES_CACHE_TTL}",
+        "ETag": etag
+    }
+
+    # El cliente ya tiene esta versión: responder sin cuerpo
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+async def _fetch_parques(db, limit: Optional[int], cursor: Optional[str]):
+    """
+    Consulta los parques en Firestore y retorna (bytes JSON, etag)
+    """
     try:
         # Obtener datos de la colección 'parques' en Firebase
-        parques_ref = db.collection('parques')
-        docs = parques_ref.stream()
-        
-        # Convertir los documentos a lista de diccionarios
-        parques = []
-        for doc in docs:
-            parque_data = doc.to_dict()
-            parque_data['id'] = doc.id  # Agregar el ID del documento
-            
-            # Limpiar valores NaN e infinitos
-            parque_data = clean_nan_values(parque_data)
-            
-            parques.append(parque_data)
-        
-        return {
+        query = db.collection('parques')
+
+        # Paginación por ID de documento (orden estable para el cursor)
+        if limit is not None or cursor is not None:
+            query = query.order_by('__name__')
+            if cursor is not None:
+                query = query.start_after({'__name__': cursor})
+            if limit is not None:
+                query = query.limit(limit)
+
+        # Convertir los documentos a lista de diccionarios (con su ID) leyendo
+        # el stream de forma asíncrona para no bloquear el event loop
+        # (los valores NaN e infinitos los convierte orjson en null al serializar)
+        parques = [{**doc.to_dict(), 'id': doc.id} async for doc in query.stream()]
+
+        # Si la página vino llena puede haber más resultados
+        next_cursor = parques[-1]['id'] if limit is not None and len(parques) == limit else None
+
+        payload = {
             "success": True,
             "data": parques,
             "count": len(parques),
+            "next_cursor": next_cursor,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+
+        # Serializar una sola vez; el cache guarda los bytes ya listos
+        content = orjson.dumps(payload, default=_orjson_default)
+        # El ETag se calcula sobre los datos (sin el timestamp) para que no cambie
+        # mientras los parques no cambien
+        etag_source = orjson.dumps(
+            {"data": parques, "next_cursor": next_cursor}, default=_orjson_default
+        )
+        etag = f'"{hashlib.blake2b(etag_source, digest_size=8).hexdigest()}"'
+
+        return content, etag
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -262,6 +561,206 @@ async def get_init_parques():
 
 
 # ==================== ENDPOINT 2: Registrar Reconocimiento ====================#
+# Reintentos de la escritura en Firebase que se hace en segundo plano: si un
+# intento falla, el reconocimiento se reencola tras la espera correspondiente
+# y lo vuelve a procesar el worker de start_firestore_retry_worker (se inicia
+# con la app). Agotadas las esperas (~9 minutos en total) se hace rollback de las fotos
+_FIRESTORE_RETRY_DELAYS = (2, 10, 30, 60, 120, 300)
+_firestore_retry_queue: asyncio.Queue = asyncio.Queue()
+
+
+async def _persist_reconocimiento(db, s3_client, bucket_name: str, reconocimiento_id: str,
+                                  reconocimiento_data: dict, s3_keys: List[str], attempt: int = 0) -> None:
+    """
+    Guarda el reconocimiento en Firebase en segundo plano. Si falla, programa
+    un reintento en la cola de reintentos; si ya no quedan reintentos,
+    elimina de S3 las fotos ya subidas (rollback).
+    """
+    doc_ref = db.collection('reconocimientos_dagma').document(reconocimiento_id)
+    total_attempts = len(_FIRESTORE_RETRY_DELAYS) + 1
+    
+    try:
+        await asyncio.to_thread(doc_ref.set, reconocimiento_data)
+        logger.info("✅ Reconocimiento %s guardado en Firebase", reconocimiento_id)
+        return
+    except Exception as e:
+        logger.error("❌ Error guardando el reconocimiento %s en Firebase (intento %d/%d): %s",
+                     reconocimiento_id, attempt + 1, total_attempts, e)
+    
+    if attempt < len(_FIRESTORE_RETRY_DELAYS):
+        retry = partial(
+            _persist_reconocimiento,
+            db, s3_client, bucket_name, reconocimiento_id, reconocimiento_data, s3_keys,
+            attempt=attempt + 1
+        )
+        asyncio.get_running_loop().call_later(
+            _FIRESTORE_RETRY_DELAYS[attempt], _firestore_retry_queue.put_nowait, retry
+        )
+        return
+    
+    # Si Firebase sigue fallando, eliminar fotos de S3 (rollback) en una sola petición
+    logger.error("❌ Reconocimiento %s no guardado tras %d intentos, se eliminan sus fotos de S3",
+                 reconocimiento_id, total_attempts)
+    if s3_client and s3_keys:
+        try:
+            await asyncio.to_thread(_delete_s3_keys, s3_client, bucket_name, s3_keys)
+            logger.warning("⚠️ Fotos del reconocimiento %s eliminadas de S3 (rollback)", reconocimiento_id)
+        except Exception as e:
+            logger.error("❌ Error eliminando fotos del reconocimiento %s en el rollback: %s", reconocimiento_id, e)
+
+
+async def _firestore_retry_worker(retry_queue: asyncio.Queue) -> None:
+    """
+    Drena la cola de reintentos de escrituras en Firebase
+    """
+    while True:
+        retry = await retry_queue.get()
+        try:
+            await retry()
+        except Exception as e:
+            logger.error("❌ Error inesperado en la cola de reintentos de Firebase: %s", e)
+        finally:
+            retry_queue.task_done()
+
+
+def start_firestore_retry_worker() -> asyncio.Task:
+    """
+    Crea la cola de reintentos en el event loop actual e inicia su worker.
+    Se llama al arrancar la app; la tarea retornada se cancela al detenerla.
+    """
+    global _firestore_retry_queue
+    _firestore_retry_queue = asyncio.Queue()
+    return asyncio.create_task(_firestore_retry_worker(_firestore_retry_queue))
+
+
+# Tipos de geometría soportados y máximo de fotos por reconocimiento
+_VALID_GEOMETRY_TYPES = ("Point", "LineString", "Polygon", "MultiPoint", "MultiLineString", "MultiPolygon")
+_MAX_PHOTOS = 10
+
+
+def _validate_geometry_type(coordinates_type: str) -> None:
+    """
+    Valida que el tipo de geometría sea uno de los soportados
+    """
+    if coordinates_type not in _VALID_GEOMETRY_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de geometría inválido. Permitidos: {', '.join(_VALID_GEOMETRY_TYPES)}"
+        )
+
+
+def _parse_geometry(coordinates_data: str, coordinates_type: str) -> dict:
+    """
+    Parsea y valida las coordenadas recibidas y retorna la geometría GeoJSON
+    """
+    try:
+        print(f"📍 Recibido coordinates_data: {repr(coordinates_data)}")
+        print(f"📍 Tipo: {type(coordinates_data)}, Long: {len(coordinates_data) if coordinates_data else 0}")
+        
+        # Intentar parsear como JSON
+        coordinates_str = coordinates_data.strip()
+        
+        # Si no empieza con '[', asumir que es formato "lon,lat" y convertirlo
+        if not coordinates_str.startswith('['):
+            # Formato: -76.5225,3.4516 o -76.5225, 3.4516
+            parts = coordinates_str.split(',')
+            if len(parts) == 2:
+                try:
+                    lon = float(parts[0].strip())
+                    lat = float(parts[1].strip())
+                    coordinates = [lon, lat]
+                    print(f"✅ Coordenadas parseadas como lon,lat: {coordinates}")
+                except ValueError:
+                    raise json.JSONDecodeError("Formato inválido", coordinates_str, 0)
+            else:
+                raise json.JSONDecodeError("Debe tener formato [lon,lat]", coordinates_str, 0)
+        else:
+            # Formato JSON array: [-76.5225, 3.4516]
+            # (orjson es más rápido con bytes; sus errores son subclase de json.JSONDecodeError)
+            coordinates = orjson.loads(coordinates_str.encode())
+            
+        validate_coordinates(coordinates, coordinates_type)
+    except (orjson.JSONDecodeError, json.JSONDecodeError) as e:
+        print(f"❌ Error JSON: {str(e)}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato de coordenadas inválido. Envíe como '[lon,lat]' (ej: '[-76.5225,3.4516]') o 'lon,lat' (ej: '-76.5225,3.4516'). Recibido: '{coordinates_data}'"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error en coordenadas: {str(e)}"
+        )
+    
+    # Crear objeto de geometría
+    return {
+        "type": coordinates_type,
+        "coordinates": coordinates
+    }
+
+
+def _locate_geometry(geometry: dict):
+    """
+    Obtiene comuna/corregimiento y barrio/vereda de la geometría
+    (solo funciona para geometría Point)
+    """
+    comuna_corregimiento = None
+    barrio_vereda = None
+    
+    if geometry["type"] == "Point":
+        try:
+            comuna_corregimiento, barrio_vereda = get_location_from_coordinates(geometry["coordinates"])
+            if comuna_corregimiento:
+                print(f"✅ Comuna/Corregimiento encontrada: {comuna_corregimiento}")
+            if barrio_vereda:
+                print(f"✅ Barrio/Vereda encontrado: {barrio_vereda}")
+        except Exception as e:
+            print(f"⚠️ Error obteniendo ubicación: {str(e)}")
+    else:
+        print(f"ℹ️ La geolocalización solo es disponible para geometría Point, se capturó {geometry['type']}")
+    
+    return comuna_corregimiento, barrio_vereda
+
+
+def _photo_s3_key(reconocimiento_id: str, ts_fname: str, index: int, filename: Optional[str]) -> str:
+    """
+    Genera la llave S3 única de una foto del reconocimiento
+    """
+    # Sanitizar el nombre del archivo (se conservan los últimos 128 caracteres, con la extensión)
+    safe_filename = _FILENAME_RE.sub('', filename or 'upload')[-_MAX_FILENAME_LENGTH:]
+    return f"reconocimientos/{reconocimiento_id}/{ts_fname}_{index}_{safe_filename}"
+
+
+def _build_reconocimiento_data(reconocimiento_id: str, now: datetime, *, tipo_intervencion: str,
+                               descripcion_intervencion: str, direccion: str, nombre_parque: str,
+                               observaciones: Optional[str], geometry: dict,
+                               comuna_corregimiento: Optional[str], barrio_vereda: Optional[str],
+                               photos_urls: List[str]) -> dict:
+    """
+    Arma el documento del reconocimiento que se guarda en Firebase
+    """
+    ts_iso = now.isoformat()
+    return {
+        "id": reconocimiento_id,
+        "tipo_intervencion": tipo_intervencion,
+        "descripcion_intervencion": descripcion_intervencion,
+        "direccion": direccion,
+        "nombre_parque": nombre_parque,
+        "observaciones": observaciones or "",
+        "coordinates": geometry,
+        "comuna_corregimiento": comuna_corregimiento,
+        "barrio_vereda": barrio_vereda,
+        "photosUrl": photos_urls,
+        "photos_uploaded": len(photos_urls),
+        "created_at": ts_iso,
+        # Misma fecha como Timestamp nativo de Firestore (usado en filtros y orden)
+        "created_at_ts": now,
+        "timestamp": ts_iso,
+        # Texto precalculado para la búsqueda de /grupo-operativo/reportes
+        "_search_blob": _build_search_blob(direccion, descripcion_intervencion, tipo_intervencion)
+    }
+
+
 @router.post(
     "/grupo-operativo/reconocimiento",
     summary="🟢 POST | Registrar Reconocimiento",
@@ -290,6 +789,11 @@ Las fotos se subirán al bucket **360-dagma-photos** en Amazon S3 con la siguien
         └── {timestamp}_{filename}
 ```
 
+### 💾 Registro en Firebase:
+El reconocimiento se guarda en Firebase en segundo plano después de subir las fotos,
+por lo que la respuesta no espera la escritura. Si la escritura falla tras varios
+reintentos, las fotos subidas se eliminan de S3.
+
 ### 📍 Coordenadas GPS:
 Basado en la lógica del endpoint `/unidades-proyecto/captura-estado-360`:
 - Se capturan las coordenadas del dispositivo GPS
@@ -339,6 +843,7 @@ const response = await fetch('/grupo-operativo/reconocimiento', {
     response_model=ReconocimientoResponse
 )
 async def post_reconocimiento(
+    background_tasks: BackgroundTasks,
     tipo_intervencion: str = Form(..., min_length=1, description="Tipo de intervención"),
     descripcion_intervencion: str = Form(..., min_length=1, description="Descripción de la intervención"),
     direccion: str = Form(..., min_length=1, description="Dirección del lugar"),
@@ -346,19 +851,15 @@ async def post_reconocimiento(
     coordinates_type: str = Form(..., min_length=1, description="Tipo de geometría (Point, LineString, Polygon, etc.)"),
     coordinates_data: str = Form(..., description="Coordenadas en formato JSON array. Ejemplo: [-76.5225, 3.4516]"),
     photos: List[UploadFile] = File(..., description="Lista de archivos de fotos a subir a S3"),
-    observaciones: Optional[str] = Form(None, description="Observaciones adicionales (opcional)")
+    observaciones: Optional[str] = Form(None, description="Observaciones adicionales (opcional)"),
+    db=Depends(get_db)
 ):
     """
     Registrar un reconocimiento del grupo operativo DAGMA
     """
     try:
         # Validar tipo de geometría
-        valid_geometry_types = ["Point", "LineString", "Polygon", "MultiPoint", "MultiLineString", "MultiPolygon"]
-        if coordinates_type not in valid_geometry_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Tipo de geometría inválido. Permitidos: {', '.join(valid_geometry_types)}"
-            )
+        _validate_geometry_type(coordinates_type)
         
         # Validar cantidad de fotos
         if not photos or len(photos) == 0:
@@ -367,10 +868,10 @@ async def post_reconocimiento(
                 detail="Debe proporcionar al menos una foto"
             )
         
-        if len(photos) > 10:
+        if len(photos) > _MAX_PHOTOS:
             raise HTTPException(
                 status_code=400,
-                detail="Máximo 10 fotos por reconocimiento"
+                detail=f"Máximo {_MAX_PHOTOS} fotos por reconocimiento"
             )
         
         # Validar cada foto
@@ -386,67 +887,15 @@ async def post_reconocimiento(
         # Generar ID único para el reconocimiento
         reconocimiento_id = str(uuid.uuid4())
         
-        # Parsear y validar coordenadas
-        try:
-            print(f"📍 Recibido coordinates_data: {repr(coordinates_data)}")
-            print(f"📍 Tipo: {type(coordinates_data)}, Long: {len(coordinates_data) if coordinates_data else 0}")
-            
-            # Intentar parsear como JSON
-            coordinates_str = coordinates_data.strip()
-            
-            # Si no empieza con '[', asumir que es formato "lon,lat" y convertirlo
-            if not coordinates_str.startswith('['):
-                # Formato: -76.5225,3.4516 o -76.5225, 3.4516
-                parts = coordinates_str.split(',')
-                if len(parts) == 2:
-                    try:
-                        lon = float(parts[0].strip())
-                        lat = float(parts[1].strip())
-                        coordinates = [lon, lat]
-                        print(f"✅ Coordenadas parseadas como lon,lat: {coordinates}")
-                    except ValueError:
-                        raise json.JSONDecodeError("Formato inválido", coordinates_str, 0)
-                else:
-                    raise json.JSONDecodeError("Debe tener formato [lon,lat]", coordinates_str, 0)
-            else:
-                # Formato JSON array: [-76.5225, 3.4516]
-                coordinates = json.loads(coordinates_str)
-                
-            validate_coordinates(coordinates, coordinates_type)
-        except json.JSONDecodeError as e:
-            print(f"❌ Error JSON: {str(e)}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Formato de coordenadas inválido. Envíe como '[lon,lat]' (ej: '[-76.5225,3.4516]') o 'lon,lat' (ej: '-76.5225,3.4516'). Recibido: '{coordinates_data}'"
-            )
-        except ValueError as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Error en coordenadas: {str(e)}"
-            )
+        # Marca de tiempo única para toda la petición
+        now = datetime.now(timezone.utc)
+        ts_fname = now.strftime("%Y%m%d_%H%M%S")
         
-        # Crear objeto de geometría
-        geometry = {
-            "type": coordinates_type,
-            "coordinates": coordinates
-        }
+        # Parsear y validar coordenadas
+        geometry = _parse_geometry(coordinates_data, coordinates_type)
         
         # Obtener ubicación geográfica (comuna/corregimiento y barrio/vereda)
-        # Solo funciona para geometría Point
-        comuna_corregimiento = None
-        barrio_vereda = None
-        
-        if coordinates_type == "Point":
-            try:
-                comuna_corregimiento, barrio_vereda = get_location_from_coordinates(coordinates)
-                if comuna_corregimiento:
-                    print(f"✅ Comuna/Corregimiento encontrada: {comuna_corregimiento}")
-                if barrio_vereda:
-                    print(f"✅ Barrio/Vereda encontrado: {barrio_vereda}")
-            except Exception as e:
-                print(f"⚠️ Error obteniendo ubicación: {str(e)}")
-        else:
-            print(f"ℹ️ La geolocalización solo es disponible para geometría Point, se capturó {coordinates_type}")
+        comuna_corregimiento, barrio_vereda = _locate_geometry(geometry)
         
         # Obtener cliente S3 y bucket name
         bucket_name = os.getenv('S3_BUCKET_NAME', '360-dagma-photos')
@@ -461,98 +910,325 @@ async def post_reconocimiento(
             # Si no hay credenciales de S3, advertir pero continuar (modo desarrollo)
             print(f"⚠️ ADVERTENCIA: {str(e)}. Las fotos NO se subirán a S3.")
         
-        for i, photo in enumerate(photos):
-            # Generar nombre único para la foto
-            timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-            # Sanitizar el nombre del archivo
-            safe_filename = "".join(c for c in photo.filename if c.isalnum() or c in "._-")
-            photo_filename = f"{timestamp}_{i}_{safe_filename}"
-            
-            s3_key = f"reconocimientos/{reconocimiento_id}/{photo_filename}"
-            
-            if s3_client:
-                try:
-                    # Leer el contenido del archivo
-                    photo_content = await photo.read()
-                    
-                    # Subir a S3
-                    # Nota: No se usa ACL porque muchos buckets modernos tienen ACLs deshabilitadas
-                    # La accesibilidad pública se configura mediante Bucket Policy en AWS Console
-                    s3_client.upload_fileobj(
-                        io.BytesIO(photo_content),
-                        bucket_name,
-                        s3_key,
-                        ExtraArgs={
-                            'ContentType': photo.content_type
-                        }
-                    )
-                    
-                    # Generar URL pública
-                    photo_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
-                    photos_urls.append(photo_url)
-                    
-                    # Rebobinar el archivo para futuras lecturas si es necesario
-                    await photo.seek(0)
-                    
-                except ClientError as e:
-                    print(f"❌ Error subiendo foto a S3: {str(e)}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail=f"Error subiendo foto '{photo.filename}' a S3: {str(e)}"
-                    )
-            else:
-                # Modo desarrollo: generar URL ficticia
+        # Generar las claves S3 de cada foto
+        s3_keys = [
+            _photo_s3_key(reconocimiento_id, ts_fname, i, photo.filename)
+            for i, photo in enumerate(photos)
+        ]
+        
+        if s3_client:
+            # Subir todas las fotos en paralelo (gather conserva el orden de las fotos);
+            # se espera a todas para no dejar subidas en curso si alguna falla
+            resultados = await asyncio.gather(*(
+                _upload_photo_to_s3(s3_client, bucket_name, photo, s3_key)
+                for photo, s3_key in zip(photos, s3_keys)
+            ), return_exceptions=True)
+            errores = [r for r in resultados if isinstance(r, BaseException)]
+            if errores:
+                # Eliminar de S3 las fotos que sí se subieron (no quedan huérfanas)
+                subidas = [key for key, r in zip(s3_keys, resultados) if not isinstance(r, BaseException)]
+                if subidas:
+                    try:
+                        await asyncio.to_thread(_delete_s3_keys, s3_client, bucket_name, subidas)
+                    except Exception as e:
+                        print(f"❌ Error eliminando fotos de S3 tras una subida fallida: {str(e)}")
+                raise errores[0]
+            photos_urls = list(resultados)
+        else:
+            # Modo desarrollo: generar URLs ficticias
+            for photo, s3_key in zip(photos, s3_keys):
                 photo_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
                 photos_urls.append(photo_url)
                 print(f"⚠️ Modo desarrollo: URL ficticia generada para {photo.filename}")
         
         # Preparar datos para guardar en Firebase
-        reconocimiento_data = {
+        reconocimiento_data = _build_reconocimiento_data(
+            reconocimiento_id, now,
+            tipo_intervencion=tipo_intervencion,
+            descripcion_intervencion=descripcion_intervencion,
+            direccion=direccion,
+            nombre_parque=nombre_parque,
+            observaciones=observaciones,
+            geometry=geometry,
+            comuna_corregimiento=comuna_corregimiento,
+            barrio_vereda=barrio_vereda,
+            photos_urls=photos_urls
+        )
+        
+        # Guardar en Firebase en segundo plano: la respuesta no espera la escritura
+        # (si falla se reintenta desde la cola de reintentos y, agotados los
+        # reintentos, se hace rollback de las fotos en S3)
+        background_tasks.add_task(
+            _persist_reconocimiento,
+            db, s3_client, bucket_name, reconocimiento_id, reconocimiento_data, s3_keys
+        )
+        
+        # Se retorna la respuesta ya serializada: response_model=ReconocimientoResponse
+        # solo documenta el esquema y se evita una segunda validación con Pydantic
+        return ORJSONResponse(content={
+            "success": True,
             "id": reconocimiento_id,
-            "tipo_intervencion": tipo_intervencion,
-            "descripcion_intervencion": descripcion_intervencion,
-            "direccion": direccion,
+            "message": "Reconocimiento registrado exitosamente",
             "nombre_parque": nombre_parque,
-            "observaciones": observaciones or "",
             "coordinates": geometry,
-            "comuna_corregimiento": comuna_corregimiento,
-            "barrio_vereda": barrio_vereda,
             "photosUrl": photos_urls,
             "photos_uploaded": len(photos_urls),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": reconocimiento_data["timestamp"]
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error registrando reconocimiento: {str(e)}"
+        )
+
+
+# ==================== ENDPOINT 2.1: Subida Directa de Fotos a S3 ====================#
+# Vigencia de las URLs prefirmadas de subida
+_PRESIGNED_EXPIRES_IN = 900  # segundos
+
+
+@router.post(
+    "/grupo-operativo/reconocimiento/init",
+    summary="🟢 POST | Iniciar Reconocimiento (subida directa a S3)",
+    description="""
+## 🟢 POST | Iniciar Reconocimiento con Subida Directa a S3
+
+**Propósito**: Obtener URLs prefirmadas para que el cliente suba las fotos directamente
+a Amazon S3, sin que los bytes pasen por la API. Luego se confirma el reconocimiento
+con `POST /grupo-operativo/reconocimiento/commit`.
+
+### ✅ Respuesta
+Retorna el `reconocimiento_id` y, por cada foto, la `url` y los `fields` del formulario
+que se deben enviar a S3 (multipart/form-data, el archivo va en el campo `file`).
+Las URLs vencen a los 15 minutos y S3 rechaza fotos de más de 25 MB.
+
+### 📝 Ejemplo de uso:
+```javascript
+const init = await (await fetch('/grupo-operativo/reconocimiento/init', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({photos: [{filename: file.name, content_type: file.type, size: file.size}]})
+})).json();
+
+for (const [i, upload] of init.uploads.entries()) {
+    const form = new FormData();
+    Object.entries(upload.fields).forEach(([k, v]) => form.append(k, v));
+    form.append('file', files[i]);
+    await fetch(upload.url, {method: 'POST', body: form});
+}
+```
+    """
+)
+async def init_reconocimiento(request: ReconocimientoInitRequest):
+    """
+    Generar URLs prefirmadas de S3 para las fotos de un nuevo reconocimiento
+    """
+    try:
+        if len(request.photos) > _MAX_PHOTOS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Máximo {_MAX_PHOTOS} fotos por reconocimiento"
+            )
+        
+        # Validar cada foto (tipo MIME, extensión y tamaño declarado)
+        for photo in request.photos:
+            try:
+                validate_photo_file(photo)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Error en archivo '{photo.filename}': {str(e)}"
+                )
+        
+        try:
+            s3_client = get_s3_client()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Subida directa no disponible: {str(e)}"
+            )
+        
+        bucket_name = os.getenv('S3_BUCKET_NAME', '360-dagma-photos')
+        reconocimiento_id = str(uuid.uuid4())
+        ts_fname = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        
+        uploads = []
+        for i, photo in enumerate(request.photos):
+            s3_key = _photo_s3_key(reconocimiento_id, ts_fname, i, photo.filename)
+            # POST prefirmado: S3 valida el Content-Type y el tamaño máximo
+            presigned = s3_client.generate_presigned_post(
+                Bucket=bucket_name,
+                Key=s3_key,
+                Fields={'Content-Type': photo.content_type},
+                Conditions=[
+                    {'Content-Type': photo.content_type},
+                    ['content-length-range', 1, _MAX_PHOTO_BYTES]
+                ],
+                ExpiresIn=_PRESIGNED_EXPIRES_IN
+            )
+            uploads.append({
+                "filename": photo.filename,
+                "s3_key": s3_key,
+                "url": presigned['url'],
+                "fields": presigned['fields']
+            })
+        
+        return {
+            "success": True,
+            "reconocimiento_id": reconocimiento_id,
+            "uploads": uploads,
+            "expires_in": _PRESIGNED_EXPIRES_IN
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generando URLs de subida: {str(e)}"
+        )
+
+
+def _s3_object_exists(s3_client, bucket_name: str, s3_key: str) -> bool:
+    """
+    Verifica con head_object si una foto ya fue subida a S3
+    """
+    try:
+        s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+@router.post(
+    "/grupo-operativo/reconocimiento/commit",
+    response_model=ReconocimientoResponse,
+    summary="🟢 POST | Confirmar Reconocimiento (subida directa a S3)",
+    description="""
+## 🟢 POST | Confirmar Reconocimiento con Fotos Subidas Directamente a S3
+
+**Propósito**: Registrar en Firebase un reconocimiento cuyas fotos ya se subieron a S3
+con las URLs de `POST /grupo-operativo/reconocimiento/init`.
+
+### ✅ Validaciones
+- Todas las `s3_keys` deben pertenecer al `reconocimiento_id`
+- Cada foto debe existir en S3 (se verifica con `head_object`)
+- Coordenadas con el mismo formato que `POST /grupo-operativo/reconocimiento`
+
+### 📝 Ejemplo de uso:
+```javascript
+await fetch('/grupo-operativo/reconocimiento/commit', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({
+        reconocimiento_id: init.reconocimiento_id,
+        s3_keys: init.uploads.map(u => u.s3_key),
+        tipo_intervencion: 'Mantenimiento',
+        descripcion_intervencion: 'Poda de árboles',
+        direccion: 'Calle 5 #10-20',
+        nombre_parque: 'Parque del Ingenio',
+        coordinates_type: 'Point',
+        coordinates_data: '[-76.5225, 3.4516]'
+    })
+});
+```
+    """
+)
+async def commit_reconocimiento(request: ReconocimientoCommitRequest, db=Depends(get_db)):
+    """
+    Registrar en Firebase un reconocimiento con fotos ya subidas a S3
+    """
+    try:
+        try:
+            reconocimiento_id = str(uuid.UUID(request.reconocimiento_id))
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"reconocimiento_id inválido: '{request.reconocimiento_id}'"
+            )
+        
+        if len(request.s3_keys) > _MAX_PHOTOS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Máximo {_MAX_PHOTOS} fotos por reconocimiento"
+            )
+        
+        prefix = f"reconocimientos/{reconocimiento_id}/"
+        invalid_keys = [key for key in request.s3_keys if not key.startswith(prefix) or '/' in key[len(prefix):]]
+        if invalid_keys:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Llaves S3 que no pertenecen al reconocimiento: {', '.join(invalid_keys)}"
+            )
+        
+        _validate_geometry_type(request.coordinates_type)
+        geometry = _parse_geometry(request.coordinates_data, request.coordinates_type)
         
-        # Guardar en Firebase
         try:
-            db.collection('reconocimientos_dagma').document(reconocimiento_id).set(reconocimiento_data)
+            s3_client = get_s3_client()
+        except ValueError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Subida directa no disponible: {str(e)}"
+            )
+        
+        bucket_name = os.getenv('S3_BUCKET_NAME', '360-dagma-photos')
+        
+        # Verificar en paralelo que todas las fotos estén en S3
+        loop = asyncio.get_running_loop()
+        exists = await asyncio.gather(*(
+            loop.run_in_executor(_S3_EXECUTOR, _s3_object_exists, s3_client, bucket_name, key)
+            for key in request.s3_keys
+        ))
+        missing = [key for key, found in zip(request.s3_keys, exists) if not found]
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Fotos no encontradas en S3: {', '.join(missing)}"
+            )
+        
+        comuna_corregimiento, barrio_vereda = _locate_geometry(geometry)
+        photos_urls = [f"https://{bucket_name}.s3.amazonaws.com/{key}" for key in request.s3_keys]
+        
+        reconocimiento_data = _build_reconocimiento_data(
+            reconocimiento_id, datetime.now(timezone.utc),
+            tipo_intervencion=request.tipo_intervencion,
+            descripcion_intervencion=request.descripcion_intervencion,
+            direccion=request.direccion,
+            nombre_parque=request.nombre_parque,
+            observaciones=request.observaciones,
+            geometry=geometry,
+            comuna_corregimiento=comuna_corregimiento,
+            barrio_vereda=barrio_vereda,
+            photos_urls=photos_urls
+        )
+        
+        # Guardar en Firebase (las fotos ya están en S3, si falla el cliente puede reintentar)
+        try:
+            doc_ref = db.collection('reconocimientos_dagma').document(reconocimiento_id)
+            await asyncio.to_thread(doc_ref.set, reconocimiento_data)
             print(f"✅ Reconocimiento {reconocimiento_id} guardado en Firebase")
         except Exception as e:
             print(f"❌ Error guardando en Firebase: {str(e)}")
-            # Si falla Firebase, intentar eliminar fotos de S3 (rollback)
-            if s3_client:
-                for photo_url in photos_urls:
-                    try:
-                        s3_key = photo_url.split('.com/')[-1]
-                        s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
-                    except:
-                        pass
             raise HTTPException(
                 status_code=500,
                 detail=f"Error guardando en Firebase: {str(e)}"
             )
         
-        return ReconocimientoResponse(
-            success=True,
-            id=reconocimiento_id,
-            message="Reconocimiento registrado exitosamente",
-            nombre_parque=nombre_parque,
-            coordinates=geometry,
-            photosUrl=photos_urls,
-            photos_uploaded=len(photos_urls),
-            timestamp=datetime.now(timezone.utc).isoformat()
-        )
-        
+        return ORJSONResponse(content={
+            "success": True,
+            "id": reconocimiento_id,
+            "message": "Reconocimiento registrado exitosamente",
+            "nombre_parque": request.nombre_parque,
+            "coordinates": geometry,
+            "photosUrl": photos_urls,
+            "photos_uploaded": len(photos_urls),
+            "timestamp": reconocimiento_data["timestamp"]
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -563,6 +1239,11 @@ async def post_reconocimiento(
 
 
 # ==================== ENDPOINT 3: Estadísticas (KPIs) ====================#
+# Cache en memoria de las estadísticas por mes: {(año, mes): (ts, data)}
+_STATS_CACHE_TTL = 60  # segundos
+_stats_cache = {}
+
+
 @router.get(
     "/grupo-operativo/stats",
     summary="🔵 GET | Estadísticas del Dashboard",
@@ -582,7 +1263,7 @@ const stats = await response.json();
 ```
     """
 )
-async def get_stats():
+async def get_stats(db=Depends(get_db)):
     """
     Obtener estadísticas resumidas del grupo operativo para Dashboard
     """
@@ -591,32 +1272,45 @@ async def get_stats():
         now = datetime.now(timezone.utc)
         start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         
+        cache_key = (now.year, now.month)
+        cached = _stats_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < _STATS_CACHE_TTL:
+            return {
+                "success": True,
+                "data": cached[1],
+                "timestamp": now.isoformat()
+            }
+        
         # Consultar reportes del mes actual
         reportes_ref = db.collection('reconocimientos_dagma')
-        docs = reportes_ref.where('created_at', '>=', start_of_month.isoformat()).stream()
+        reportes_mes_query = reportes_ref.where('created_at_ts', '>=', start_of_month)
         
-        reportes_mes = []
-        parques_visitados = set()
+        # Conteo en el servidor (una sola RPC, sin transferir documentos)
+        count_result = reportes_mes_query.count().get()
+        total_visitas_mes = count_result[0][0].value
         
-        for doc in docs:
-            data = doc.to_dict()
-            reportes_mes.append(data)
-            # Agregar dirección como identificador de parque visitado
-            if 'direccion' in data:
-                parques_visitados.add(data['direccion'])
+        # Solo se transfiere el campo 'direccion' (identificador de parque visitado)
+        parques_visitados = set()
+        for doc in reportes_mes_query.select(['direccion']).stream():
+            direccion = doc.to_dict().get('direccion')
+            if direccion is not None:
+                parques_visitados.add(direccion)
         
         # TODO: Implementar lógica de pendientes según el modelo de negocio
         # Por ahora retornamos 0
         total_pendientes = 0
         
+        stats = {
+            "total_visitas_mes": total_visitas_mes,
+            "total_pendientes": total_pendientes,
+            "parques_visitados": len(parques_visitados)
+        }
+        _stats_cache[cache_key] = (time.monotonic(), stats)
+        
         return {
             "success": True,
-            "data": {
-                "total_visitas_mes": len(reportes_mes),
-                "total_pendientes": total_pendientes,
-                "parques_visitados": len(parques_visitados)
-            },
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "data": stats,
+            "timestamp": now.isoformat()
         }
     except Exception as e:
         raise HTTPException(
@@ -645,19 +1339,21 @@ const reportes = await response.json();
     """
 )
 async def get_reportes_recent(
-    limit: int = Query(default=3, ge=1, le=10, description="Cantidad de reportes recientes a retornar")
+    limit: int = Query(default=3, ge=1, le=10, description="Cantidad de reportes recientes a retornar"),
+    db=Depends(get_db)
 ):
     """
     Obtener los últimos N reportes ordenados por fecha descendente
     """
     try:
         reportes_ref = db.collection('reconocimientos_dagma')
-        docs = reportes_ref.order_by('created_at', direction=firestore.Query.DESCENDING).limit(limit).stream()
+        docs = reportes_ref.order_by('created_at_ts', direction=firestore.Query.DESCENDING).limit(limit).stream()
         
         reportes = []
         for doc in docs:
             data = doc.to_dict()
             data['id'] = doc.id
+            data.pop('_search_blob', None)
             reportes.append(data)
         
         return {
@@ -674,6 +1370,84 @@ async def get_reportes_recent(
 
 
 # ==================== ENDPOINT 5: Obtener Reportes con Filtros ====================#
+def _matches_search(data: dict, search_tokens: List[str]) -> bool:
+    """
+    Búsqueda parcial en memoria (Firebase no soporta búsqueda parcial de texto).
+    Todos los términos de la búsqueda deben aparecer en el texto del reporte.
+    El campo `_search_blob` se retira de `data` para no exponerlo en la respuesta.
+    """
+    searchable_text = data.pop('_search_blob', None)
+    if searchable_text is None:
+        # Reportes anteriores a `_search_blob`: construir el texto al vuelo
+        searchable_text = _build_search_blob(
+            data.get('direccion', ''),
+            data.get('descripcion_intervencion', ''),
+            data.get('tipo_intervencion', '')
+        )
+    return all(token in searchable_text for token in search_tokens)
+
+
+def _encode_cursor(created_at_ts: datetime, doc_id: str) -> str:
+    """
+    Codifica la posición (created_at_ts, id) del último reporte como cursor opaco
+    """
+    return base64.urlsafe_b64encode(f"{created_at_ts.isoformat()}|{doc_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decodifica un cursor generado por _encode_cursor en (created_at_ts, id)
+    """
+    try:
+        created_at_ts, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return datetime.fromisoformat(created_at_ts), doc_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cursor inválido: '{cursor}'. Debe ser el next_cursor de la respuesta anterior"
+        )
+
+
+def _fetch_reportes_page(query, limit: int, cursor: Optional[Tuple[datetime, str]], search: Optional[str]) -> List[dict]:
+    """
+    Obtiene una página de reportes con paginación por cursor (start_after + limit).
+    `query` debe estar ordenada por created_at_ts y __name__; `cursor` es la
+    posición (created_at_ts, id) del último reporte de la página anterior.
+    Sin búsqueda solo se transfieren `limit` documentos; con búsqueda se leen
+    bloques de `limit * 4` documentos hasta reunir `limit` coincidencias.
+    """
+    search_tokens = search.lower().split() if search else None
+    batch_size = limit * 4 if search_tokens else limit
+    position = cursor
+    reportes = []
+    
+    while len(reportes) < limit:
+        batch_query = query
+        if position is not None:
+            # El id desempata reportes con el mismo created_at_ts
+            batch_query = batch_query.start_after({'created_at_ts': position[0], '__name__': position[1]})
+        docs = list(batch_query.limit(batch_size).stream())
+        
+        for doc in docs:
+            data = doc.to_dict()
+            data['id'] = doc.id
+            position = (data.get('created_at_ts'), doc.id)
+            
+            if search_tokens and not _matches_search(data, search_tokens):
+                continue
+            data.pop('_search_blob', None)
+            
+            reportes.append(data)
+            if len(reportes) == limit:
+                break
+        
+        # No hay más documentos que cumplan los filtros
+        if len(docs) < batch_size:
+            break
+    
+    return reportes
+
+
 @router.get(
     "/grupo-operativo/reportes",
     summary="🔵 GET | Obtener Reportes (con filtros)",
@@ -686,12 +1460,16 @@ async def get_reportes_recent(
 - **year** (opcional): Filtrar por año (ej: 2024)
 - **month** (opcional): Filtrar por mes (1-12)
 - **search** (opcional): Búsqueda parcial en dirección, descripción o tipo de intervención
+  (si se envían varias palabras, el reporte debe contenerlas todas)
 - **type** (opcional): Filtrar por tipo de intervención exacto
-- **page** (opcional): Número de página (default: 1)
+- **cursor** (opcional): `next_cursor` de la respuesta anterior (paginación por cursor, por defecto)
+- **page** (opcional, obsoleto): Número de página; si se envía se usa la paginación por página
 - **limit** (opcional): Resultados por página (default: 20, máximo: 100)
 
 ### ✅ Respuesta
 Retorna lista de reportes filtrados con metadatos de paginación.
+Sin `page` solo se leen de Firebase los reportes de la página solicitada;
+`pagination.next_cursor` indica el cursor de la siguiente página (o `null`).
 
 ### 📝 Ejemplos de uso:
 ```javascript
@@ -707,7 +1485,11 @@ fetch('/grupo-operativo/reportes?search=Parque San Antonio');
 // Filtrar por tipo
 fetch('/grupo-operativo/reportes?type=Mantenimiento');
 
-// Con paginación
+// Con paginación por cursor
+const primera = await (await fetch('/grupo-operativo/reportes?limit=10')).json();
+fetch(`/grupo-operativo/reportes?limit=10&cursor=${primera.pagination.next_cursor}`);
+
+// Con paginación por página (obsoleto)
 fetch('/grupo-operativo/reportes?page=2&limit=10');
 ```
     """
@@ -717,8 +1499,10 @@ async def get_reportes(
     month: Optional[int] = Query(None, ge=1, le=12, description="Filtrar por mes (1-12)"),
     search: Optional[str] = Query(None, min_length=1, description="Búsqueda parcial en dirección/descripción/tipo"),
     type: Optional[str] = Query(None, min_length=1, description="Filtrar por tipo de intervención"),
-    page: int = Query(default=1, ge=1, description="Número de página"),
-    limit: int = Query(default=20, ge=1, le=100, description="Resultados por página")
+    page: Optional[int] = Query(None, ge=1, description="Número de página (obsoleto, usar cursor)"),
+    limit: int = Query(default=20, ge=1, le=100, description="Resultados por página"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor)"),
+    db=Depends(get_db)
 ):
     """
     Obtener reportes del grupo operativo con filtros opcionales y paginación
@@ -736,24 +1520,55 @@ async def get_reportes(
             else:
                 end_date = datetime(year, month + 1, 1, tzinfo=timezone.utc)
             
-            query = query.where('created_at', '>=', start_date.isoformat())
-            query = query.where('created_at', '<', end_date.isoformat())
+            query = query.where('created_at_ts', '>=', start_date)
+            query = query.where('created_at_ts', '<', end_date)
         elif year:
             # Solo año
             start_date = datetime(year, 1, 1, tzinfo=timezone.utc)
             end_date = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-            query = query.where('created_at', '>=', start_date.isoformat())
-            query = query.where('created_at', '<', end_date.isoformat())
+            query = query.where('created_at_ts', '>=', start_date)
+            query = query.where('created_at_ts', '<', end_date)
         
         # Aplicar filtro de tipo de intervención (exacto)
         if type:
             query = query.where('tipo_intervencion', '==', type)
         
-        # Ordenar por fecha descendente
-        query = query.order_by('created_at', direction=firestore.Query.DESCENDING)
+        # Ordenar por fecha descendente (el id desempata reportes con la misma fecha)
+        query = query.order_by('created_at_ts', direction=firestore.Query.DESCENDING) \
+            .order_by('__name__', direction=firestore.Query.DESCENDING)
+        
+        filters = {
+            "year": year,
+            "month": month,
+            "search": search,
+            "type": type
+        }
+        
+        # Paginación por cursor (por defecto): solo se transfieren los documentos de la página
+        if page is None:
+            reportes = _fetch_reportes_page(query, limit, _decode_cursor(cursor) if cursor else None, search)
+            next_cursor = None
+            if len(reportes) == limit:
+                next_cursor = _encode_cursor(reportes[-1]['created_at_ts'], reportes[-1]['id'])
+            
+            return {
+                "success": True,
+                "data": reportes,
+                "count": len(reportes),
+                "pagination": {
+                    "limit": limit,
+                    "cursor": cursor or None,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None
+                },
+                "filters": filters,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
         
-        # Obtener todos los documentos que cumplen los filtros
+        # Paginación por página (obsoleta): requiere leer todos los documentos
+        logger.warning("⚠️ Paginación por 'page' obsoleta en /grupo-operativo/reportes, usar 'cursor'")
         docs = query.stream()
+        search_tokens = search.lower().split() if search else None
         
         all_reportes = []
         for doc in docs:
@@ -761,15 +1576,9 @@ async def get_reportes(
             data['id'] = doc.id
             
             # Aplicar filtro de búsqueda en memoria (Firebase no soporta búsqueda parcial de texto)
-            if search:
-                search_lower = search.lower()
-                searchable_text = (
-                    data.get('direccion', '').lower() + ' ' +
-                    data.get('descripcion_intervencion', '').lower() + ' ' +
-                    data.get('tipo_intervencion', '').lower()
-                )
-                if search_lower not in searchable_text:
-                    continue
+            if search_tokens and not _matches_search(data, search_tokens):
+                continue
+            data.pop('_search_blob', None)
             
             all_reportes.append(data)
         
@@ -785,22 +1594,22 @@ async def get_reportes(
         return {
             "success": True,
             "data": paginated_reportes,
+            "count": len(paginated_reportes),
             "pagination": {
                 "page": page,
                 "limit": limit,
                 "total_items": total_items,
                 "total_pages": total_pages,
                 "has_next": page < total_pages,
-                "has_prev": page > 1
-            },
-            "filters": {
-                "year": year,
-                "month": month,
-                "search": search,
-                "type": type
+                "has_prev": page > 1,
+                "next_cursor": _encode_cursor(paginated_reportes[-1]['created_at_ts'], paginated_reportes[-1]['id'])
+                if page < total_pages and paginated_reportes else None
             },
+            "filters": filters,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -845,7 +1654,7 @@ fetch('/actividades_plan_distrito_verde');
 ```
     """
 )
-async def get_actividades_plan_distrito_verde():
+async def get_actividades_plan_distrito_verde(db=Depends(get_db)):
     """
     Obtener todas las actividades del plan Distrito Verde de Firebase
     """
@@ -914,30 +1723,46 @@ const response = await fetch('/grupo-operativo/eliminar-reporte?reporte_id=abc-1
     """
 )
 async def delete_reporte(
-    reporte_id: str = Query(..., description="ID del reporte a eliminar")
+    reporte_id: str = Query(..., description="ID del reporte a eliminar"),
+    db=Depends(get_db)
 ):
     """
     Eliminar un reporte del grupo operativo
     """
     try:
-        # TODO: Implementar eliminación de fotos en S3
-        # s3_client = boto3.client('s3')
-        # bucket = '360-dagma-photos'
-        # prefix = f'reconocimientos/{reporte_id}/'
+        # Verificar que el reporte existe antes de eliminar fotos o documentos
+        reporte_ref = db.collection('reconocimientos_dagma').document(reporte_id)
+        reporte_doc = await asyncio.to_thread(reporte_ref.get)
+        if not reporte_doc.exists:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No se encontró el reporte con ID: {reporte_id}"
+            )
         
-        # Listar y eliminar objetos en S3
-        # response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)
-        # photos_deleted = 0
+        # Eliminar fotos en S3 (si hay credenciales configuradas)
+        bucket_name = os.getenv('S3_BUCKET_NAME', '360-dagma-photos')
+        photos_deleted = 0
         
-        # if 'Contents' in response:
-        #     for obj in response['Contents']:
-        #         s3_client.delete_object(Bucket=bucket, Key=obj['Key'])
-        #         photos_deleted += 1
+        try:
+            s3_client = get_s3_client()
+        except ValueError as e:
+            s3_client = None
+            print(f"⚠️ ADVERTENCIA: {str(e)}. Las fotos NO se eliminarán de S3.")
         
-        photos_deleted = 0
+        if s3_client:
+            try:
+                photos_deleted = await asyncio.to_thread(
+                    _delete_s3_prefix, s3_client, bucket_name, f"reconocimientos/{reporte_id}/"
+                )
+            except ClientError as e:
+                print(f"❌ Error eliminando fotos de S3: {str(e)}")
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Error eliminando fotos del reporte en S3: {str(e)}"
+                )
         
-        # TODO: Eliminar documento de Firebase
-        # db.collection('reconocimientos_dagma').document(reporte_id).delete()
+        # Eliminar documento de Firebase (y sus subcolecciones) sin bloquear el event loop
+        await asyncio.to_thread(_delete_document_tree, db, reporte_ref)
         
         return {
             "success": True,
@@ -947,6 +1772,8 @@ async def delete_reporte(
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
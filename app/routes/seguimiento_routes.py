@@ -2,22 +2,60 @@
 Rutas para Sistema de Seguimiento de Reportes/Reconocimientos DAGMA
 Gestión del ciclo de vida completo de reportes: estados, asignaciones, historial y estadísticas
 """
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Body, Header, Response
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 from pydantic import BaseModel, Field, validator
+import asyncio
+import base64
+import logging
 import uuid
+from collections import Counter, defaultdict
+from functools import lru_cache
 from firebase_admin import firestore
 
 # Importar configuración de Firebase
 from app.firebase_config import db
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/api/v1/reportes",
     tags=["Sistema de Seguimiento de Reportes"]
 )
 
 
+# ==================== CONSTANTES ====================#
+
+# Estados y prioridades en orden de presentación
+_ESTADOS = ('notificado', 'radicado', 'en-gestion', 'asignado', 'en-proceso', 'resuelto', 'cerrado')
+_PRIORIDADES = ('baja', 'media', 'alta', 'urgente')
+_ESTADOS_VALIDOS = frozenset(_ESTADOS)
+_ESTADOS_RESUELTOS = frozenset({'resuelto', 'cerrado'})
+_PRIORIDADES_VALIDAS = frozenset(_PRIORIDADES)
+
+# Transiciones de estado permitidas según las reglas de negocio
+_TRANSICIONES: Dict[str, frozenset] = {
+    'notificado': frozenset({'radicado', 'cerrado'}),
+    'radicado': frozenset({'en-gestion', 'asignado', 'cerrado'}),
+    'en-gestion': frozenset({'asignado', 'en-proceso', 'cerrado'}),
+    'asignado': frozenset({'en-proceso', 'cerrado'}),
+    'en-proceso': frozenset({'resuelto', 'cerrado'}),
+    'resuelto': frozenset({'cerrado'}),
+    'cerrado': frozenset()  # Estado final
+}
+
+# Máquina de estados como tabla de enteros: cada estado tiene un índice y una
+# máscara de bits con los estados destino permitidos (bit i = estado i)
+_ESTADO_ID = {estado: i for i, estado in enumerate(_ESTADOS)}
+_TRANSICIONES_MASK = tuple(
+    sum(1 << _ESTADO_ID[destino] for destino in _TRANSICIONES[estado]) for estado in _ESTADOS
+)
+# Rango de porcentaje admitido por estado (mismo orden que _ESTADOS)
+_PORCENTAJE_MIN = (0, 0, 0, 0, 0, 90, 100)
+_PORCENTAJE_MAX = (100, 100, 100, 100, 100, 100, 100)
+
+
 # ==================== MODELOS PYDANTIC ====================#
 
 class EvidenciaInput(BaseModel):
@@ -39,13 +77,12 @@ class AvanceInput(BaseModel):
     descripcion: str = Field(..., min_length=10, max_length=2000, description="Descripción del avance")
     autor: str = Field(..., description="Nombre del funcionario que registra el avance")
     porcentaje: int = Field(..., ge=0, le=100, description="Porcentaje de avance")
-    evidencias: Optional[List[EvidenciaInput]] = Field(default=[], description="Lista de evidencias")
+    evidencias: Optional[List[EvidenciaInput]] = Field(default=[], max_length=100, description="Lista de evidencias (máximo 100)")
     
     @validator('estado_nuevo')
     def validate_estado(cls, v):
-        estados_validos = ['notificado', 'radicado', 'en-gestion', 'asignado', 'en-proceso', 'resuelto', 'cerrado']
-        if v not in estados_validos:
-            raise ValueError(f"Estado inválido. Valores permitidos: {', '.join(estados_validos)}")
+        if v not in _ESTADOS_VALIDOS:
+            raise ValueError(f"Estado inválido. Valores permitidos: {', '.join(_ESTADOS)}")
         return v
 
 
@@ -61,134 +98,231 @@ class PrioridadInput(BaseModel):
     
     @validator('prioridad')
     def validate_prioridad(cls, v):
-        prioridades_validas = ['baja', 'media', 'alta', 'urgente']
-        if v not in prioridades_validas:
-            raise ValueError(f"Prioridad inválida. Valores permitidos: {', '.join(prioridades_validas)}")
+        if v not in _PRIORIDADES_VALIDAS:
+            raise ValueError(f"Prioridad inválida. Valores permitidos: {', '.join(_PRIORIDADES)}")
         return v
 
 
 # ==================== FUNCIONES AUXILIARES ====================#
 
+# Funciones puras con dominio pequeño (estados x estados, estados x 0-100): se memoizan
+@lru_cache(maxsize=None)
 def validar_transicion_estado(estado_actual: str, estado_nuevo: str) -> bool:
     """
     Valida que la transición entre estados sea permitida según las reglas de negocio
     """
-    transiciones_permitidas = {
-        'notificado': ['radicado', 'cerrado'],
-        'radicado': ['en-gestion', 'asignado', 'cerrado'],
-        'en-gestion': ['asignado', 'en-proceso', 'cerrado'],
-        'asignado': ['en-proceso', 'cerrado'],
-        'en-proceso': ['resuelto', 'cerrado'],
-        'resuelto': ['cerrado'],
-        'cerrado': []  # Estado final
-    }
-    
-    return estado_nuevo in transiciones_permitidas.get(estado_actual, [])
+    origen = _ESTADO_ID.get(estado_actual)
+    destino = _ESTADO_ID.get(estado_nuevo)
+    if origen is None or destino is None:
+        return False
+    return bool((_TRANSICIONES_MASK[origen] >> destino) & 1)
 
 
+@lru_cache(maxsize=None)
 def validar_porcentaje_estado(estado: str, porcentaje: int) -> bool:
     """
     Valida que el porcentaje sea coherente con el estado
     """
-    if estado == 'resuelto' and porcentaje < 90:
-        return False
-    if estado == 'cerrado' and porcentaje != 100:
-        return False
-    return True
+    estado_id = _ESTADO_ID.get(estado)
+    if estado_id is None:
+        return True
+    return _PORCENTAJE_MIN[estado_id] <= porcentaje <= _PORCENTAJE_MAX[estado_id]
+
 
+# Límite de valores admitidos por Firestore en un filtro 'in'
+_FIRESTORE_IN_LIMIT = 30
 
-async def obtener_reporte_completo(reporte_id: str) -> Dict[str, Any]:
+
+def _chunks(items: List[str], size: int = _FIRESTORE_IN_LIMIT):
     """
-    Obtiene un reporte con toda su información de seguimiento e historial
+    Divide una lista en bloques de tamaño `size`
     """
-    # Obtener reporte base (reconocimiento)
-    reporte_ref = db.collection('reconocimientos').document(reporte_id)
-    reporte_doc = reporte_ref.get()
-    
-    if not reporte_doc.exists:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No se encontró el reporte con ID: {reporte_id}"
-        )
-    
-    reporte_data = reporte_doc.to_dict()
-    reporte_data['id'] = reporte_id
-    
-    # Obtener información de seguimiento
-    seguimiento_ref = db.collection('reportes_seguimiento').document(reporte_id)
-    seguimiento_doc = seguimiento_ref.get()
-    
-    if seguimiento_doc.exists:
-        seguimiento_data = seguimiento_doc.to_dict()
-        reporte_data.update({
-            'estado': seguimiento_data.get('estado', 'notificado'),
-            'prioridad': seguimiento_data.get('prioridad', 'media'),
-            'porcentaje_avance': seguimiento_data.get('porcentaje_avance', 0),
-            'encargado': seguimiento_data.get('encargado'),
-            'centro_gestor': seguimiento_data.get('centro_gestor'),
-        })
-    else:
-        # Si no existe seguimiento, usar valores por defecto
-        reporte_data.update({
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def _sin_valor():
+    """
+    Corrutina vacía para omitir una consulta dentro de asyncio.gather
+    """
+    return None
+
+
+def _valor_agregacion(agg_query):
+    """
+    Ejecuta una consulta de agregación y retorna su único valor
+    """
+    return agg_query.get()[0][0].value
+
+
+def obtener_evidencias_por_historial(historial_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Obtiene las evidencias de varios avances con consultas 'in' por bloques
+    (una consulta por cada 30 avances en lugar de una por avance).
+    Retorna un diccionario {historial_avance_id: [evidencias]}
+    """
+    por_historial = defaultdict(list)
+    for chunk in _chunks(historial_ids):
+        evidencias_docs = db.collection('evidencias_avance_reportes') \
+            .where('historial_avance_id', 'in', chunk) \
+            .stream()
+        for ev_doc in evidencias_docs:
+            ev_data = ev_doc.to_dict()
+            por_historial[ev_data.get('historial_avance_id')].append({
+                'tipo': ev_data.get('tipo'),
+                'url': ev_data.get('url'),
+                'descripcion': ev_data.get('descripcion')
+            })
+    return por_historial
+
+
+# Campos de seguimiento usados por las respuestas (proyección con select)
+_CAMPOS_SEGUIMIENTO = ['estado', 'prioridad', 'porcentaje_avance', 'encargado', 'centro_gestor', 'created_at']
+
+
+def _datos_seguimiento(seguimiento_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Extrae los campos de seguimiento de un reporte (o los valores por defecto
+    si el reporte aún no tiene seguimiento)
+    """
+    if seguimiento_data is None:
+        return {
             'estado': 'notificado',
             'prioridad': 'media',
             'porcentaje_avance': 0,
             'encargado': None,
             'centro_gestor': None,
-        })
+        }
+    return {
+        'estado': seguimiento_data.get('estado', 'notificado'),
+        'prioridad': seguimiento_data.get('prioridad', 'media'),
+        'porcentaje_avance': seguimiento_data.get('porcentaje_avance', 0),
+        'encargado': seguimiento_data.get('encargado'),
+        'centro_gestor': seguimiento_data.get('centro_gestor'),
+    }
+
+
+def _estadisticas_ref():
+    """
+    Referencia al documento con los contadores globales de seguimiento
+    """
+    return db.collection('estadisticas_seguimiento').document('global')
+
+
+def registrar_cambio_estadisticas(batch, antes: Optional[Dict[str, Any]], despues: Dict[str, Any]):
+    """
+    Agrega al batch (o transacción) los incrementos de los contadores globales
+    para un cambio de seguimiento. `antes` es None si el seguimiento no existía; ambos
+    diccionarios tienen el formato de _datos_seguimiento
+    """
+    deltas = defaultdict(int)
+    for signo, datos in ((-1, antes), (1, despues)):
+        if datos is None:
+            continue
+        deltas[('total_reportes',)] += signo
+        deltas[('suma_porcentajes',)] += signo * datos['porcentaje_avance']
+        deltas[('por_estado', datos['estado'])] += signo
+        deltas[('por_prioridad', datos['prioridad'])] += signo
+        if datos['centro_gestor']:
+            resuelto = datos['estado'] in _ESTADOS_RESUELTOS
+            deltas[('por_centro_gestor', datos['centro_gestor'], 'total')] += signo
+            deltas[('por_centro_gestor', datos['centro_gestor'], 'resueltos' if resuelto else 'en_proceso')] += signo
     
-    # Obtener historial de avances
-    historial_ref = db.collection('historial_avance_reportes') \
-        .where('reporte_id', '==', reporte_id) \
-        .order_by('fecha', direction=firestore.Query.DESCENDING)
+    # Diccionario anidado para set(merge=True): crea el documento si no existe
+    cambios = {}
+    for path, delta in deltas.items():
+        if delta:
+            nodo = cambios
+            for parte in path[:-1]:
+                nodo = nodo.setdefault(parte, {})
+            nodo[path[-1]] = firestore.Increment(delta)
     
-    historial_docs = historial_ref.stream()
-    historial = []
+    if cambios:
+        batch.set(_estadisticas_ref(), cambios, merge=True)
+
+
+def obtener_historial_por_reporte(reporte_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Obtiene el historial de avances (con sus evidencias) de varios reportes
+    con consultas 'in' por bloques. Cada historial queda ordenado por fecha
+    descendente. Retorna un diccionario {reporte_id: [avances]}
+    """
+    historial_docs = []
+    for chunk in _chunks(reporte_ids):
+        historial_ref = db.collection('historial_avance_reportes') \
+            .where('reporte_id', 'in', chunk) \
+            .order_by('fecha', direction=firestore.Query.DESCENDING)
+        historial_docs.extend(historial_ref.stream())
+    
+    # Obtener evidencias de todos los avances en lote
+    evidencias_por_historial = obtener_evidencias_por_historial([d.id for d in historial_docs])
     
+    por_reporte = defaultdict(list)
     for hist_doc in historial_docs:
         hist_data = hist_doc.to_dict()
         hist_data['id'] = hist_doc.id
-        
-        # Obtener evidencias de este avance
-        evidencias_ref = db.collection('evidencias_avance_reportes') \
-            .where('historial_avance_id', '==', hist_doc.id)
-        evidencias_docs = evidencias_ref.stream()
-        
-        evidencias = []
-        for ev_doc in evidencias_docs:
-            ev_data = ev_doc.to_dict()
-            evidencias.append({
-                'tipo': ev_data.get('tipo'),
-                'url': ev_data.get('url'),
-                'descripcion': ev_data.get('descripcion')
-            })
-        
-        hist_data['evidencias'] = evidencias
-        historial.append(hist_data)
-    
-    reporte_data['historial'] = historial
-    
-    return reporte_data
+        hist_data['evidencias'] = evidencias_por_historial.get(hist_doc.id, [])
+        por_reporte[hist_data.get('reporte_id')].append(hist_data)
+    return por_reporte
 
 
 # ==================== ENDPOINTS ====================#
 
+def _encode_cursor(created_at: datetime, doc_id: str) -> str:
+    """
+    Codifica la posición (created_at, id) del último reporte como cursor opaco
+    """
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{doc_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    """
+    Decodifica un cursor generado por _encode_cursor en (created_at, id)
+    """
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return datetime.fromisoformat(created_at), doc_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor de paginación inválido"
+        )
+
+
+def _parse_fecha(fecha: str) -> datetime:
+    """
+    Convierte una fecha YYYY-MM-DD en datetime UTC
+    """
+    try:
+        fecha_dt = datetime.fromisoformat(fecha)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Formato de fecha inválido. Use YYYY-MM-DD"
+        )
+    return fecha_dt if fecha_dt.tzinfo else fecha_dt.replace(tzinfo=timezone.utc)
+
+
 @router.get(
     "/seguimiento",
     summary="📋 Obtener Reportes con Seguimiento",
     description="""
-## Obtiene la lista completa de reportes con información de seguimiento e historial
+## Obtiene la lista de reportes con información de seguimiento (e historial opcional)
 
 ### Filtros disponibles:
 - **estado**: Filtrar por estado del reporte
 - **prioridad**: Filtrar por nivel de prioridad
 - **encargado**: Filtrar por nombre del encargado
-- **fecha_desde / fecha_hasta**: Rango de fechas
-- **page / limit**: Paginación
+- **fecha_desde / fecha_hasta**: Rango de fechas de creación del seguimiento
+- **limit / cursor**: Paginación por cursor (enviar el `next_cursor` de la respuesta anterior)
+- **include_total**: Incluir el total de reportes (consulta de conteo adicional)
+- **expand=historial**: Incluir el historial de avances y sus evidencias en cada reporte
 
 ### Ejemplo de uso:
 ```bash
-GET /api/v1/reportes/seguimiento?estado=en-gestion&prioridad=alta&page=1&limit=20
+GET /api/v1/reportes/seguimiento?estado=en-gestion&prioridad=alta&limit=20
+GET /api/v1/reportes/seguimiento?estado=en-gestion&prioridad=alta&limit=20&cursor=<next_cursor>
+GET /api/v1/reportes/seguimiento?estado=en-gestion&expand=historial
 ```
     """
 )
@@ -198,13 +332,17 @@ async def get_reportes_seguimiento(
     encargado: Optional[str] = Query(None, description="Filtrar por encargado"),
     fecha_desde: Optional[str] = Query(None, description="Fecha desde (YYYY-MM-DD)"),
     fecha_hasta: Optional[str] = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
-    page: int = Query(1, ge=1, description="Número de página"),
-    limit: int = Query(50, ge=1, le=100, description="Resultados por página")
+    limit: int = Query(50, ge=1, le=100, description="Resultados por página"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor)"),
+    include_total: bool = Query(False, description="Incluir el total de reportes"),
+    expand: Optional[str] = Query(None, description="Campos adicionales separados por coma (historial)")
 ):
     """
     Obtener lista de reportes con seguimiento
     """
     try:
+        expand_campos = {campo.strip() for campo in expand.split(',')} if expand else set()
+        
         # Construir query base
         query = db.collection('reportes_seguimiento')
         
@@ -218,61 +356,73 @@ async def get_reportes_seguimiento(
         if encargado:
             query = query.where('encargado', '==', encargado)
         
-        # Obtener documentos
-        docs = query.stream()
+        # Filtro de fechas en Firestore
+        if fecha_desde:
+            query = query.where('created_at', '>=', _parse_fecha(fecha_desde))
+        
+        if fecha_hasta:
+            query = query.where('created_at', '<', _parse_fecha(fecha_hasta) + timedelta(days=1))
+        
+        # Paginación por cursor: se pide un documento extra para saber si hay más páginas
+        # (solo se transfieren los campos de seguimiento que usa la respuesta)
+        page_query = query.select(_CAMPOS_SEGUIMIENTO).order_by('created_at').order_by('__name__')
+        if cursor:
+            cursor_created_at, cursor_id = _decode_cursor(cursor)
+            page_query = page_query.start_after({'created_at': cursor_created_at, '__name__': cursor_id})
+        page_query = page_query.limit(limit + 1)
+        
+        # Fase 1: obtener los seguimientos de la página (y el total en paralelo si se pidió)
+        seguimiento_docs, total = await asyncio.gather(
+            asyncio.to_thread(lambda: list(page_query.stream())),
+            asyncio.to_thread(_valor_agregacion, query.count()) if include_total else _sin_valor()
+        )
+        has_more = len(seguimiento_docs) > limit
+        seguimiento_docs = seguimiento_docs[:limit]
+        
+        next_cursor = None
+        if has_more:
+            last_doc = seguimiento_docs[-1]
+            next_cursor = _encode_cursor(last_doc.to_dict().get('created_at'), last_doc.id)
+        
+        # Fase 2: obtener todos los reconocimientos en una sola llamada batch
+        reporte_refs = [db.collection('reconocimientos').document(doc.id) for doc in seguimiento_docs]
+        reconocimiento_snaps = await asyncio.to_thread(lambda: list(db.get_all(reporte_refs))) if reporte_refs else []
+        reconocimientos = {snap.id: snap.to_dict() for snap in reconocimiento_snaps if snap.exists}
         
-        # Procesar cada documento
         reportes = []
-        for doc in docs:
-            seguimiento_data = doc.to_dict()
+        for doc in seguimiento_docs:
             reporte_id = doc.id
-            
-            try:
-                # Obtener reporte completo
-                reporte_completo = await obtener_reporte_completo(reporte_id)
-                
-                # Aplicar filtro de fechas si está especificado
-                if fecha_desde or fecha_hasta:
-                    fecha_registro = reporte_completo.get('timestamp')
-                    if fecha_registro:
-                        if isinstance(fecha_registro, str):
-                            fecha_registro = datetime.fromisoformat(fecha_registro.replace('Z', '+00:00'))
-                        
-                        if fecha_desde:
-                            fecha_desde_dt = datetime.fromisoformat(fecha_desde)
-                            if fecha_registro < fecha_desde_dt:
-                                continue
-                        
-                        if fecha_hasta:
-                            fecha_hasta_dt = datetime.fromisoformat(fecha_hasta) + timedelta(days=1)
-                            if fecha_registro >= fecha_hasta_dt:
-                                continue
-                
-                reportes.append(reporte_completo)
-            except Exception as e:
-                # Si hay error obteniendo un reporte individual, continuar con los demás
-                print(f"Error obteniendo reporte {reporte_id}: {str(e)}")
+            reporte_data = reconocimientos.get(reporte_id)
+            if reporte_data is None:
+                logger.warning("⚠️ No se encontró el reconocimiento del reporte %s", reporte_id)
                 continue
+            
+            reporte_data['id'] = reporte_id
+            reporte_data.update(_datos_seguimiento(doc.to_dict()))
+            reportes.append(reporte_data)
         
-        # Calcular paginación
-        total = len(reportes)
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        reportes_paginados = reportes[start_idx:end_idx]
+        # Fase 3: historial y evidencias en lote (solo si se pidió expandirlos)
+        if 'historial' in expand_campos:
+            historial_por_reporte = await asyncio.to_thread(obtener_historial_por_reporte, [r['id'] for r in reportes])
+            for reporte in reportes:
+                reporte['historial'] = historial_por_reporte.get(reporte['id'], [])
         
-        total_pages = (total + limit - 1) // limit
+        pagination = {
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+        if include_total:
+            pagination["total"] = total
         
         return {
             "success": True,
-            "data": reportes_paginados,
-            "pagination": {
-                "total": total,
-                "page": page,
-                "limit": limit,
-                "totalPages": total_pages
-            }
+            "data": reportes,
+            "pagination": pagination
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -319,110 +469,135 @@ async def registrar_avance(
     Registrar un nuevo avance en el reporte
     """
     try:
-        # Verificar que el reporte existe
         reporte_ref = db.collection('reconocimientos').document(reporteId)
-        reporte_doc = reporte_ref.get()
+        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
+        reporte_doc = await asyncio.to_thread(reporte_ref.get)
         
+        # Verificar que el reporte existe
         if not reporte_doc.exists:
             raise HTTPException(
                 status_code=404,
                 detail=f"No se encontró el reporte con ID: {reporteId}"
             )
         
-        # Obtener o crear seguimiento
-        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
-        seguimiento_doc = seguimiento_ref.get()
-        
-        if seguimiento_doc.exists:
-            seguimiento_data = seguimiento_doc.to_dict()
-            estado_actual = seguimiento_data.get('estado', 'notificado')
-            porcentaje_actual = seguimiento_data.get('porcentaje_avance', 0)
-        else:
-            estado_actual = 'notificado'
-            porcentaje_actual = 0
-        
-        # Validar transición de estado
-        if not validar_transicion_estado(estado_actual, avance.estado_nuevo):
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "code": "INVALID_STATE_TRANSITION",
-                    "message": f"No se puede cambiar de '{estado_actual}' a '{avance.estado_nuevo}'"
-                }
-            )
-        
-        # Validar que el porcentaje no retroceda
-        if avance.porcentaje < porcentaje_actual:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "code": "VALIDATION_ERROR",
-                    "message": f"El porcentaje no puede retroceder. Actual: {porcentaje_actual}%, Nuevo: {avance.porcentaje}%",
-                    "field": "porcentaje"
-                }
-            )
-        
-        # Validar porcentaje según estado
-        if not validar_porcentaje_estado(avance.estado_nuevo, avance.porcentaje):
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "code": "VALIDATION_ERROR",
-                    "message": f"Porcentaje inválido para el estado '{avance.estado_nuevo}'",
-                    "field": "porcentaje"
-                }
-            )
-        
-        # Crear registro de historial
         historial_id = str(uuid.uuid4())
-        fecha_actual = datetime.now(timezone.utc)
-        
-        historial_data = {
-            'reporte_id': reporteId,
-            'fecha': fecha_actual,
-            'autor': avance.autor,
-            'descripcion': avance.descripcion,
-            'estado_anterior': estado_actual,
-            'estado_nuevo': avance.estado_nuevo,
-            'porcentaje': avance.porcentaje,
-            'created_at': fecha_actual
-        }
-        
-        db.collection('historial_avance_reportes').document(historial_id).set(historial_data)
-        
-        # Guardar evidencias si existen
-        for evidencia in avance.evidencias:
-            evidencia_id = str(uuid.uuid4())
-            evidencia_data = {
-                'historial_avance_id': historial_id,
-                'tipo': evidencia.tipo,
-                'url': evidencia.url,
-                'descripcion': evidencia.descripcion,
-                'created_at': fecha_actual
-            }
-            db.collection('evidencias_avance_reportes').document(evidencia_id).set(evidencia_data)
         
-        # Actualizar seguimiento
-        seguimiento_update = {
-            'estado': avance.estado_nuevo,
-            'porcentaje_avance': avance.porcentaje,
-            'updated_at': fecha_actual
-        }
-        
-        if not seguimiento_doc.exists:
-            # Crear nuevo registro de seguimiento
-            seguimiento_update.update({
+        @firestore.transactional
+        def escribir_avance(transaction):
+            # El seguimiento se lee dentro de la transacción: si otro avance lo
+            # modifica antes del commit, Firestore reintenta con el estado nuevo
+            seguimiento_doc = seguimiento_ref.get(transaction=transaction)
+            actual = _datos_seguimiento(seguimiento_doc.to_dict() if seguimiento_doc.exists else None)
+            antes = actual if seguimiento_doc.exists else None
+            estado_actual = actual['estado']
+            porcentaje_actual = actual['porcentaje_avance']
+            
+            # Validar transición de estado
+            if not validar_transicion_estado(estado_actual, avance.estado_nuevo):
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "code": "INVALID_STATE_TRANSITION",
+                        "message": f"No se puede cambiar de '{estado_actual}' a '{avance.estado_nuevo}'"
+                    }
+                )
+            
+            # Validar que el porcentaje no retroceda
+            if avance.porcentaje < porcentaje_actual:
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "code": "VALIDATION_ERROR",
+                        "message": f"El porcentaje no puede retroceder. Actual: {porcentaje_actual}%, Nuevo: {avance.porcentaje}%",
+                        "field": "porcentaje"
+                    }
+                )
+            
+            # Validar porcentaje según estado
+            if not validar_porcentaje_estado(avance.estado_nuevo, avance.porcentaje):
+                raise HTTPException(
+                    status_code=400,
+                    detail={
+                        "code": "VALIDATION_ERROR",
+                        "message": f"Porcentaje inválido para el estado '{avance.estado_nuevo}'",
+                        "field": "porcentaje"
+                    }
+                )
+            
+            # Crear registro de historial
+            fecha_actual = datetime.now(timezone.utc)
+            
+            historial_data = {
                 'reporte_id': reporteId,
-                'prioridad': 'media',
-                'encargado': None,
-                'centro_gestor': None,
+                'fecha': fecha_actual,
+                'autor': avance.autor,
+                'descripcion': avance.descripcion,
+                'estado_anterior': estado_actual,
+                'estado_nuevo': avance.estado_nuevo,
+                'porcentaje': avance.porcentaje,
                 'created_at': fecha_actual
-            })
+            }
+            transaction.set(db.collection('historial_avance_reportes').document(historial_id), historial_data)
+            
+            # Guardar evidencias si existen
+            evidencias = []
+            for evidencia in avance.evidencias or []:
+                evidencia_data = {
+                    'historial_avance_id': historial_id,
+                    'tipo': evidencia.tipo,
+                    'url': evidencia.url,
+                    'descripcion': evidencia.descripcion,
+                    'created_at': fecha_actual
+                }
+                transaction.set(db.collection('evidencias_avance_reportes').document(str(uuid.uuid4())), evidencia_data)
+                evidencias.append({
+                    'tipo': evidencia.tipo,
+                    'url': evidencia.url,
+                    'descripcion': evidencia.descripcion
+                })
+            
+            # Actualizar seguimiento
+            seguimiento_update = {
+                'estado': avance.estado_nuevo,
+                'porcentaje_avance': avance.porcentaje,
+                'updated_at': fecha_actual
+            }
+            
+            if not seguimiento_doc.exists:
+                # Crear nuevo registro de seguimiento
+                seguimiento_update.update({
+                    'reporte_id': reporteId,
+                    'prioridad': 'media',
+                    'encargado': None,
+                    'centro_gestor': None,
+                    'created_at': fecha_actual
+                })
+            
+            transaction.set(seguimiento_ref, seguimiento_update, merge=True)
+            
+            # Contadores globales de estadísticas en el mismo commit
+            despues = {
+                **actual,
+                'estado': avance.estado_nuevo,
+                'porcentaje_avance': avance.porcentaje
+            }
+            registrar_cambio_estadisticas(transaction, antes, despues)
+            registrar_avance_tendencia(transaction, fecha_actual, estado_actual, avance.estado_nuevo)
+            return historial_data, evidencias, despues
         
-        seguimiento_ref.set(seguimiento_update, merge=True)
+        # El historial previo se lee mientras se confirma la transacción
+        (historial_data, evidencias, despues), historial_previo = await asyncio.gather(
+            asyncio.to_thread(escribir_avance, db.transaction()),
+            asyncio.to_thread(lambda: obtener_historial_por_reporte([reporteId]).get(reporteId, []))
+        )
         
-        # Obtener reporte actualizado completo
-        reporte_actualizado = await obtener_reporte_completo(reporteId)
+        # Construir el reporte actualizado con el estado local (sin volver a leerlo)
+        reporte_actualizado = reporte_doc.to_dict()
+        reporte_actualizado['id'] = reporteId
+        reporte_actualizado.update(despues)
+        reporte_actualizado['historial'] = [
+            {**historial_data, 'id': historial_id, 'evidencias': evidencias}
+        ] + [h for h in historial_previo if h['id'] != historial_id]
         
         return {
             "success": True,
@@ -465,10 +640,11 @@ async def asignar_encargado(
     Asignar encargado a un reporte
     """
     try:
-        # Verificar que el reporte existe
         reporte_ref = db.collection('reconocimientos').document(reporteId)
-        reporte_doc = reporte_ref.get()
+        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
+        reporte_doc = await asyncio.to_thread(reporte_ref.get)
         
+        # Verificar que el reporte existe
         if not reporte_doc.exists:
             raise HTTPException(
                 status_code=404,
@@ -476,28 +652,40 @@ async def asignar_encargado(
             )
         
         # Actualizar seguimiento
-        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
         fecha_actual = datetime.now(timezone.utc)
         
-        seguimiento_doc = seguimiento_ref.get()
-        
-        update_data = {
-            'encargado': data.encargado,
-            'centro_gestor': data.centro_gestor,
-            'updated_at': fecha_actual
-        }
-        
-        if not seguimiento_doc.exists:
-            # Crear nuevo registro si no existe
-            update_data.update({
-                'reporte_id': reporteId,
-                'estado': 'notificado',
-                'prioridad': 'media',
-                'porcentaje_avance': 0,
-                'created_at': fecha_actual
+        @firestore.transactional
+        def escribir_encargado(transaction):
+            # Leer el seguimiento dentro de la transacción para que los
+            # contadores partan del estado vigente al momento del commit
+            seguimiento_doc = seguimiento_ref.get(transaction=transaction)
+            
+            update_data = {
+                'encargado': data.encargado,
+                'centro_gestor': data.centro_gestor,
+                'updated_at': fecha_actual
+            }
+            
+            if not seguimiento_doc.exists:
+                # Crear nuevo registro si no existe
+                update_data.update({
+                    'reporte_id': reporteId,
+                    'estado': 'notificado',
+                    'prioridad': 'media',
+                    'porcentaje_avance': 0,
+                    'created_at': fecha_actual
+                })
+            
+            # Escribir el seguimiento y los contadores en un solo commit
+            antes = _datos_seguimiento(seguimiento_doc.to_dict()) if seguimiento_doc.exists else None
+            transaction.set(seguimiento_ref, update_data, merge=True)
+            registrar_cambio_estadisticas(transaction, antes, {
+                **(antes or _datos_seguimiento(None)),
+                'encargado': data.encargado,
+                'centro_gestor': data.centro_gestor
             })
         
-        seguimiento_ref.set(update_data, merge=True)
+        await asyncio.to_thread(escribir_encargado, db.transaction())
         
         return {
             "success": True,
@@ -506,7 +694,7 @@ async def asignar_encargado(
                 "id": reporteId,
                 "encargado": data.encargado,
                 "centro_gestor": data.centro_gestor,
-                "updated_at": fecha_actual.isoformat()
+                "updated_at": fecha_actual
             }
         }
         
@@ -547,10 +735,11 @@ async def cambiar_prioridad(
     Cambiar prioridad de un reporte
     """
     try:
-        # Verificar que el reporte existe
         reporte_ref = db.collection('reconocimientos').document(reporteId)
-        reporte_doc = reporte_ref.get()
+        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
+        reporte_doc = await asyncio.to_thread(reporte_ref.get)
         
+        # Verificar que el reporte existe
         if not reporte_doc.exists:
             raise HTTPException(
                 status_code=404,
@@ -558,28 +747,39 @@ async def cambiar_prioridad(
             )
         
         # Actualizar seguimiento
-        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
         fecha_actual = datetime.now(timezone.utc)
         
-        seguimiento_doc = seguimiento_ref.get()
-        
-        update_data = {
-            'prioridad': data.prioridad,
-            'updated_at': fecha_actual
-        }
-        
-        if not seguimiento_doc.exists:
-            # Crear nuevo registro si no existe
-            update_data.update({
-                'reporte_id': reporteId,
-                'estado': 'notificado',
-                'porcentaje_avance': 0,
-                'encargado': None,
-                'centro_gestor': None,
-                'created_at': fecha_actual
+        @firestore.transactional
+        def escribir_prioridad(transaction):
+            # Leer el seguimiento dentro de la transacción para que los
+            # contadores partan del estado vigente al momento del commit
+            seguimiento_doc = seguimiento_ref.get(transaction=transaction)
+            
+            update_data = {
+                'prioridad': data.prioridad,
+                'updated_at': fecha_actual
+            }
+            
+            if not seguimiento_doc.exists:
+                # Crear nuevo registro si no existe
+                update_data.update({
+                    'reporte_id': reporteId,
+                    'estado': 'notificado',
+                    'porcentaje_avance': 0,
+                    'encargado': None,
+                    'centro_gestor': None,
+                    'created_at': fecha_actual
+                })
+            
+            # Escribir el seguimiento y los contadores en un solo commit
+            antes = _datos_seguimiento(seguimiento_doc.to_dict()) if seguimiento_doc.exists else None
+            transaction.set(seguimiento_ref, update_data, merge=True)
+            registrar_cambio_estadisticas(transaction, antes, {
+                **(antes or _datos_seguimiento(None)),
+                'prioridad': data.prioridad
             })
         
-        seguimiento_ref.set(update_data, merge=True)
+        await asyncio.to_thread(escribir_prioridad, db.transaction())
         
         return {
             "success": True,
@@ -587,7 +787,7 @@ async def cambiar_prioridad(
             "data": {
                 "id": reporteId,
                 "prioridad": data.prioridad,
-                "updated_at": fecha_actual.isoformat()
+                "updated_at": fecha_actual
             }
         }
         
@@ -600,6 +800,19 @@ async def cambiar_prioridad(
         )
 
 
+_HISTORIAL_CACHE_CONTROL = "private, max-age=30"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Verifica si el header If-None-Match incluye el ETag actual (comparación débil)
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
 @router.get(
     "/{reporteId}/historial",
     summary="📜 Obtener Historial de Avances",
@@ -611,21 +824,50 @@ async def cambiar_prioridad(
 - Evidencias asociadas a cada avance
 - Cambios de estado y porcentaje
 
+### Cache:
+La respuesta incluye un header `ETag` derivado de la última actualización del
+seguimiento; si el cliente envía `If-None-Match` con el mismo valor se responde
+`304 Not Modified` sin volver a leer el historial.
+
 ### Ejemplo de uso:
 ```bash
 GET /api/v1/reportes/rep-123abc/historial
 ```
     """
 )
-async def get_historial_reporte(reporteId: str):
+async def get_historial_reporte(
+    reporteId: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Obtener historial de avances de un reporte
     """
     try:
-        # Verificar que el reporte existe
+        # Todo avance actualiza el seguimiento: su updated_at identifica la versión del historial
+        seguimiento_ref = db.collection('reportes_seguimiento').document(reporteId)
+        seguimiento_doc = await asyncio.to_thread(seguimiento_ref.get, ['updated_at'])
+        updated_at = seguimiento_doc.to_dict().get('updated_at') if seguimiento_doc.exists else None
+        
+        if updated_at is not None:
+            etag = f'W/"{updated_at.timestamp()}"'
+            headers = {"ETag": etag, "Cache-Control": _HISTORIAL_CACHE_CONTROL}
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+            response.headers.update(headers)
+        
+        # Leer reporte e historial en paralelo
         reporte_ref = db.collection('reconocimientos').document(reporteId)
-        reporte_doc = reporte_ref.get()
+        historial_ref = db.collection('historial_avance_reportes') \
+            .where('reporte_id', '==', reporteId) \
+            .order_by('fecha', direction=firestore.Query.DESCENDING)
         
+        reporte_doc, historial_docs = await asyncio.gather(
+            asyncio.to_thread(reporte_ref.get),
+            asyncio.to_thread(lambda: list(historial_ref.stream()))
+        )
+        
+        # Verificar que el reporte existe
         if not reporte_doc.exists:
             raise HTTPException(
                 status_code=404,
@@ -634,37 +876,16 @@ async def get_historial_reporte(reporteId: str):
         
         reporte_data = reporte_doc.to_dict()
         
-        # Obtener historial
-        historial_ref = db.collection('historial_avance_reportes') \
-            .where('reporte_id', '==', reporteId) \
-            .order_by('fecha', direction=firestore.Query.DESCENDING)
+        # Obtener evidencias de todos los avances en lote
+        evidencias_por_historial = await asyncio.to_thread(
+            obtener_evidencias_por_historial, [d.id for d in historial_docs]
+        )
         
-        historial_docs = historial_ref.stream()
         historial = []
-        
         for hist_doc in historial_docs:
             hist_data = hist_doc.to_dict()
             hist_data['id'] = hist_doc.id
-            
-            # Convertir fecha a ISO string
-            if 'fecha' in hist_data and hist_data['fecha']:
-                hist_data['fecha'] = hist_data['fecha'].isoformat()
-            
-            # Obtener evidencias
-            evidencias_ref = db.collection('evidencias_avance_reportes') \
-                .where('historial_avance_id', '==', hist_doc.id)
-            evidencias_docs = evidencias_ref.stream()
-            
-            evidencias = []
-            for ev_doc in evidencias_docs:
-                ev_data = ev_doc.to_dict()
-                evidencias.append({
-                    'tipo': ev_data.get('tipo'),
-                    'url': ev_data.get('url'),
-                    'descripcion': ev_data.get('descripcion')
-                })
-            
-            hist_data['evidencias'] = evidencias
+            hist_data['evidencias'] = evidencias_por_historial.get(hist_doc.id, [])
             historial.append(hist_data)
         
         return {
@@ -685,6 +906,305 @@ async def get_historial_reporte(reporteId: str):
         )
 
 
+async def _calcular_estadisticas(fecha_desde: Optional[str] = None, fecha_hasta: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Calcula las estadísticas de seguimiento con agregaciones de Firestore
+    """
+    # Consulta base con el filtro de fechas aplicado en Firestore
+    query = db.collection('reportes_seguimiento')
+    if fecha_desde:
+        query = query.where('created_at', '>=', _parse_fecha(fecha_desde))
+    if fecha_hasta:
+        query = query.where('created_at', '<', _parse_fecha(fecha_hasta) + timedelta(days=1))
+    
+    # Agregaciones en el servidor (count/sum), ejecutadas en paralelo
+    estados, prioridades = _ESTADOS, _PRIORIDADES
+    agregaciones = (
+        [query.count(), query.sum('porcentaje_avance')]
+        + [query.where('estado', '==', e).count() for e in estados]
+        + [query.where('prioridad', '==', p).count() for p in prioridades]
+    )
+    
+    # Desglose por centro gestor: solo se transfieren los dos campos necesarios
+    centros_query = query.select(['centro_gestor', 'estado'])
+    
+    resultados, centros_docs = await asyncio.gather(
+        asyncio.gather(*(asyncio.to_thread(_valor_agregacion, a) for a in agregaciones)),
+        asyncio.to_thread(lambda: list(centros_query.stream()))
+    )
+    
+    total_reportes = resultados[0]
+    suma_porcentajes = resultados[1] or 0
+    por_estado = dict(zip(estados, resultados[2:2 + len(estados)]))
+    por_prioridad = dict(zip(prioridades, resultados[2 + len(estados):]))
+    
+    # Los reportes sin estado/prioridad cuentan con el valor por defecto
+    por_estado['notificado'] += total_reportes - sum(por_estado.values())
+    por_prioridad['media'] += total_reportes - sum(por_prioridad.values())
+    
+    # Un contador plano por métrica, indexado por centro gestor
+    total_cg, resueltos_cg, en_proceso_cg = Counter(), Counter(), Counter()
+    for doc in centros_docs:
+        data = doc.to_dict()
+        centro_gestor = data.get('centro_gestor')
+        if centro_gestor:
+            total_cg[centro_gestor] += 1
+            destino = resueltos_cg if data.get('estado', 'notificado') in _ESTADOS_RESUELTOS else en_proceso_cg
+            destino[centro_gestor] += 1
+    
+    centros_gestores = {
+        nombre: {
+            'nombre': nombre,
+            'total': total,
+            'resueltos': resueltos_cg[nombre],
+            'en_proceso': en_proceso_cg[nombre]
+        }
+        for nombre, total in total_cg.items()
+    }
+    
+    return {
+        'total_reportes': total_reportes,
+        'suma_porcentajes': suma_porcentajes,
+        'por_estado': por_estado,
+        'por_prioridad': por_prioridad,
+        'por_centro_gestor': centros_gestores
+    }
+
+
+def _estadisticas_desde_contadores(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convierte el documento de contadores en el formato de _calcular_estadisticas
+    """
+    por_estado = {e: 0 for e in _ESTADOS}
+    por_estado.update(data.get('por_estado', {}))
+    por_prioridad = {p: 0 for p in _PRIORIDADES}
+    por_prioridad.update(data.get('por_prioridad', {}))
+    
+    centros_gestores = {}
+    for nombre, contadores in data.get('por_centro_gestor', {}).items():
+        if contadores.get('total', 0) > 0:
+            centros_gestores[nombre] = {
+                'nombre': nombre,
+                'total': contadores.get('total', 0),
+                'resueltos': contadores.get('resueltos', 0),
+                'en_proceso': contadores.get('en_proceso', 0)
+            }
+    
+    return {
+        'total_reportes': data.get('total_reportes', 0),
+        'suma_porcentajes': data.get('suma_porcentajes', 0),
+        'por_estado': por_estado,
+        'por_prioridad': por_prioridad,
+        'por_centro_gestor': centros_gestores
+    }
+
+
+def _contadores_desde_estadisticas(estadisticas: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construye el documento de contadores a partir de estadísticas calculadas
+    """
+    return {
+        'inicializado': True,
+        'total_reportes': estadisticas['total_reportes'],
+        'suma_porcentajes': estadisticas['suma_porcentajes'],
+        'por_estado': estadisticas['por_estado'],
+        'por_prioridad': estadisticas['por_prioridad'],
+        'por_centro_gestor': {
+            nombre: {k: v for k, v in centro.items() if k != 'nombre'}
+            for nombre, centro in estadisticas['por_centro_gestor'].items()
+        },
+        'updated_at': datetime.now(timezone.utc)
+    }
+
+
+# Intentos para guardar los contadores iniciales si cambian durante el cálculo
+_MAX_INTENTOS_INICIALIZACION = 3
+
+
+@firestore.transactional
+def _guardar_contadores_iniciales(transaction, contadores: Dict[str, Any], update_time_previo) -> Optional[Dict[str, Any]]:
+    """
+    Guarda los contadores calculados solo si el documento sigue como estaba
+    antes del cálculo. Todo cambio de seguimiento escribe en este documento,
+    así que un update_time distinto indica que el cálculo quedó desactualizado
+    (retorna None). Si otro proceso ya lo inicializó, retorna sus contadores
+    """
+    snap = _estadisticas_ref().get(transaction=transaction)
+    datos = snap.to_dict() if snap.exists else None
+    if datos and datos.get('inicializado'):
+        return datos
+    if snap.update_time != update_time_previo:
+        return None
+    transaction.set(_estadisticas_ref(), contadores)
+    return contadores
+
+
+async def _inicializar_estadisticas(stats_doc) -> Dict[str, Any]:
+    """
+    Calcula las estadísticas con agregaciones y guarda los contadores globales
+    (primera lectura). Reintenta si algún cambio de seguimiento se confirma
+    mientras se calcula
+    """
+    for _ in range(_MAX_INTENTOS_INICIALIZACION):
+        estadisticas = await _calcular_estadisticas()
+        guardados = await asyncio.to_thread(
+            _guardar_contadores_iniciales,
+            db.transaction(),
+            _contadores_desde_estadisticas(estadisticas),
+            stats_doc.update_time
+        )
+        if guardados is not None:
+            return _estadisticas_desde_contadores(guardados)
+        stats_doc = await asyncio.to_thread(_estadisticas_ref().get)
+    
+    # Sin guardar: la siguiente lectura vuelve a intentarlo
+    logger.warning("⚠️ Contadores de seguimiento modificados durante la inicialización")
+    return estadisticas
+
+
+# Días incluidos en la tendencia de /seguimiento/estadisticas
+_TENDENCIA_DIAS = 30
+# Versión de los contadores diarios: si cambia, la tendencia se recalcula
+# (la versión 2 agrega 'en_proceso')
+_TENDENCIA_VERSION = 2
+
+
+def _tendencia_ref():
+    """
+    Referencia al documento de control de la tendencia diaria
+    """
+    return db.collection('estadisticas_seguimiento').document('tendencia')
+
+
+def _tendencia_dia_ref(fecha_str: str):
+    """
+    Referencia al documento de contadores de un día (YYYY-MM-DD, UTC)
+    """
+    return _tendencia_ref().collection('diario').document(fecha_str)
+
+
+def _contadores_avance(estado_anterior: Optional[str], estado_nuevo: Optional[str]) -> Dict[str, int]:
+    """
+    Contadores de tendencia que aporta un avance
+    """
+    return {
+        'avances': 1,
+        # Nuevos: primera gestión de un reporte notificado
+        'nuevos': int(estado_anterior == 'notificado' and estado_nuevo != 'notificado'),
+        'resueltos': int(estado_nuevo in _ESTADOS_RESUELTOS),
+        # En proceso: avances que dejan el reporte en gestión (ni notificado ni resuelto)
+        'en_proceso': int(estado_nuevo not in _ESTADOS_RESUELTOS and estado_nuevo != 'notificado')
+    }
+
+
+def registrar_avance_tendencia(batch, fecha: datetime, estado_anterior: str, estado_nuevo: str):
+    """
+    Agrega al batch los incrementos del contador diario de tendencia para un avance
+    """
+    fecha_str = fecha.astimezone(timezone.utc).strftime('%Y-%m-%d')
+    cambios = {'fecha': fecha_str}
+    for campo, valor in _contadores_avance(estado_anterior, estado_nuevo).items():
+        if valor:
+            cambios[campo] = firestore.Increment(valor)
+    batch.set(_tendencia_dia_ref(fecha_str), cambios, merge=True)
+
+
+def _calcular_tendencia(desde: datetime) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcula los contadores diarios recorriendo el historial desde `desde`
+    """
+    historial_ref = db.collection('historial_avance_reportes') \
+        .where('fecha', '>=', desde) \
+        .order_by('fecha', direction=firestore.Query.ASCENDING) \
+        .select(['fecha', 'estado_nuevo', 'estado_anterior'])
+    
+    diarios = {}
+    for hist_doc in historial_ref.stream():
+        hist_data = hist_doc.to_dict()
+        fecha = hist_data.get('fecha')
+        if not fecha:
+            continue
+        
+        fecha_str = fecha.strftime('%Y-%m-%d')
+        dia = diarios.setdefault(fecha_str, {'fecha': fecha_str, 'avances': 0, 'nuevos': 0, 'resueltos': 0, 'en_proceso': 0})
+        for campo, valor in _contadores_avance(hist_data.get('estado_anterior'), hist_data.get('estado_nuevo')).items():
+            dia[campo] += valor
+    return diarios
+
+
+def _tendencia_inicializada(control: Optional[Dict[str, Any]]) -> bool:
+    """
+    Indica si el documento de control corresponde a contadores diarios vigentes
+    """
+    return bool(control) and control.get('version') == _TENDENCIA_VERSION
+
+
+@firestore.transactional
+def _guardar_tendencia_inicial(transaction, refs, diarios: Dict[str, Dict[str, Any]], update_times) -> Optional[Dict[str, Any]]:
+    """
+    Guarda los contadores diarios calculados solo si ningún día cambió desde la
+    lectura previa al cálculo (un avance concurrente los incrementa); en ese
+    caso retorna None. Si otro proceso ya inicializó la tendencia, retorna
+    sus contadores
+    """
+    snaps = list(transaction.get_all(refs))
+    por_id = {snap.id: snap.to_dict() for snap in snaps if snap.exists}
+    if _tendencia_inicializada(por_id.get('tendencia')):
+        return por_id
+    if {snap.id: snap.update_time for snap in snaps if snap.exists} != update_times:
+        return None
+    
+    for fecha_str, contadores in diarios.items():
+        transaction.set(_tendencia_dia_ref(fecha_str), contadores)
+    transaction.set(_tendencia_ref(), {
+        'inicializado': True,
+        'version': _TENDENCIA_VERSION,
+        'updated_at': datetime.now(timezone.utc)
+    })
+    return diarios
+
+
+async def obtener_tendencia() -> List[Dict[str, Any]]:
+    """
+    Tendencia diaria de los últimos días a partir de los contadores por día
+    (una sola lectura batch). La primera vez se calcula desde el historial y
+    se guardan los contadores en una transacción
+    """
+    hoy = datetime.now(timezone.utc).date()
+    dias = [(hoy - timedelta(days=i)).isoformat() for i in range(_TENDENCIA_DIAS, -1, -1)]
+    
+    refs = [_tendencia_ref()] + [_tendencia_dia_ref(dia) for dia in dias]
+    snaps = await asyncio.to_thread(lambda: list(db.get_all(refs)))
+    por_id = {snap.id: snap.to_dict() for snap in snaps if snap.exists}
+    
+    if _tendencia_inicializada(por_id.get('tendencia')):
+        diarios = por_id
+    else:
+        desde = datetime.fromisoformat(dias[0]).replace(tzinfo=timezone.utc)
+        for _ in range(_MAX_INTENTOS_INICIALIZACION):
+            update_times = {snap.id: snap.update_time for snap in snaps if snap.exists}
+            diarios = await asyncio.to_thread(_calcular_tendencia, desde)
+            guardados = await asyncio.to_thread(_guardar_tendencia_inicial, db.transaction(), refs, diarios, update_times)
+            if guardados is not None:
+                diarios = guardados
+                break
+            snaps = await asyncio.to_thread(lambda: list(db.get_all(refs)))
+        else:
+            # Sin guardar: la siguiente lectura vuelve a intentarlo
+            logger.warning("⚠️ Contadores de tendencia modificados durante la inicialización")
+    
+    return [
+        {
+            'fecha': dia,
+            'nuevos': diarios[dia].get('nuevos', 0),
+            'resueltos': diarios[dia].get('resueltos', 0),
+            'en_proceso': diarios[dia].get('en_proceso', 0)
+        }
+        for dia in dias
+        if diarios.get(dia, {}).get('avances', 0) > 0
+    ]
+
+
 @router.get(
     "/seguimiento/estadisticas",
     summary="📊 Obtener Estadísticas",
@@ -716,119 +1236,29 @@ async def get_estadisticas(
     Obtener estadísticas del sistema de seguimiento
     """
     try:
-        # Obtener todos los seguimientos
-        seguimientos_ref = db.collection('reportes_seguimiento')
-        seguimientos_docs = seguimientos_ref.stream()
-        
-        # Inicializar contadores
-        total_reportes = 0
-        suma_porcentajes = 0
-        por_estado = {
-            'notificado': 0,
-            'radicado': 0,
-            'en-gestion': 0,
-            'asignado': 0,
-            'en-proceso': 0,
-            'resuelto': 0,
-            'cerrado': 0
-        }
-        por_prioridad = {
-            'baja': 0,
-            'media': 0,
-            'alta': 0,
-            'urgente': 0
-        }
-        centros_gestores = {}
+        if fecha_desde or fecha_hasta:
+            # Con rango de fechas los contadores globales no aplican
+            estadisticas = await _calcular_estadisticas(fecha_desde, fecha_hasta)
+        else:
+            stats_doc = await asyncio.to_thread(_estadisticas_ref().get)
+            stats_data = stats_doc.to_dict() if stats_doc.exists else None
+            if stats_data and stats_data.get('inicializado'):
+                estadisticas = _estadisticas_desde_contadores(stats_data)
+            else:
+                # Primera lectura: calcular con agregaciones y guardar los contadores
+                estadisticas = await _inicializar_estadisticas(stats_doc)
         
-        for doc in seguimientos_docs:
-            data = doc.to_dict()
-            
-            # Aplicar filtro de fechas si está especificado
-            if fecha_desde or fecha_hasta:
-                created_at = data.get('created_at')
-                if created_at:
-                    if fecha_desde:
-                        fecha_desde_dt = datetime.fromisoformat(fecha_desde)
-                        if created_at < fecha_desde_dt:
-                            continue
-                    
-                    if fecha_hasta:
-                        fecha_hasta_dt = datetime.fromisoformat(fecha_hasta) + timedelta(days=1)
-                        if created_at >= fecha_hasta_dt:
-                            continue
-            
-            total_reportes += 1
-            
-            # Contadores de estado
-            estado = data.get('estado', 'notificado')
-            por_estado[estado] = por_estado.get(estado, 0) + 1
-            
-            # Contadores de prioridad
-            prioridad = data.get('prioridad', 'media')
-            por_prioridad[prioridad] = por_prioridad.get(prioridad, 0) + 1
-            
-            # Porcentaje promedio
-            porcentaje = data.get('porcentaje_avance', 0)
-            suma_porcentajes += porcentaje
-            
-            # Contadores por centro gestor
-            centro_gestor = data.get('centro_gestor')
-            if centro_gestor:
-                if centro_gestor not in centros_gestores:
-                    centros_gestores[centro_gestor] = {
-                        'nombre': centro_gestor,
-                        'total': 0,
-                        'resueltos': 0,
-                        'en_proceso': 0
-                    }
-                
-                centros_gestores[centro_gestor]['total'] += 1
-                
-                if estado == 'resuelto' or estado == 'cerrado':
-                    centros_gestores[centro_gestor]['resueltos'] += 1
-                else:
-                    centros_gestores[centro_gestor]['en_proceso'] += 1
+        total_reportes = estadisticas['total_reportes']
+        suma_porcentajes = estadisticas['suma_porcentajes']
+        por_estado = estadisticas['por_estado']
+        por_prioridad = estadisticas['por_prioridad']
+        centros_gestores = estadisticas['por_centro_gestor']
         
         # Calcular promedio
-        avance_promedio = (suma_porcentajes // total_reportes) if total_reportes > 0 else 0
+        avance_promedio = int(suma_porcentajes // total_reportes) if total_reportes > 0 else 0
         
         # Obtener tendencia de últimos 30 días
-        fecha_hace_30_dias = datetime.now(timezone.utc) - timedelta(days=30)
-        
-        historial_ref = db.collection('historial_avance_reportes') \
-            .where('fecha', '>=', fecha_hace_30_dias) \
-            .order_by('fecha', direction=firestore.Query.ASCENDING)
-        
-        historial_docs = historial_ref.stream()
-        
-        tendencia_dict = {}
-        for hist_doc in historial_docs:
-            hist_data = hist_doc.to_dict()
-            fecha = hist_data.get('fecha')
-            
-            if fecha:
-                fecha_str = fecha.strftime('%Y-%m-%d')
-                
-                if fecha_str not in tendencia_dict:
-                    tendencia_dict[fecha_str] = {
-                        'fecha': fecha_str,
-                        'nuevos': 0,
-                        'resueltos': 0,
-                        'en_proceso': 0
-                    }
-                
-                estado_nuevo = hist_data.get('estado_nuevo')
-                estado_anterior = hist_data.get('estado_anterior')
-                
-                # Contar nuevos (primera entrada)
-                if estado_anterior == 'notificado' and estado_nuevo != 'notificado':
-                    tendencia_dict[fecha_str]['nuevos'] += 1
-                
-                # Contar resueltos
-                if estado_nuevo in ['resuelto', 'cerrado']:
-                    tendencia_dict[fecha_str]['resueltos'] += 1
-        
-        tendencia = list(tendencia_dict.values())
+        tendencia = await obtener_tendencia()
         
         return {
             "success": True,
@@ -842,6 +1272,8 @@ async def get_estadisticas(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,33 @@
+"""
+Opciones de línea de comandos y hooks de sesión para los tests de la API Artefacto 360 DAGMA
+"""
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--use-emulator",
+        action="store_true",
+        default=False,
+        help="Ejecutar los tests marcados con 'emulator' contra el emulador de Firestore "
+             "(FIRESTORE_EMULATOR_HOST, por defecto 127.0.0.1:8200)"
+    )
+
+
+def pytest_collection_finish(session):
+    """
+    Precalienta la app antes del primer test: construye la pila de middlewares
+    y resuelve las rutas con una petición a /ping, para que el primer test de
+    cada clase no pague ese costo. Solo si algún test usa el cliente ASGI
+    (los tests contra el servidor en vivo no importan la app).
+    """
+    # Con pytest-xdist el proceso controlador no ejecuta tests: solo calientan los workers
+    if getattr(session.config.option, "numprocesses", None) and not hasattr(session.config, "workerinput"):
+        return
+    if not any("aclient" in getattr(item, "fixturenames", ()) for item in session.items):
+        return
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.get("/ping")
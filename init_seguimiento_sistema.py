@@ -1,82 +1,118 @@
 """
 Script de inicialización para el Sistema de Seguimiento de Reportes DAGMA
 Crea colecciones e índices en Firestore y genera datos de ejemplo (opcional)
+
+Ejecutar desde la raíz del repositorio:
+    python -m init_seguimiento_sistema
 """
-import os
 import sys
+import json
+import argparse
+import time
+import shutil
+import subprocess
+import traceback
+from multiprocessing.pool import ThreadPool
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-import uuid
+from pathlib import Path
 import random
 
-# Agregar el directorio padre al path para importar módulos
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
+from google.cloud.firestore_v1.field_path import FieldPath
+from firebase_admin import firestore
 
 from app.firebase_config import db
+from app.routes.seguimiento_routes import (
+    _datos_seguimiento, registrar_cambio_estadisticas, registrar_avance_tendencia
+)
+
+# Referencias a las colecciones (se resuelven una sola vez)
+RECON_COL = db.collection('reconocimientos')  # Colección base de reportes
+SEG_COL = db.collection('reportes_seguimiento')
+HIST_COL = db.collection('historial_avance_reportes')
+EVID_COL = db.collection('evidencias_avance_reportes')
+
+
+# Índices compuestos del sistema de seguimiento. El mismo archivo sirve para
+# `firebase deploy --only firestore:indexes`; se lee una sola vez al importar
+# (Firestore crea automáticamente los índices de un solo campo)
+ARCHIVO_INDICES = Path(__file__).with_name('firestore.indexes.json')
+with open(ARCHIVO_INDICES, encoding='utf-8') as f:
+    INDICES = json.load(f)['indexes']
+
+
+def crear_indice_gcloud(indice):
+    """
+    Crea un índice compuesto con `gcloud firestore indexes composite create`.
+    Se usa --async para no esperar a que Firestore termine de construirlo.
+    """
+    comando = [
+        "gcloud", "firestore", "indexes", "composite", "create",
+        f"--collection-group={indice['collectionGroup']}",
+        f"--project={db.project}",
+        "--async",
+    ]
+    for field in indice["fields"]:
+        comando.append(f"--field-config=field-path={field['fieldPath']},order={field['order'].lower()}")
+    
+    return subprocess.run(comando, capture_output=True, text=True)
 
 
-def crear_indices():
+def crear_indices(auto_index=False):
     """
     Información sobre índices necesarios en Firestore
-    Los índices se deben crear desde Firebase Console
+    Con auto_index=True los índices compuestos se crean con gcloud;
+    sin él solo se muestran para crearlos desde Firebase Console
     """
     print("📋 ÍNDICES NECESARIOS EN FIRESTORE")
     print("=" * 80)
-    print("\nNOTA: Los índices compuestos deben crearse manualmente desde Firebase Console")
-    print("      Ve a: Firestore Database > Indexes > Create Index\n")
     
-    indices = [
-        {
-            "collection": "reportes_seguimiento",
-            "fields": [
-                {"field": "estado", "order": "ASCENDING"},
-                {"field": "updated_at", "order": "DESCENDING"}
-            ]
-        },
-        {
-            "collection": "reportes_seguimiento",
-            "fields": [
-                {"field": "prioridad", "order": "ASCENDING"},
-                {"field": "updated_at", "order": "DESCENDING"}
-            ]
-        },
-        {
-            "collection": "reportes_seguimiento",
-            "fields": [
-                {"field": "encargado", "order": "ASCENDING"},
-                {"field": "updated_at", "order": "DESCENDING"}
-            ]
-        },
-        {
-            "collection": "historial_avance_reportes",
-            "fields": [
-                {"field": "reporte_id", "order": "ASCENDING"},
-                {"field": "fecha", "order": "DESCENDING"}
-            ]
-        },
-        {
-            "collection": "historial_avance_reportes",
-            "fields": [
-                {"field": "fecha", "order": "ASCENDING"}
-            ]
-        },
-        {
-            "collection": "evidencias_avance_reportes",
-            "fields": [
-                {"field": "historial_avance_id", "order": "ASCENDING"}
-            ]
-        }
-    ]
+    if auto_index and shutil.which("gcloud") is None:
+        print("\n⚠️  No se encontró gcloud en el PATH, se mostrarán los índices sin crearlos")
+        auto_index = False
+    
+    if auto_index:
+        print(f"\n🔧 Creando índices compuestos con gcloud (proyecto: {db.project})\n")
+    else:
+        print("\nNOTA: Los índices compuestos deben crearse manualmente desde Firebase Console")
+        print("      Ve a: Firestore Database > Indexes > Create Index")
+        print("      (o ejecuta este script con --auto-index para crearlos con gcloud,")
+        print(f"      o despliega {ARCHIVO_INDICES.name} con: firebase deploy --only firestore:indexes)\n")
     
-    for i, indice in enumerate(indices, 1):
-        print(f"\n{i}. Índice para colección '{indice['collection']}':")
+    for i, indice in enumerate(INDICES, 1):
+        print(f"\n{i}. Índice para colección '{indice['collectionGroup']}':")
         print(f"   Campos:")
         for field in indice["fields"]:
-            print(f"   - {field['field']}: {field['order']}")
+            print(f"   - {field['fieldPath']}: {field['order']}")
+        
+        if not auto_index:
+            continue
+        
+        resultado = crear_indice_gcloud(indice)
+        if resultado.returncode == 0:
+            print("   ✅ Creación solicitada")
+        elif "already exists" in resultado.stderr.lower():
+            print("   ✅ Ya existe")
+        else:
+            print(f"   ❌ Error creando índice: {resultado.stderr.strip()}")
     
     print("\n" + "=" * 80)
     print("✅ Configuración de índices completa\n")
 
 
+def _probar_coleccion(coleccion_ref):
+    """
+    Cuenta los documentos de una colección.
+    Retorna (nombre, conteo, error) para imprimir el resultado después.
+    """
+    try:
+        # Conteo en el servidor (agregación): no transfiere documentos
+        return coleccion_ref.id, coleccion_ref.count().get()[0][0].value, None
+    except Exception as e:
+        return coleccion_ref.id, None, e
+
+
 def verificar_colecciones():
     """
     Verifica que las colecciones principales existan
@@ -84,25 +120,85 @@ def verificar_colecciones():
     print("🔍 VERIFICANDO COLECCIONES")
     print("=" * 80)
     
-    colecciones_requeridas = [
-        'reconocimientos',  # Colección base de reportes
-        'reportes_seguimiento',
-        'historial_avance_reportes',
-        'evidencias_avance_reportes'
-    ]
+    colecciones_requeridas = [RECON_COL, SEG_COL, HIST_COL, EVID_COL]
     
-    for coleccion in colecciones_requeridas:
-        try:
-            # Intentar obtener 1 documento
-            docs = db.collection(coleccion).limit(1).stream()
-            count = len(list(docs))
+    # Las consultas son independientes: se lanzan en paralelo y los
+    # resultados se imprimen en el orden original
+    with ThreadPoolExecutor(max_workers=len(colecciones_requeridas)) as executor:
+        resultados = list(executor.map(_probar_coleccion, colecciones_requeridas))
+    
+    for coleccion, count, error in resultados:
+        if error is None:
             print(f"✅ Colección '{coleccion}': OK (documentos: {count if count > 0 else 'vacía'})")
-        except Exception as e:
-            print(f"⚠️  Colección '{coleccion}': No accesible - {str(e)}")
+        else:
+            print(f"⚠️  Colección '{coleccion}': No accesible - {str(error)}")
     
     print("\n" + "=" * 80 + "\n")
 
 
+# Reintentos ante errores transitorios de Firestore (backoff exponencial)
+_MAX_REINTENTOS = 4
+_BACKOFF_BASE = 0.5
+_MAX_HILOS_ESCRITURA = 10
+# Firestore admite como máximo 500 escrituras por WriteBatch
+_MAX_ESCRITURAS_BATCH = 500
+
+
+def con_reintentos(operacion):
+    """
+    Ejecuta `operacion` reintentando con backoff exponencial si Firestore
+    responde ServiceUnavailable.
+    """
+    for intento in range(_MAX_REINTENTOS):
+        try:
+            return operacion()
+        except ServiceUnavailable as e:
+            if intento == _MAX_REINTENTOS - 1:
+                raise
+            espera = _BACKOFF_BASE * (2 ** intento)
+            print(f"⚠️  Firestore no disponible ({str(e)}), reintentando en {espera:.1f}s...")
+            time.sleep(espera)
+
+
+def guardar_escrituras(escrituras):
+    """
+    Guarda una lista de (referencia, datos) con WriteBatch, en bloques de
+    hasta 500 escrituras (un solo commit para el seed de ejemplo).
+    Si Firestore rechaza un batch, sus documentos se guardan en paralelo.
+    """
+    for inicio in range(0, len(escrituras), _MAX_ESCRITURAS_BATCH):
+        bloque = escrituras[inicio:inicio + _MAX_ESCRITURAS_BATCH]
+        batch = db.batch()
+        for doc_ref, data in bloque:
+            batch.set(doc_ref, data)
+        
+        try:
+            con_reintentos(batch.commit)
+        except InvalidArgument as e:
+            print(f"⚠️  Batch rechazado ({str(e)}), guardando documentos en paralelo...")
+            with ThreadPool(processes=min(_MAX_HILOS_ESCRITURA, len(bloque))) as pool:
+                pool.map(
+                    lambda par: con_reintentos(lambda: par[0].set(par[1])),
+                    bloque
+                )
+
+
+@firestore.transactional
+def guardar_seguimiento(transaction, seguimiento_ref, seguimiento_data, avances=()):
+    """
+    Guarda un seguimiento y actualiza en la misma transacción los contadores
+    globales de /seguimiento/estadisticas (si el seguimiento ya existía, sus
+    valores anteriores se descuentan) y los contadores diarios de tendencia
+    de sus `avances`
+    """
+    snap = seguimiento_ref.get(transaction=transaction)
+    antes = _datos_seguimiento(snap.to_dict()) if snap.exists else None
+    transaction.set(seguimiento_ref, seguimiento_data)
+    registrar_cambio_estadisticas(transaction, antes, _datos_seguimiento(seguimiento_data))
+    for avance in avances:
+        registrar_avance_tendencia(transaction, avance['fecha'], avance['estado_anterior'], avance['estado_nuevo'])
+
+
 def crear_datos_ejemplo(crear_ejemplos=False):
     """
     Crea datos de ejemplo para pruebas (opcional)
@@ -115,22 +211,37 @@ def crear_datos_ejemplo(crear_ejemplos=False):
     print("=" * 80)
     
     try:
+        # Las escrituras se acumulan y se guardan en un solo commit al final
+        # (el seguimiento va aparte, en una transacción con sus contadores)
+        escrituras = []
+        
+        # Fechas base del seed (consistentes entre todos los documentos)
+        ahora = datetime.now(timezone.utc)
+        hace_5_dias = ahora - timedelta(days=5)
+        hace_4_dias = ahora - timedelta(days=4)
+        hace_2_dias = ahora - timedelta(days=2)
+        
         # 1. Crear un reconocimiento de ejemplo (si no existe ninguno)
-        reconocimientos_ref = db.collection('reconocimientos')
-        reconocimientos_count = len(list(reconocimientos_ref.limit(1).stream()))
+        # next(..., None) se detiene en el primer documento (si existe) y la
+        # proyección a __name__ trae solo el ID, sin fotos ni coordenadas
+        primer_reconocimiento = next(
+            RECON_COL.select([FieldPath.document_id()]).limit(1).stream(), None
+        )
         
         reporte_id = None
         
-        if reconocimientos_count == 0:
+        if primer_reconocimiento is None:
             print("\n1. Creando reconocimiento de ejemplo...")
-            reporte_id = str(uuid.uuid4())
+            # document() sin argumentos genera un ID automático de Firestore
+            reconocimiento_ref = RECON_COL.document()
+            reporte_id = reconocimiento_ref.id
             
             reconocimiento_data = {
                 'nombre_parque': 'Parque de los Poetas',
                 'tipo_intervencion': 'Mantenimiento',
                 'descripcion_intervencion': 'Poda de césped y limpieza general',
                 'direccion': 'Carrera 50 #13-10, Cali',
-                'timestamp': datetime.now(timezone.utc),
+                'timestamp': ahora,
                 'observaciones': 'Reconocimiento de ejemplo para pruebas',
                 'coordinates': {
                     'type': 'Point',
@@ -143,12 +254,11 @@ def crear_datos_ejemplo(crear_ejemplos=False):
                 ]
             }
             
-            db.collection('reconocimientos').document(reporte_id).set(reconocimiento_data)
-            print(f"   ✅ Reconocimiento creado: {reporte_id}")
+            escrituras.append((reconocimiento_ref, reconocimiento_data))
+            print(f"   ✅ Reconocimiento preparado: {reporte_id}")
         else:
             # Usar un reconocimiento existente
-            doc = next(reconocimientos_ref.limit(1).stream())
-            reporte_id = doc.id
+            reporte_id = primer_reconocimiento.id
             print(f"\n1. Usando reconocimiento existente: {reporte_id}")
         
         # 2. Crear seguimiento
@@ -160,19 +270,19 @@ def crear_datos_ejemplo(crear_ejemplos=False):
             'porcentaje_avance': 35,
             'encargado': 'Ing. Carlos Andrés Méndez Rojas',
             'centro_gestor': 'Secretaría de Infraestructura y Valorización',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=5),
-            'updated_at': datetime.now(timezone.utc)
+            'created_at': hace_5_dias,
+            'updated_at': ahora
         }
         
-        db.collection('reportes_seguimiento').document(reporte_id).set(seguimiento_data)
-        print(f"   ✅ Seguimiento creado")
+        # Se guarda aparte, en una transacción con los contadores de estadísticas
+        print(f"   ✅ Seguimiento preparado")
         
         # 3. Crear historial de avances
         print("\n3. Creando historial de avances...")
         
         avances = [
             {
-                'fecha': datetime.now(timezone.utc) - timedelta(days=5),
+                'fecha': hace_5_dias,
                 'autor': 'Sistema',
                 'descripcion': 'Reporte creado y notificado automáticamente por el sistema',
                 'estado_anterior': 'notificado',
@@ -180,7 +290,7 @@ def crear_datos_ejemplo(crear_ejemplos=False):
                 'porcentaje': 0
             },
             {
-                'fecha': datetime.now(timezone.utc) - timedelta(days=4),
+                'fecha': hace_4_dias,
                 'autor': 'María López García',
                 'descripcion': 'Se radicó ante la Secretaría de Infraestructura con radicado No. RAD-2026-001234. Se asignó número de seguimiento interno.',
                 'estado_anterior': 'notificado',
@@ -188,7 +298,7 @@ def crear_datos_ejemplo(crear_ejemplos=False):
                 'porcentaje': 25
             },
             {
-                'fecha': datetime.now(timezone.utc) - timedelta(days=2),
+                'fecha': hace_2_dias,
                 'autor': 'María López García',
                 'descripcion': 'Se coordinó visita técnica con el ingeniero Carlos Méndez de la Secretaría. La inspección está programada para revisar el estado del parque y determinar alcance de las intervenciones necesarias.',
                 'estado_anterior': 'radicado',
@@ -199,8 +309,8 @@ def crear_datos_ejemplo(crear_ejemplos=False):
         
         historial_ids = []
         for i, avance in enumerate(avances, 1):
-            historial_id = str(uuid.uuid4())
-            historial_ids.append(historial_id)
+            historial_ref = HIST_COL.document()
+            historial_ids.append(historial_ref.id)
             
             avance_data = {
                 'reporte_id': reporte_id,
@@ -213,8 +323,8 @@ def crear_datos_ejemplo(crear_ejemplos=False):
                 'created_at': avance['fecha']
             }
             
-            db.collection('historial_avance_reportes').document(historial_id).set(avance_data)
-            print(f"   ✅ Avance {i}/3 creado")
+            escrituras.append((historial_ref, avance_data))
+            print(f"   ✅ Avance {i}/3 preparado")
         
         # 4. Crear evidencias de ejemplo
         print("\n4. Creando evidencias de ejemplo...")
@@ -225,12 +335,23 @@ def crear_datos_ejemplo(crear_ejemplos=False):
             'tipo': 'documento',
             'url': 'https://docs.ejemplo.com/radicado-RAD-2026-001234.pdf',
             'descripcion': 'Radicado oficial No. RAD-2026-001234',
-            'created_at': datetime.now(timezone.utc) - timedelta(days=4)
+            'created_at': hace_4_dias
         }
         
-        evidencia_id = str(uuid.uuid4())
-        db.collection('evidencias_avance_reportes').document(evidencia_id).set(evidencia_data)
-        print(f"   ✅ Evidencia creada")
+        escrituras.append((EVID_COL.document(), evidencia_data))
+        print(f"   ✅ Evidencia preparada")
+        
+        # 5. Guardar todo en un solo commit
+        print(f"\n5. Guardando {len(escrituras)} documentos en un solo commit...")
+        guardar_escrituras(escrituras)
+        print(f"   ✅ Documentos guardados")
+        
+        # 6. Guardar el seguimiento actualizando los contadores globales
+        print("\n6. Guardando seguimiento y contadores de estadísticas...")
+        con_reintentos(lambda: guardar_seguimiento(
+            db.transaction(), SEG_COL.document(reporte_id), seguimiento_data, avances
+        ))
+        print(f"   ✅ Seguimiento y contadores guardados")
         
         print("\n" + "=" * 80)
         print(f"✅ Datos de ejemplo creados exitosamente")
@@ -241,7 +362,6 @@ def crear_datos_ejemplo(crear_ejemplos=False):
         
     except Exception as e:
         print(f"\n❌ Error creando datos de ejemplo: {str(e)}")
-        import traceback
         traceback.print_exc()
 
 
@@ -292,10 +412,31 @@ El Sistema de Seguimiento de Reportes está listo para usar.
     print("=" * 80 + "\n")
 
 
-def main():
+def parsear_argumentos(argv=None):
+    """
+    Opciones de línea de comandos para ejecutar el script sin interacción (CI)
+    """
+    parser = argparse.ArgumentParser(
+        description="Inicialización del Sistema de Seguimiento de Reportes DAGMA"
+    )
+    parser.add_argument('--skip-verify', action='store_true',
+                        help="No verificar las colecciones (evita lecturas en Firestore)")
+    parser.add_argument('--auto-index', action='store_true',
+                        help="Crear los índices compuestos con gcloud")
+    seed = parser.add_mutually_exclusive_group()
+    seed.add_argument('--auto-seed', action='store_true',
+                      help="Crear datos de ejemplo sin preguntar")
+    seed.add_argument('--skip-seed', action='store_true',
+                      help="No crear datos de ejemplo (sin preguntar)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Función principal de inicialización
     """
+    args = parsear_argumentos(argv)
+    
     print("\n")
     print("=" * 80)
     print("  INICIALIZACIÓN DEL SISTEMA DE SEGUIMIENTO DE REPORTES DAGMA")
@@ -305,22 +446,31 @@ def main():
     
     try:
         # 1. Verificar colecciones
-        verificar_colecciones()
-        
-        # 2. Mostrar información de índices
-        crear_indices()
+        if args.skip_verify:
+            print("⏭️  Omitiendo verificación de colecciones\n")
+        else:
+            verificar_colecciones()
         
-        # 3. Preguntar si crear datos de ejemplo
-        print("💡 ¿Deseas crear datos de ejemplo para pruebas?")
-        print("   Esto creará:")
-        print("   - 1 reconocimiento de ejemplo")
-        print("   - 1 registro de seguimiento")
-        print("   - 3 avances en el historial")
-        print("   - 1 evidencia de ejemplo")
-        print()
-        respuesta = input("   Crear datos de ejemplo? (s/N): ").strip().lower()
+        # 2. Mostrar (o crear con --auto-index) los índices
+        crear_indices(auto_index=args.auto_index)
         
-        crear_ejemplos = respuesta in ['s', 'si', 'sí', 'y', 'yes']
+        # 3. Crear datos de ejemplo (por flag, o preguntando si hay terminal)
+        if args.auto_seed or args.skip_seed:
+            crear_ejemplos = args.auto_seed
+        elif not sys.stdin.isatty():
+            # Sin terminal (CI, pipelines) no se bloquea esperando input()
+            crear_ejemplos = False
+        else:
+            print("💡 ¿Deseas crear datos de ejemplo para pruebas?")
+            print("   Esto creará:")
+            print("   - 1 reconocimiento de ejemplo")
+            print("   - 1 registro de seguimiento")
+            print("   - 3 avances en el historial")
+            print("   - 1 evidencia de ejemplo")
+            print()
+            respuesta = input("   Crear datos de ejemplo? (s/N): ").strip().lower()
+            
+            crear_ejemplos = respuesta in ['s', 'si', 'sí', 'y', 'yes']
         
         if crear_ejemplos:
             crear_datos_ejemplo(True)
@@ -334,7 +484,6 @@ def main():
         
     except Exception as e:
         print(f"\n❌ Error durante la inicialización: {str(e)}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
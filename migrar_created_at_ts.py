@@ -0,0 +1,58 @@
+"""
+Script de migración: agrega el campo `created_at_ts` (Timestamp nativo de Firestore)
+a los reconocimientos de 'reconocimientos_dagma' que solo tienen `created_at` (ISO)
+
+Los endpoints de estadísticas y reportes filtran y ordenan por `created_at_ts`,
+por lo que los reconocimientos anteriores deben migrarse una sola vez.
+"""
+import sys
+from datetime import datetime
+
+from app.firebase_config import get_db
+
+
+def migrar_created_at_ts():
+    """
+    Recorre los reconocimientos sin `created_at_ts` y lo completa a partir de `created_at`
+    """
+    db = get_db()
+    reconocimientos_ref = db.collection('reconocimientos_dagma')
+    
+    print("🔄 MIGRANDO created_at -> created_at_ts")
+    print("=" * 80)
+    
+    migrados = 0
+    omitidos = 0
+    bulk_writer = db.bulk_writer()
+    
+    # Solo se transfieren los campos necesarios
+    for doc in reconocimientos_ref.select(['created_at', 'created_at_ts']).stream():
+        data = doc.to_dict()
+        if data.get('created_at_ts') is not None:
+            continue
+        
+        created_at = data.get('created_at')
+        try:
+            created_at_ts = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            print(f"⚠️  Reconocimiento {doc.id}: created_at inválido ({created_at!r}), omitido")
+            omitidos += 1
+            continue
+        
+        bulk_writer.update(doc.reference, {'created_at_ts': created_at_ts})
+        migrados += 1
+    
+    bulk_writer.close()
+    
+    print(f"\n✅ Reconocimientos migrados: {migrados}")
+    if omitidos:
+        print(f"⚠️  Reconocimientos omitidos: {omitidos}")
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    try:
+        migrar_created_at_ts()
+    except Exception as e:
+        print(f"\n❌ Error durante la migración: {str(e)}")
+        sys.exit(1)
@@ -1,170 +1,484 @@
 """
 Test completo para todos los endpoints de la API Artefacto 360 DAGMA
 """
+import os
 import pytest
+import pytest_asyncio
+import asyncio
 import json
 import io
-from fastapi.testclient import TestClient
+import math
+import orjson
+import httpx
+from httpx import AsyncClient, ASGITransport
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timezone
+from types import SimpleNamespace, MappingProxyType
+from typing import Final
+from firebase_admin import auth as firebase_auth
+from google.auth.credentials import AnonymousCredentials
+from boto3.exceptions import S3UploadFailedError
+from google.cloud import firestore
+from google.cloud.firestore_v1.client import Client as FirestoreClient
+from google.cloud.firestore_v1.collection import CollectionReference
+from google.cloud.firestore_v1.document import DocumentReference
 
 # Importar la aplicación
 from app.main import app
+from app.firebase_config import get_db, get_async_db
+from app.routes.artefacto_360_routes import (
+    validate_coordinates, validate_photo_file, _encode_cursor,
+    _persist_reconocimiento
+)
+from app.routes.seguimiento_routes import (
+    obtener_tendencia, validar_transicion_estado, registrar_cambio_estadisticas, _datos_seguimiento,
+    _inicializar_estadisticas
+)
 
-# Cliente de prueba
-client = TestClient(app)
+# ==================== CONSTANTES ====================#
+# Headers y coordenadas compartidos por los tests (solo lectura; httpx no los modifica)
+_JSON_HEADERS: Final = MappingProxyType({"Content-Type": "application/json"})
+_AUTH_HEADERS: Final = MappingProxyType({"Authorization": "Bearer mock-token"})
+_INVALID_AUTH_HEADERS: Final = MappingProxyType({"Authorization": "Bearer invalid-token"})
+_VALID_AUTH_TOKEN: Final = "Bearer mock-valid-token-123"
+# Error que lanza Firebase Auth con un token inválido (una sola instancia reutilizada)
+_INVALID_TOKEN_ERR: Final = firebase_auth.InvalidIdTokenError("Invalid token")
+
+# validate_coordinates exige listas, por eso no se usan tuplas
+_POINT_COORDS: Final = [-76.5225, 3.4516]
+_POINT_COORDS_STR: Final = '[-76.5225, 3.4516]'
+_INVALID_POINT_LON: Final = [-200, 3.4516]
+_INVALID_POINT_LAT: Final = [-76.5225, 100]
+_LINESTRING_COORDS: Final = [[-76.5225, 3.4516], [-76.5226, 3.4517]]
+_POLYGON_COORDS: Final = [[
+    [-76.5225, 3.4516],
+    [-76.5226, 3.4517],
+    [-76.5227, 3.4518],
+    [-76.5225, 3.4516]  # Cerrar el polígono
+]]
+
+
+# ==================== PAYLOADS JSON ====================#
+# Cuerpos serializados una sola vez con orjson; se envían con content= + _JSON_HEADERS
+_LOGIN_BODY = orjson.dumps({"id_token": "mock-valid-token"})
+_LOGIN_INVALID_BODY = orjson.dumps({"id_token": "invalid-token"})
+_REGISTER_BODY = orjson.dumps({
+    "email": "newuser@example.com",
+    "password": "SecurePass123!",
+    "full_name": "New User",
+    "cellphone": "1234567890",
+    "grupo": "Centro Test"
+})
+_REGISTER_INVALID_EMAIL_BODY = orjson.dumps({
+    "email": "invalid-email",
+    "password": "SecurePass123!",
+    "full_name": "New User",
+    "cellphone": "1234567890",
+    "grupo": "Centro Test"
+})
+_ROLES_BODY = orjson.dumps({"roles": ["admin", "editor"]})
+_PERMISSION_BODY = orjson.dumps({
+    "permission": "edit:documents",
+    "expires_at": "2026-12-31T23:59:59Z"
+})
+_INTEGRATION_REGISTER_BODY = orjson.dumps({
+    "email": "integration@example.com",
+    "password": "SecurePass123!",
+    "full_name": "Integration Test User",
+    "cellphone": "9876543210",
+    "grupo": "Centro Integration"
+})
+_INTEGRATION_LOGIN_BODY = orjson.dumps({"id_token": "mock-token-for-new-user"})
+_PRESIGNED_INIT_BODY = orjson.dumps({
+    "photos": [{"filename": "foto.jpg", "content_type": "image/jpeg", "size": 1024}]
+})
+_AVANCE_RADICADO_BODY = orjson.dumps({
+    "estado_nuevo": "radicado",
+    "descripcion": "Se radicó el reporte ante la entidad",
+    "autor": "María López García",
+    "porcentaje": 10,
+    "evidencias": [{"tipo": "foto", "url": "https://s3/evidencia.jpg"}]
+})
 
 
 # ==================== FIXTURES ====================#
+@pytest.fixture(scope="session")
+def event_loop():
+    """Event loop compartido por toda la sesión (requerido por aclient)"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def aclient():
+    """Cliente async de prueba compartido por toda la sesión (ASGI en proceso, sin hilos)"""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+def _configurar_mock_db(mock_db):
+    """Valores por defecto del mock de Firestore (se aplican antes de cada test)"""
+    # Mock de colección y documentos (con spec: atributos inexistentes fallan)
+    mock_collection = Mock(spec=CollectionReference)
+    mock_doc_ref = Mock(spec=DocumentReference, id='test-id')
+    mock_doc = _snapshot('test-id', {
+        'id': 'test-id',
+        'name': 'Test Parque',
+        'location': 'Test Location'
+    })
+    
+    mock_collection.stream.return_value = [mock_doc]
+    mock_collection.document.return_value = mock_doc_ref
+    mock_db.collection.return_value = mock_collection
+
+
+@pytest.fixture(scope="session")
+def _firebase_db_mock():
+    """Mock de Firestore creado una sola vez por sesión"""
+    return MagicMock(spec=FirestoreClient)
+
+
 @pytest.fixture
-def mock_firebase_db():
-    """Mock de Firebase Firestore"""
-    with patch('app.firebase_config.db') as mock_db:
-        # Mock de colección y documentos
-        mock_collection = Mock()
-        mock_doc = Mock()
-        mock_doc.to_dict.return_value = {
-            'id': 'test-id',
-            'name': 'Test Parque',
-            'location': 'Test Location'
-        }
-        mock_doc.id = 'test-id'
-        
-        mock_collection.stream.return_value = [mock_doc]
-        mock_collection.document.return_value = mock_doc
-        mock_db.collection.return_value = mock_collection
+def mock_firebase_db(_firebase_db_mock):
+    """Mock de Firebase Firestore (reutilizado y reiniciado en cada test)"""
+    mock_db = _firebase_db_mock
+    mock_db.reset_mock(return_value=True, side_effect=True)
+    _configurar_mock_db(mock_db)
+    
+    # firebase_routes enlaza `db` al importarse (from app.firebase_config import db)
+    with patch('app.firebase_config.db', new=mock_db), \
+            patch('app.routes.firebase_routes.db', new=mock_db):
+        # Inyectar el mock en los endpoints que usan Depends(get_db)
+        app.dependency_overrides[get_db] = lambda: mock_db
         yield mock_db
+        app.dependency_overrides.pop(get_db, None)
+
+
+def _snapshot(doc_id=None, data=None, exists=True):
+    """DocumentSnapshot de prueba (solo datos); to_dict retorna una copia nueva"""
+    data = data or {}
+    return SimpleNamespace(id=doc_id, exists=exists, update_time=None, to_dict=lambda: dict(data))
+
+
+def _transaccion(mock_db):
+    """Transacción de prueba de `mock_db`: un solo intento, commit sin red"""
+    transaction = mock_db.transaction.return_value
+    transaction._max_attempts = 1
+    transaction._read_only = False
+    return transaction
+
+
+def _upload(filename, content_type, size=None):
+    """UploadFile de prueba (solo los atributos que lee validate_photo_file)"""
+    return SimpleNamespace(filename=filename, content_type=content_type, size=size)
+
+
+def assert_json(response, status_code=200, **subset):
+    """Verifica el status, parsea el JSON una vez y compara los campos esperados"""
+    assert response.status_code == status_code
+    data = response.json()
+    assert subset.items() <= data.items(), {key: data.get(key) for key in subset}
+    return data
+
+
+class _AsyncStream:
+    """Iterador asíncrono que imita query.stream() del cliente asíncrono"""
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+# Proyecto usado contra el emulador (no necesita credenciales reales)
+_EMULATOR_PROJECT = "dagma-85aad"
+
+
+@pytest.fixture(scope="session")
+def firestore_emulator(pytestconfig):
+    """Cliente de Firestore contra el emulador, creado una sola vez por sesión (--use-emulator)"""
+    if not pytestconfig.getoption("--use-emulator"):
+        pytest.skip("Requiere --use-emulator y un emulador de Firestore en ejecución")
+
+    host_anterior = os.environ.get("FIRESTORE_EMULATOR_HOST")
+    os.environ["FIRESTORE_EMULATOR_HOST"] = host_anterior or "127.0.0.1:8200"
+    client = firestore.Client(project=_EMULATOR_PROJECT, credentials=AnonymousCredentials())
+    yield client
+    client.close()
+    if host_anterior is None:
+        os.environ.pop("FIRESTORE_EMULATOR_HOST", None)
 
 
 @pytest.fixture
-def mock_firebase_auth():
-    """Mock de Firebase Auth"""
-    with patch('app.firebase_config.auth_client') as mock_auth:
-        # Mock de usuario
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-123'
-        mock_user.email = 'test@example.com'
-        mock_user.display_name = 'Test User'
-        mock_user.email_verified = True
-        mock_user.disabled = False
-        mock_user.user_metadata = Mock()
-        mock_user.user_metadata.creation_timestamp = 1609459200000
-        
-        # Mock de token decodificado
-        mock_decoded_token = {
-            'uid': 'test-uid-123',
-            'email': 'test@example.com'
-        }
-        
-        mock_auth.verify_id_token.return_value = mock_decoded_token
-        mock_auth.get_user.return_value = mock_user
-        mock_auth.create_user.return_value = mock_user
-        mock_auth.create_custom_token.return_value = b'mock-custom-token'
-        mock_auth.list_users.return_value.iterate_all.return_value = [mock_user]
-        
+def emulator_db(firestore_emulator):
+    """Firestore del emulador inyectado en los endpoints; los datos se borran después de cada test"""
+    with patch('app.firebase_config.db', new=firestore_emulator):
+        app.dependency_overrides[get_db] = lambda: firestore_emulator
+        yield firestore_emulator
+        app.dependency_overrides.pop(get_db, None)
+
+    # Borrar todos los documentos del emulador (endpoint propio del emulador)
+    httpx.delete(
+        f"http://{os.environ['FIRESTORE_EMULATOR_HOST']}/emulator/v1/projects/"
+        f"{_EMULATOR_PROJECT}/databases/(default)/documents"
+    ).raise_for_status()
+
+
+@pytest.fixture
+def mock_firebase_async_db():
+    """Mock del cliente asíncrono de Firestore"""
+    mock_db = Mock()
+    mock_doc = _snapshot('test-id', {
+        'name': 'Test Parque',
+        'location': 'Test Location'
+    })
+
+    mock_db.collection.return_value.stream.side_effect = lambda: _AsyncStream([mock_doc])
+
+    # Inyectar el mock en los endpoints que usan Depends(get_async_db)
+    app.dependency_overrides[get_async_db] = lambda: mock_db
+    yield mock_db
+    app.dependency_overrides.pop(get_async_db, None)
+
+
+@pytest.fixture(scope="session")
+def _auth_routes_auth_mock():
+    """Mock con spec de firebase_admin.auth para auth_routes, creado una sola vez por sesión"""
+    return MagicMock(spec=firebase_auth)
+
+
+@pytest.fixture(scope="session")
+def _auth_routes_db_mock():
+    """Mock con spec del cliente de Firestore para auth_routes, creado una sola vez por sesión"""
+    return MagicMock(spec=FirestoreClient)
+
+
+@pytest.fixture
+def mock_auth(_auth_routes_auth_mock, monkeypatch):
+    """auth_client de auth_routes reemplazado por el mock de sesión (reiniciado en cada test)"""
+    _auth_routes_auth_mock.reset_mock(return_value=True, side_effect=True)
+    monkeypatch.setattr('app.routes.auth_routes.auth_client', _auth_routes_auth_mock)
+    return _auth_routes_auth_mock
+
+
+@pytest.fixture
+def mock_db(_auth_routes_db_mock, monkeypatch):
+    """db de auth_routes reemplazado por el mock de sesión (reiniciado en cada test)"""
+    _auth_routes_db_mock.reset_mock(return_value=True, side_effect=True)
+    monkeypatch.setattr('app.routes.auth_routes.db', _auth_routes_db_mock)
+    return _auth_routes_db_mock
+
+
+def _crear_mock_user(**overrides):
+    """Usuario de Firebase Auth de prueba (solo datos, sin la maquinaria de Mock)"""
+    datos = {
+        'uid': 'test-uid-123',
+        'email': 'test@example.com',
+        'display_name': 'Test User',
+        'email_verified': True,
+        'disabled': False,
+        'user_metadata': SimpleNamespace(creation_timestamp=1609459200000)
+    }
+    datos.update(overrides)
+    return SimpleNamespace(**datos)
+
+
+@pytest.fixture
+def make_mock_user():
+    """Fábrica de usuarios de prueba: make_mock_user(uid=..., email=...)"""
+    return _crear_mock_user
+
+
+def _configurar_mock_auth(mock_auth):
+    """Valores por defecto del mock de Firebase Auth (se aplican antes de cada test)"""
+    # Mock de usuario
+    mock_user = _crear_mock_user()
+    
+    # Mock de token decodificado
+    mock_decoded_token = {
+        'uid': 'test-uid-123',
+        'email': 'test@example.com'
+    }
+    
+    mock_auth.verify_id_token.return_value = mock_decoded_token
+    mock_auth.get_user.return_value = mock_user
+    mock_auth.create_user.return_value = mock_user
+    mock_auth.create_custom_token.return_value = b'mock-custom-token'
+    mock_auth.list_users.return_value.iterate_all.return_value = [mock_user]
+
+
+@pytest.fixture(scope="session")
+def _firebase_auth_mock():
+    """Mock de Firebase Auth creado una sola vez por sesión"""
+    return MagicMock(spec=firebase_auth)
+
+
+@pytest.fixture
+def mock_firebase_auth(_firebase_auth_mock):
+    """Mock de Firebase Auth (reutilizado y reiniciado en cada test)"""
+    mock_auth = _firebase_auth_mock
+    mock_auth.reset_mock(return_value=True, side_effect=True)
+    _configurar_mock_auth(mock_auth)
+    
+    with patch('app.firebase_config.auth_client', new=mock_auth):
         yield mock_auth
 
 
+@pytest.fixture(scope="session", autouse=True)
+def _aws_env():
+    """Variables de entorno de AWS de prueba, aplicadas una sola vez por sesión"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('AWS_ACCESS_KEY_ID', 'test-key')
+        mp.setenv('AWS_SECRET_ACCESS_KEY', 'test-secret')
+        mp.setenv('S3_BUCKET_NAME', '360-dagma-photos')
+        yield
+
+
+@pytest.fixture(scope="session")
+def _s3_client_mock():
+    """Mock de cliente S3 creado una sola vez por sesión"""
+    return Mock()
+
+
 @pytest.fixture
-def mock_s3_client():
-    """Mock de cliente S3"""
-    with patch('app.routes.artefacto_360_routes.get_s3_client') as mock_get_client:
-        mock_client = Mock()
-        mock_client.upload_fileobj.return_value = None
-        mock_client.delete_object.return_value = None
-        mock_client.list_objects_v2.return_value = {
-            'Contents': [
-                {'Key': 'reconocimientos/test-id/photo1.jpg'}
-            ]
-        }
-        mock_get_client.return_value = mock_client
+def mock_s3_client(_s3_client_mock):
+    """Mock de cliente S3 (reutilizado y reiniciado en cada test)"""
+    mock_client = _s3_client_mock
+    mock_client.reset_mock(return_value=True, side_effect=True)
+    mock_client.upload_fileobj.return_value = None
+    mock_client.delete_object.return_value = None
+    mock_client.list_objects_v2.return_value = {
+        'Contents': [
+            {'Key': 'reconocimientos/test-id/photo1.jpg'}
+        ]
+    }
+    
+    with patch('app.routes.artefacto_360_routes.get_s3_client', return_value=mock_client):
         yield mock_client
 
 
 @pytest.fixture
 def valid_auth_token():
     """Token de autenticación válido para pruebas"""
-    return "Bearer mock-valid-token-123"
+    return _VALID_AUTH_TOKEN
 
 
 @pytest.fixture
-def sample_image_file():
+def sample_image_file(photo_bio):
     """Archivo de imagen de muestra"""
-    # Crear un archivo de imagen falso
-    image_content = b"fake-image-content"
-    return ("test_photo.jpg", io.BytesIO(image_content), "image/jpeg")
+    return ("test_photo.jpg", photo_bio, "image/jpeg")
+
+
+@pytest.fixture(scope="session")
+def sample_photo_bytes():
+    """Contenido de imagen falso compartido por los tests de reconocimiento"""
+    return b"fake-image-content"
+
+
+@pytest.fixture(scope="session")
+def _photo_bio(sample_photo_bytes):
+    """Buffer de la imagen falsa creado una sola vez por sesión"""
+    return io.BytesIO(sample_photo_bytes)
+
+
+@pytest.fixture
+def photo_bio(_photo_bio):
+    """Buffer compartido de la imagen falsa, rebobinado para cada test"""
+    _photo_bio.seek(0)
+    return _photo_bio
+
+
+@pytest.fixture(scope="session")
+def base_form_data():
+    """Formulario base de reconocimiento (solo lectura; copiar con {**base_form_data, ...})"""
+    return MappingProxyType({
+        'nombre_parque': 'Parque del Ingenio',
+        'tipo_intervencion': 'Mantenimiento',
+        'descripcion_intervencion': 'Poda de árboles',
+        'direccion': 'Calle 5 #10-20',
+        'coordinates_type': 'Point',
+        'coordinates_data': _POINT_COORDS_STR
+    })
 
 
 # ==================== TESTS: DEFAULT ROUTES ====================#
 class TestDefaultRoutes:
     """Tests para rutas por defecto"""
     
-    def test_root_endpoint(self):
+    async def test_root_endpoint(self, aclient):
         """Test GET /"""
-        response = client.get("/")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["message"] == "API Artefacto 360 DAGMA"
-        assert data["version"] == "1.0.0"
-        assert data["status"] == "active"
-        assert data["documentation"] == "/docs"
+        assert_json(
+            await aclient.get("/"),
+            message="API Artefacto 360 DAGMA",
+            version="1.0.0",
+            status="active",
+            documentation="/docs"
+        )
 
 
 # ==================== TESTS: GENERAL ROUTES ====================#
+# GET simples (ruta, campos esperados) verificados en un solo lote concurrente
+_SMOKE_GETS = (
+    ("/", {"status": "active"}),
+    ("/ping", {"status": "ok"}),
+    ("/cors-test", {"cors": "enabled"}),
+    ("/test/utf8", {"test": "UTF-8"}),
+    ("/health", {"status": "healthy"}),
+)
+
+
 class TestGeneralRoutes:
     """Tests para rutas generales"""
     
-    def test_ping_endpoint(self):
+    async def test_get_smoke(self, aclient):
+        """Test de humo: todos los GET simples despachados con asyncio.gather"""
+        responses = await asyncio.gather(*(aclient.get(path) for path, _ in _SMOKE_GETS))
+        for (path, expected), response in zip(_SMOKE_GETS, responses):
+            assert response.status_code == 200, path
+            data = response.json()
+            assert {key: data.get(key) for key in expected} == expected, path
+    
+    async def test_ping_endpoint(self, aclient):
         """Test GET /ping"""
-        response = client.get("/ping")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["status"] == "ok"
+        data = assert_json(await aclient.get("/ping"), status="ok")
         assert "Pong" in data["message"]
-        assert "timestamp" in data
-        assert "utf8_test" in data
+        assert {"timestamp", "utf8_test"} <= data.keys()
     
-    def test_cors_test_endpoint(self):
+    async def test_cors_test_endpoint(self, aclient):
         """Test GET /cors-test"""
-        response = client.get("/cors-test")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["cors"] == "enabled"
-        assert data["message"] == "CORS configurado correctamente"
+        assert_json(
+            await aclient.get("/cors-test"),
+            cors="enabled",
+            message="CORS configurado correctamente"
+        )
     
-    def test_cors_test_options(self):
+    async def test_cors_test_options(self, aclient):
         """Test OPTIONS /cors-test"""
-        response = client.options("/cors-test")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["message"] == "OPTIONS request successful"
+        assert_json(await aclient.options("/cors-test"), message="OPTIONS request successful")
     
-    def test_utf8_test_endpoint(self):
+    async def test_utf8_test_endpoint(self, aclient):
         """Test GET /test/utf8"""
-        response = client.get("/test/utf8")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["test"] == "UTF-8"
-        assert "español" in data
-        assert "symbols" in data
+        data = assert_json(await aclient.get("/test/utf8"), test="UTF-8")
+        assert {"español", "symbols"} <= data.keys()
     
-    def test_railway_debug_endpoint(self):
+    async def test_railway_debug_endpoint(self, aclient):
         """Test GET /debug/railway"""
-        response = client.get("/debug/railway")
+        response = await aclient.get("/debug/railway")
         assert response.status_code == 200
         data = response.json()
-        assert "platform" in data
-        assert "python_version" in data
-        assert "environment" in data
+        assert {"platform", "python_version", "environment"} <= data.keys()
     
-    def test_health_check_endpoint(self):
+    async def test_health_check_endpoint(self, aclient):
         """Test GET /health"""
-        response = client.get("/health")
-        assert response.status_code == 200
-        data = response.json()
-        assert data["status"] == "healthy"
-        assert "timestamp" in data
-        assert "checks" in data
+        data = assert_json(await aclient.get("/health"), status="healthy")
+        assert {"timestamp", "checks"} <= data.keys()
         assert data["checks"]["api"] == "ok"
 
 
@@ -172,99 +486,94 @@ class TestGeneralRoutes:
 class TestMonitoringRoutes:
     """Tests para rutas de monitoreo"""
     
-    def test_metrics_endpoint(self):
+    async def test_metrics_endpoint(self, aclient):
         """Test GET /metrics"""
-        response = client.get("/metrics")
-        assert response.status_code == 200
-        # Verificar que retorna contenido de tipo Prometheus
-        assert "text/plain" in response.headers.get("content-type", "")
+        # Solo se leen status y headers; el cuerpo de métricas no se descarga
+        async with aclient.stream("GET", "/metrics") as response:
+            assert response.status_code == 200
+            # Verificar que retorna contenido de tipo Prometheus
+            assert "text/plain" in response.headers.get("content-type", "")
 
 
 # ==================== TESTS: FIREBASE ROUTES ====================#
 class TestFirebaseRoutes:
     """Tests para rutas de Firebase"""
     
-    def test_firebase_status(self, mock_firebase_db):
+    async def test_firebase_status(self, mock_firebase_db, aclient):
         """Test GET /firebase/status"""
         # Mock de colecciones
         mock_firebase_db.collections.return_value = [
-            Mock(id='collection1'),
-            Mock(id='collection2')
+            SimpleNamespace(id='collection1'),
+            SimpleNamespace(id='collection2')
         ]
         
-        response = client.get("/firebase/status")
+        response = await aclient.get("/firebase/status")
         assert response.status_code == 200
         data = response.json()
-        assert data["status"] == "connected"
-        assert data["firestore"] == "available"
-        assert data["project_id"] == "dagma-85aad"
+        assert {
+            "status": "connected",
+            "firestore": "available",
+            "project_id": "dagma-85aad"
+        }.items() <= data.items()
     
-    def test_firebase_collections(self, mock_firebase_db):
+    async def test_firebase_collections(self, mock_firebase_db, aclient):
         """Test GET /firebase/collections"""
         # Mock de colecciones
-        mock_col = Mock()
-        mock_col.id = 'test_collection'
-        mock_col.stream.return_value = [Mock(), Mock()]
+        mock_col = SimpleNamespace(id='test_collection', stream=lambda: [_snapshot(), _snapshot()])
         mock_firebase_db.collections.return_value = [mock_col]
         
-        response = client.get("/firebase/collections")
+        response = await aclient.get("/firebase/collections")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert "collections" in data
     
-    def test_firebase_collections_summary(self, mock_firebase_db):
+    async def test_firebase_collections_summary(self, mock_firebase_db, aclient):
         """Test GET /firebase/collections/summary"""
         # Mock de colecciones
-        mock_col = Mock()
-        mock_col.stream.return_value = [Mock(), Mock(), Mock()]
+        mock_col = SimpleNamespace(id='test_collection', stream=lambda: [_snapshot()] * 3)
         mock_firebase_db.collections.return_value = [mock_col, mock_col]
         
-        response = client.get("/firebase/collections/summary")
+        response = await aclient.get("/firebase/collections/summary")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert "total_collections" in data
-        assert "total_documents" in data
+        assert {"total_collections", "total_documents"} <= data.keys()
 
 
 # ==================== TESTS: ARTEFACTO 360 ROUTES ====================#
 class TestArtefacto360Routes:
     """Tests para rutas de Artefacto 360"""
     
-    def test_init_parques(self, mock_firebase_db):
+    async def test_init_parques(self, mock_firebase_async_db, aclient):
         """Test GET /init/parques"""
-        response = client.get("/init/parques")
+        response = await aclient.get("/init/parques")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert "data" in data
-        assert "count" in data
+        assert {"data", "count"} <= data.keys()
         assert isinstance(data["data"], list)
-    
-    @patch.dict('os.environ', {
-        'AWS_ACCESS_KEY_ID': 'test-key',
-        'AWS_SECRET_ACCESS_KEY': 'test-secret',
-        'S3_BUCKET_NAME': '360-dagma-photos'
-    })
-    def test_post_reconocimiento_success(self, mock_firebase_db, mock_s3_client):
+
+    async def test_init_parques_not_modified(self, mock_firebase_async_db, aclient):
+        """Test GET /init/parques - 304 cuando el ETag no cambió"""
+        response = await aclient.get("/init/parques")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        response = await aclient.get("/init/parques", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    async def test_post_reconocimiento_success(self, mock_firebase_db, mock_s3_client,
+                                               base_form_data, sample_image_file, aclient):
         """Test POST /grupo-operativo/reconocimiento - Éxito"""
         # Preparar datos del formulario
-        form_data = {
-            'tipo_intervencion': 'Mantenimiento',
-            'descripcion_intervencion': 'Poda de árboles',
-            'direccion': 'Calle 5 #10-20',
-            'observaciones': 'Trabajo completado',
-            'coordinates_type': 'Point',
-            'coordinates_data': '[-76.5225, 3.4516]'
-        }
+        form_data = {**base_form_data, 'observaciones': 'Trabajo completado'}
         
         # Crear archivo de imagen falso
-        files = {
-            'photos': ('test_photo.jpg', io.BytesIO(b'fake-image-content'), 'image/jpeg')
-        }
+        files = {'photos': sample_image_file}
         
-        response = client.post(
+        response = await aclient.post(
             "/grupo-operativo/reconocimiento",
             data=form_data,
             files=files
@@ -273,205 +582,572 @@ class TestArtefacto360Routes:
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert "id" in data
-        assert data["message"] == "Reconocimiento registrado exitosamente"
-        assert "coordinates" in data
-        assert "photosUrl" in data
-        assert data["photos_uploaded"] == 1
-    
-    def test_post_reconocimiento_invalid_geometry_type(self):
-        """Test POST /grupo-operativo/reconocimiento - Tipo de geometría inválido"""
-        form_data = {
-            'tipo_intervencion': 'Mantenimiento',
-            'descripcion_intervencion': 'Poda de árboles',
-            'direccion': 'Calle 5 #10-20',
-            'coordinates_type': 'InvalidType',
-            'coordinates_data': '[-76.5225, 3.4516]'
-        }
-        
-        files = {
-            'photos': ('test.jpg', io.BytesIO(b'fake-image'), 'image/jpeg')
-        }
-        
-        response = client.post(
-            "/grupo-operativo/reconocimiento",
-            data=form_data,
-            files=files
-        )
-        
-        assert response.status_code == 400
-        assert "Tipo de geometría inválido" in response.json()["detail"]
-    
-    def test_post_reconocimiento_no_photos(self):
-        """Test POST /grupo-operativo/reconocimiento - Sin fotos"""
-        form_data = {
-            'tipo_intervencion': 'Mantenimiento',
-            'descripcion_intervencion': 'Poda de árboles',
-            'direccion': 'Calle 5 #10-20',
-            'coordinates_type': 'Point',
-            'coordinates_data': '[-76.5225, 3.4516]'
-        }
-        
-        response = client.post(
-            "/grupo-operativo/reconocimiento",
-            data=form_data
-        )
-        
-        assert response.status_code == 422  # FastAPI validation error
+        assert {
+            "message": "Reconocimiento registrado exitosamente",
+            "photos_uploaded": 1
+        }.items() <= data.items()
+        assert {"id", "coordinates", "photosUrl"} <= data.keys()
     
-    def test_post_reconocimiento_invalid_coordinates_format(self):
-        """Test POST /grupo-operativo/reconocimiento - Formato de coordenadas inválido"""
-        form_data = {
-            'tipo_intervencion': 'Mantenimiento',
-            'descripcion_intervencion': 'Poda de árboles',
-            'direccion': 'Calle 5 #10-20',
-            'coordinates_type': 'Point',
-            'coordinates_data': 'invalid-json'
-        }
+    async def test_post_reconocimiento_upload_failure_cleans_up(self, mock_firebase_db, mock_s3_client,
+                                                               base_form_data, sample_photo_bytes, aclient):
+        """Si falla la subida de una foto se eliminan de S3 las que sí se subieron"""
+        subidas = []
+
+        def upload_fileobj(fileobj, bucket, key, **kwargs):
+            if key.endswith('foto_b.jpg'):
+                raise S3UploadFailedError("Failed to upload: connection reset")
+            subidas.append(key)
+
+        mock_s3_client.upload_fileobj.side_effect = upload_fileobj
+        files = [
+            ('photos', ('foto_a.jpg', sample_photo_bytes, 'image/jpeg')),
+            ('photos', ('foto_b.jpg', sample_photo_bytes, 'image/jpeg'))
+        ]
+
+        response = await aclient.post("/grupo-operativo/reconocimiento", data=dict(base_form_data), files=files)
+        assert response.status_code == 500
+        assert "Error subiendo foto 'foto_b.jpg' a S3" in response.json()["detail"]
+        # La foto subida se elimina y el reconocimiento no se guarda
+        eliminadas = mock_s3_client.delete_objects.call_args[1]['Delete']['Objects']
+        assert eliminadas == [{'Key': key} for key in subidas]
+        mock_firebase_db.collection.return_value.document.return_value.set.assert_not_called()
+
+    @pytest.mark.parametrize("fallos, rollback", [
+        (1, False),  # el reintento desde la cola guarda el reconocimiento
+        (2, True),   # sin más reintentos: se eliminan las fotos de S3
+    ], ids=["retry_succeeds", "retries_exhausted"])
+    async def test_persist_reconocimiento_retry_queue(self, mocker, mock_s3_client, fallos, rollback):
+        """Escritura en Firebase en segundo plano: reintento desde la cola y rollback"""
+        mocker.patch('app.routes.artefacto_360_routes._FIRESTORE_RETRY_DELAYS', (0,))
+        # Cola propia del test (la de la app queda ligada al event loop de su worker)
+        retry_queue = mocker.patch('app.routes.artefacto_360_routes._firestore_retry_queue', new=asyncio.Queue())
+        db = Mock()
+        doc_ref = db.collection.return_value.document.return_value
+        doc_ref.set.side_effect = [RuntimeError("Firestore no disponible")] * fallos + [None]
+        keys = ['reconocimientos/rec-1/foto.jpg']
+
+        await _persist_reconocimiento(db, mock_s3_client, 'bucket', 'rec-1', {'id': 'rec-1'}, keys)
+        # El primer intento falló: el reintento se encola (y lo procesa el worker)
+        mock_s3_client.delete_objects.assert_not_called()
+        retry = await asyncio.wait_for(retry_queue.get(), timeout=1)
+        retry_queue.task_done()
+        await retry()
+
+        assert doc_ref.set.call_count == 2
+        assert retry_queue.empty()
+        if rollback:
+            mock_s3_client.delete_objects.assert_called_once_with(
+                Bucket='bucket', Delete={'Objects': [{'Key': keys[0]}], 'Quiet': True}
+            )
+        else:
+            mock_s3_client.delete_objects.assert_not_called()
+
+    @pytest.mark.parametrize("cambios, archivo, status_code, detalle", [
+        ({'coordinates_type': 'InvalidType'}, ('test.jpg', 'image/jpeg'),
+         400, "Tipo de geometría inválido"),
+        ({}, None, 422, None),  # FastAPI validation error
+        ({'coordinates_data': 'invalid-json'}, ('test.jpg', 'image/jpeg'),
+         400, "Formato de coordenadas inválido"),
+        ({}, ('test.txt', 'text/plain'),
+         400, "Tipo de archivo no permitido"),
+    ], ids=["invalid_geometry_type", "no_photos", "invalid_coordinates_format", "invalid_file_type"])
+    async def test_post_reconocimiento_errors(self, cambios, archivo, status_code, detalle,
+                                              base_form_data, photo_bio, aclient):
+        """Test POST /grupo-operativo/reconocimiento - Errores de validación"""
+        form_data = {**base_form_data, **cambios}
         
-        files = {
-            'photos': ('test.jpg', io.BytesIO(b'fake-image'), 'image/jpeg')
-        }
+        files = None
+        if archivo:
+            nombre, content_type = archivo
+            files = {'photos': (nombre, photo_bio, content_type)}
         
-        response = client.post(
+        response = await aclient.post(
             "/grupo-operativo/reconocimiento",
             data=form_data,
             files=files
         )
         
-        assert response.status_code == 400
-        assert "Formato de coordenadas inválido" in response.json()["detail"]
+        assert response.status_code == status_code
+        if detalle:
+            assert detalle in response.json()["detail"]
     
-    def test_post_reconocimiento_invalid_file_type(self):
-        """Test POST /grupo-operativo/reconocimiento - Tipo de archivo inválido"""
-        form_data = {
-            'tipo_intervencion': 'Mantenimiento',
-            'descripcion_intervencion': 'Poda de árboles',
-            'direccion': 'Calle 5 #10-20',
-            'coordinates_type': 'Point',
-            'coordinates_data': '[-76.5225, 3.4516]'
+    async def test_init_reconocimiento_presigned(self, mock_s3_client, aclient):
+        """Test POST /grupo-operativo/reconocimiento/init"""
+        mock_s3_client.generate_presigned_post.return_value = {
+            'url': 'https://360-dagma-photos.s3.amazonaws.com/',
+            'fields': {'key': 'reconocimientos/x/foto.jpg'}
         }
-        
-        files = {
-            'photos': ('test.txt', io.BytesIO(b'not-an-image'), 'text/plain')
-        }
-        
-        response = client.post(
-            "/grupo-operativo/reconocimiento",
-            data=form_data,
-            files=files
+
+        response = await aclient.post(
+            "/grupo-operativo/reconocimiento/init",
+            content=_PRESIGNED_INIT_BODY,
+            headers=_JSON_HEADERS
         )
-        
-        assert response.status_code == 400
-        assert "Tipo de archivo no permitido" in response.json()["detail"]
-    
-    def test_get_reportes(self, mock_firebase_db):
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert len(data["uploads"]) == 1
+        assert data["uploads"][0]["s3_key"].startswith(f"reconocimientos/{data['reconocimiento_id']}/")
+        assert data["uploads"][0]["url"] == 'https://360-dagma-photos.s3.amazonaws.com/'
+
+    async def test_commit_reconocimiento_presigned(self, mock_firebase_db, mock_s3_client, aclient):
+        """Test POST /grupo-operativo/reconocimiento/commit"""
+        reconocimiento_id = "0b6f4c9e-1f2a-4d3b-9c8d-7e6f5a4b3c2d"
+        s3_key = f"reconocimientos/{reconocimiento_id}/20240115_100000_0_foto.jpg"
+
+        response = await aclient.post(
+            "/grupo-operativo/reconocimiento/commit",
+            json={
+                "reconocimiento_id": reconocimiento_id,
+                "s3_keys": [s3_key],
+                "tipo_intervencion": "Mantenimiento",
+                "descripcion_intervencion": "Poda de árboles",
+                "direccion": "Calle 5 #10-20",
+                "nombre_parque": "Parque del Ingenio",
+                "coordinates_type": "Point",
+                "coordinates_data": _POINT_COORDS_STR
+            }
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert {"id": reconocimiento_id, "photos_uploaded": 1}.items() <= data.items()
+        mock_s3_client.head_object.assert_called_once_with(Bucket='360-dagma-photos', Key=s3_key)
+
+    async def test_get_reportes(self, mock_firebase_db, aclient):
         """Test GET /grupo-operativo/reportes"""
-        response = client.get("/grupo-operativo/reportes")
+        mock_doc = _snapshot('reporte-1', {'created_at_ts': datetime(2024, 1, 15, 10, tzinfo=timezone.utc)})
+        query = mock_firebase_db.collection.return_value.order_by.return_value.order_by.return_value
+        query.limit.return_value.stream.return_value = [mock_doc]
+
+        response = await aclient.get("/grupo-operativo/reportes")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert "data" in data
-        assert "count" in data
+        assert {"data", "count"} <= data.keys()
         assert isinstance(data["data"], list)
-    
-    def test_delete_reporte(self):
+        # Sin 'page' se usa la paginación por cursor desde el inicio
+        assert data["count"] == 1
+        assert data["pagination"]["next_cursor"] is None
+        query.start_after.assert_not_called()
+        query.stream.assert_not_called()
+
+    async def test_get_reportes_cursor(self, mock_firebase_db, aclient):
+        """Test GET /grupo-operativo/reportes con paginación por cursor"""
+        created_at_ts = datetime(2024, 1, 15, 10, tzinfo=timezone.utc)
+        mock_doc = _snapshot('reporte-1', {'created_at_ts': created_at_ts})
+        query = mock_firebase_db.collection.return_value.order_by.return_value.order_by.return_value
+        query.start_after.return_value.limit.return_value.stream.return_value = [mock_doc]
+        cursor_ts = datetime(2024, 1, 16, 10, tzinfo=timezone.utc)
+
+        response = await aclient.get(
+            "/grupo-operativo/reportes",
+            params={"cursor": _encode_cursor(cursor_ts, 'reporte-0'), "limit": 1}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["count"] == 1
+        assert data["data"][0]["id"] == 'reporte-1'
+        assert data["pagination"]["next_cursor"] == _encode_cursor(created_at_ts, 'reporte-1')
+        # El id del último reporte desempata los reportes con el mismo created_at_ts
+        query.start_after.assert_called_once_with({'created_at_ts': cursor_ts, '__name__': 'reporte-0'})
+
+    async def test_get_reportes_invalid_cursor(self, mock_firebase_db, aclient):
+        """Test GET /grupo-operativo/reportes con cursor inválido"""
+        response = await aclient.get("/grupo-operativo/reportes", params={"cursor": "no-es-un-cursor"})
+        assert response.status_code == 400
+
+    async def test_delete_reporte(self, mock_firebase_db, mock_s3_client, aclient):
         """Test DELETE /grupo-operativo/eliminar-reporte"""
-        response = client.delete(
+        mock_firebase_db.collection.return_value.document.return_value.collections.return_value = []
+        
+        response = await aclient.delete(
             "/grupo-operativo/eliminar-reporte",
             params={"reporte_id": "test-reporte-id"}
         )
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert data["id"] == "test-reporte-id"
+        assert {"id": "test-reporte-id", "photos_deleted": 1}.items() <= data.items()
         assert "message" in data
-        assert "photos_deleted" in data
+        mock_s3_client.delete_objects.assert_called_once()
+        mock_firebase_db.bulk_writer.return_value.close.assert_called_once()
+
+    async def test_delete_reporte_not_found(self, mock_firebase_db, mock_s3_client, aclient):
+        """Test DELETE /grupo-operativo/eliminar-reporte con un reporte inexistente"""
+        mock_firebase_db.collection.return_value.document.return_value.get.return_value = _snapshot(exists=False)
+
+        response = await aclient.delete(
+            "/grupo-operativo/eliminar-reporte",
+            params={"reporte_id": "reporte-inexistente"}
+        )
+        assert response.status_code == 404
+        # No se elimina nada si el reporte no existe
+        mock_s3_client.list_objects_v2.assert_not_called()
+        mock_s3_client.delete_objects.assert_not_called()
+        mock_firebase_db.bulk_writer.assert_not_called()
+
+
+# ==================== TESTS: SEGUIMIENTO ROUTES ====================#
+class TestSeguimientoRoutes:
+    """Tests para rutas del Sistema de Seguimiento de Reportes"""
+
+    async def test_get_historial_reporte_not_modified(self, mocker, aclient):
+        """Test GET /api/v1/reportes/{reporteId}/historial con If-None-Match"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        seguimiento_doc = _snapshot('rep-1', {'updated_at': datetime(2024, 1, 15, tzinfo=timezone.utc)})
+        mock_db.collection.return_value.document.return_value.get.return_value = seguimiento_doc
+        etag = f'W/"{datetime(2024, 1, 15, tzinfo=timezone.utc).timestamp()}"'
+
+        response = await aclient.get("/api/v1/reportes/rep-1/historial", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b''
+        # Solo se leyó el seguimiento (sin consultar historial)
+        mock_db.collection.return_value.where.assert_not_called()
+
+    async def test_get_reportes_seguimiento_bulk(self, mocker, aclient):
+        """Test GET /api/v1/reportes/seguimiento con lecturas en lote"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        seguimiento_docs = []
+        for i, reporte_id in enumerate(('rep-1', 'rep-2', 'rep-3')):
+            seguimiento_docs.append(_snapshot(reporte_id, {
+                'estado': 'en-gestion', 'prioridad': 'alta', 'created_at': datetime(2024, 1, 10 + i)
+            }))
+
+        reconocimiento = _snapshot('rep-1', {'nombre_parque': 'Parque del Ingenio'})
+        hist_doc = _snapshot('hist-1', {'reporte_id': 'rep-1', 'estado': 'en-gestion'})
+
+        collections = {
+            'reportes_seguimiento': Mock(),
+            'reconocimientos': Mock(),
+            'historial_avance_reportes': Mock(),
+            'evidencias_avance_reportes': Mock(),
+        }
+        page_query = collections['reportes_seguimiento'].select.return_value.order_by.return_value.order_by.return_value
+        page_query.limit.return_value.stream.return_value = seguimiento_docs
+        page_query.start_after.return_value = page_query
+        collections['historial_avance_reportes'].where.return_value.order_by.return_value.stream.return_value = [hist_doc]
+        collections['evidencias_avance_reportes'].where.return_value.stream.return_value = []
+        mock_db.collection.side_effect = lambda name: collections[name]
+        # 'rep-2' no tiene reconocimiento asociado y se omite
+        mock_db.get_all.return_value = [reconocimiento]
+
+        response = await aclient.get("/api/v1/reportes/seguimiento?limit=2&expand=historial")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["data"]) == 1
+        assert data["pagination"]["has_more"] is True
+        assert data["data"][0]["id"] == 'rep-1'
+        assert data["data"][0]["prioridad"] == 'alta'
+        assert [h['id'] for h in data["data"][0]["historial"]] == ['hist-1']
+        mock_db.get_all.assert_called_once()
+        collections['historial_avance_reportes'].where.assert_called_once_with('reporte_id', 'in', ['rep-1'])
+        page_query.limit.assert_called_once_with(3)
+        collections['reportes_seguimiento'].select.assert_called_once_with(
+            ['estado', 'prioridad', 'porcentaje_avance', 'encargado', 'centro_gestor', 'created_at']
+        )
+
+        # El cursor apunta al último documento de la página (rep-2)
+        response = await aclient.get(
+            "/api/v1/reportes/seguimiento",
+            params={"limit": 2, "cursor": data["pagination"]["next_cursor"]}
+        )
+        assert response.status_code == 200
+        page_query.start_after.assert_called_once_with(
+            {'created_at': datetime(2024, 1, 11), '__name__': 'rep-2'}
+        )
+        # Sin expand=historial no se consulta el historial
+        assert 'historial' not in response.json()["data"][0]
+        collections['historial_avance_reportes'].where.assert_called_once()
+
+    async def test_get_estadisticas_aggregations(self, mocker, aclient):
+        """Test GET /api/v1/reportes/seguimiento/estadisticas con agregaciones"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        def agregacion(valor):
+            agg = Mock()
+            agg.get.return_value = [[Mock(value=valor)]]
+            return agg
+
+        conteos = {('estado', 'en-gestion'): 2, ('estado', 'resuelto'): 1, ('prioridad', 'alta'): 3}
+
+        def where(campo, op, valor):
+            filtrada = Mock()
+            filtrada.count.return_value = agregacion(conteos.get((campo, valor), 0))
+            return filtrada
+
+        seguimientos = Mock()
+        historial = Mock()
+        historial.where.return_value.order_by.return_value.select.return_value.stream.return_value = []
+        stats = Mock()
+        stats.document.return_value.get.return_value = _snapshot(exists=False)
+        collections = {'reportes_seguimiento': seguimientos, 'historial_avance_reportes': historial,
+                       'estadisticas_seguimiento': stats}
+        mock_db.collection.side_effect = lambda name: collections[name]
+        seguimientos.count.return_value = agregacion(4)
+        seguimientos.sum.return_value = agregacion(150)
+        seguimientos.where.side_effect = where
+        centro_doc = _snapshot('rep-1', {'centro_gestor': 'DAGMA', 'estado': 'resuelto'})
+        seguimientos.select.return_value.stream.return_value = [centro_doc]
+        transaction = _transaccion(mock_db)
+
+        response = await aclient.get("/api/v1/reportes/seguimiento/estadisticas")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert {"total_reportes": 4, "avance_promedio": 37}.items() <= data.items()
+        # El reporte sin estado cuenta como 'notificado'
+        assert data["por_estado"]["notificado"] == 1
+        assert data["por_estado"]["en-gestion"] == 2
+        assert {
+            "por_prioridad": {'baja': 0, 'media': 1, 'alta': 3, 'urgente': 0},
+            "por_centro_gestor": [{'nombre': 'DAGMA', 'total': 1, 'resueltos': 1, 'en_proceso': 0}]
+        }.items() <= data.items()
+        seguimientos.stream.assert_not_called()
+        # Los contadores calculados se guardan en una transacción para las siguientes lecturas
+        # (la primera escritura de la transacción; luego se inicializa la tendencia)
+        contadores = transaction.set.call_args_list[0][0][1]
+        assert contadores['inicializado'] is True
+        assert contadores['total_reportes'] == 4
+        stats.document.return_value.set.assert_not_called()
+
+    async def test_get_estadisticas_counters_changed_during_init(self, mocker):
+        """Los contadores no se guardan si cambian mientras se calculan"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        mocker.patch('app.routes.seguimiento_routes._calcular_estadisticas', return_value={
+            'total_reportes': 1, 'suma_porcentajes': 25,
+            'por_estado': {'radicado': 1}, 'por_prioridad': {'media': 1}, 'por_centro_gestor': {}
+        })
+        # Un avance concurrente creó el documento con incrementos (sin 'inicializado')
+        modificado = SimpleNamespace(id='global', exists=True, update_time='t1', to_dict=lambda: {'total_reportes': 1})
+        mock_db.collection.return_value.document.return_value.get.return_value = modificado
+        transaction = _transaccion(mock_db)
+
+        estadisticas = await _inicializar_estadisticas(_snapshot(exists=False))
+        assert estadisticas['total_reportes'] == 1
+        # Primer intento descartado; el segundo parte del documento ya modificado
+        assert transaction.set.call_count == 1
+        assert transaction._commit.call_count == 2
+
+    async def test_get_estadisticas_from_counters(self, mocker, aclient):
+        """Test GET /api/v1/reportes/seguimiento/estadisticas desde el documento de contadores"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        stats_doc = _snapshot('global', {
+            'inicializado': True,
+            'total_reportes': 2,
+            'suma_porcentajes': 90,
+            'por_estado': {'en-gestion': 2},
+            'por_prioridad': {'alta': 2},
+            'por_centro_gestor': {'DAGMA': {'total': 2, 'resueltos': 0, 'en_proceso': 2}}
+        })
+        stats = Mock()
+        stats.document.return_value.get.return_value = stats_doc
+        historial = Mock()
+        historial.where.return_value.order_by.return_value.select.return_value.stream.return_value = []
+        mock_db.collection.side_effect = lambda name: stats if name == 'estadisticas_seguimiento' else historial
+
+        response = await aclient.get("/api/v1/reportes/seguimiento/estadisticas")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert {"total_reportes": 2, "avance_promedio": 45}.items() <= data.items()
+        assert data["por_estado"]["en-gestion"] == 2
+        assert data["por_estado"]["cerrado"] == 0
+        assert data["por_centro_gestor"] == [{'nombre': 'DAGMA', 'total': 2, 'resueltos': 0, 'en_proceso': 2}]
+
+    async def test_obtener_tendencia_from_daily_counters(self, mocker):
+        """Test de la tendencia diaria leída desde los contadores por día"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        hoy = datetime.now(timezone.utc).date().isoformat()
+
+        mock_db.get_all.return_value = [
+            _snapshot('tendencia', {'inicializado': True, 'version': 2}),
+            _snapshot(hoy, {'fecha': hoy, 'avances': 3, 'nuevos': 1, 'resueltos': 2})
+        ]
+
+        tendencia = await obtener_tendencia()
+        assert tendencia == [{'fecha': hoy, 'nuevos': 1, 'resueltos': 2, 'en_proceso': 0}]
+        # 1 documento de control + 31 días en una sola lectura batch
+        assert len(mock_db.get_all.call_args[0][0]) == 32
+        mock_db.transaction.assert_not_called()
+
+    async def test_obtener_tendencia_seeds_in_transaction(self, mocker):
+        """La primera lectura calcula la tendencia y la guarda en una transacción"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        hoy = datetime.now(timezone.utc).date().isoformat()
+        mock_db.get_all.return_value = []
+        mocker.patch('app.routes.seguimiento_routes._calcular_tendencia', return_value={
+            hoy: {'fecha': hoy, 'avances': 2, 'nuevos': 1, 'resueltos': 0, 'en_proceso': 2}
+        })
+        transaction = _transaccion(mock_db)
+        transaction.get_all.return_value = []
+
+        tendencia = await obtener_tendencia()
+        assert tendencia == [{'fecha': hoy, 'nuevos': 1, 'resueltos': 0, 'en_proceso': 2}]
+        # Contador del día + documento de control, sin merge (reemplazan lo leído en la transacción)
+        assert transaction.set.call_count == 2
+        assert transaction.set.call_args[0][1]['version'] == 2
+        transaction._commit.assert_called_once()
+
+    def test_validar_transicion_estado(self):
+        """Test de la tabla de transiciones de estado"""
+        assert validar_transicion_estado('notificado', 'radicado') is True
+        assert validar_transicion_estado('en-proceso', 'resuelto') is True
+        assert validar_transicion_estado('notificado', 'resuelto') is False
+        assert validar_transicion_estado('cerrado', 'notificado') is False
+        assert validar_transicion_estado('desconocido', 'cerrado') is False
+
+    def test_registrar_cambio_estadisticas(self):
+        """Test de los incrementos de contadores para un cambio de estado"""
+        antes = _datos_seguimiento({'estado': 'en-gestion', 'porcentaje_avance': 40, 'centro_gestor': 'DAGMA'})
+        despues = {**antes, 'estado': 'resuelto', 'porcentaje_avance': 95}
+        batch = Mock()
+        with patch('app.routes.seguimiento_routes.db'):
+            registrar_cambio_estadisticas(batch, antes, despues)
+
+        cambios = batch.set.call_args[0][1]
+        assert set(cambios) == {'suma_porcentajes', 'por_estado', 'por_centro_gestor'}
+        assert cambios['suma_porcentajes'].value == 55
+        assert cambios['por_estado']['en-gestion'].value == -1
+        assert cambios['por_estado']['resuelto'].value == 1
+        assert cambios['por_centro_gestor']['DAGMA']['resueltos'].value == 1
+        assert cambios['por_centro_gestor']['DAGMA']['en_proceso'].value == -1
+        assert batch.set.call_args[1] == {'merge': True}
+
+    async def test_registrar_avance_single_transaction(self, mocker, aclient):
+        """Test POST /api/v1/reportes/{reporteId}/avance en una sola transacción"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        collections = {name: Mock() for name in (
+            'reconocimientos', 'reportes_seguimiento', 'historial_avance_reportes',
+            'evidencias_avance_reportes', 'estadisticas_seguimiento'
+        )}
+        reporte_doc = _snapshot('rep-1', {'nombre_parque': 'Parque del Ingenio'})
+        collections['reconocimientos'].document.return_value.get.return_value = reporte_doc
+        collections['reportes_seguimiento'].document.return_value.get.return_value = _snapshot(exists=False)
+        collections['historial_avance_reportes'].where.return_value.order_by.return_value.stream.return_value = []
+        mock_db.collection.side_effect = lambda name: collections[name]
+        transaction = _transaccion(mock_db)
+
+        response = await aclient.post(
+            "/api/v1/reportes/rep-1/avance",
+            content=_AVANCE_RADICADO_BODY,
+            headers=_JSON_HEADERS
+        )
+        assert response.status_code == 200
+        reporte = response.json()["data"]["reporte_actualizado"]
+        assert reporte["estado"] == 'radicado'
+        assert reporte["historial"][0]["evidencias"] == [
+            {'tipo': 'foto', 'url': 'https://s3/evidencia.jpg', 'descripcion': None}
+        ]
+
+        transaction._commit.assert_called_once()
+        mock_db.batch.assert_not_called()
+        # historial + evidencia + seguimiento + contadores globales + contador diario
+        assert transaction.set.call_count == 5
+        # El seguimiento se lee dentro de la transacción
+        collections['reportes_seguimiento'].document.return_value.get.assert_called_once_with(transaction=transaction)
+        for name in ('historial_avance_reportes', 'evidencias_avance_reportes', 'reportes_seguimiento'):
+            collections[name].document.return_value.set.assert_not_called()
+
+    async def test_get_reportes_seguimiento_invalid_cursor(self, aclient):
+        """Test GET /api/v1/reportes/seguimiento con cursor inválido"""
+        response = await aclient.get("/api/v1/reportes/seguimiento?cursor=no-es-un-cursor")
+        assert response.status_code == 400
+
+    async def test_get_historial_reporte_batches_evidencias(self, mocker, aclient):
+        """Test GET /api/v1/reportes/{reporteId}/historial con evidencias en lote"""
+        mock_db = mocker.patch('app.routes.seguimiento_routes.db', spec=FirestoreClient)
+        reporte_doc = _snapshot('rep-1', {'nombre_parque': 'Parque del Ingenio'})
+
+        hist_docs = [
+            _snapshot(f'hist-{i}', {'fecha': datetime(2024, 1, 15 - i), 'estado': 'en-gestion'})
+            for i in range(2)
+        ]
+
+        ev_doc = _snapshot('ev-1', {
+            'historial_avance_id': 'hist-1', 'tipo': 'foto', 'url': 'https://s3/foto.jpg', 'descripcion': None
+        })
+
+        collections = {
+            'reconocimientos': Mock(),
+            'reportes_seguimiento': Mock(),
+            'historial_avance_reportes': Mock(),
+            'evidencias_avance_reportes': Mock(),
+        }
+        collections['reconocimientos'].document.return_value.get.return_value = reporte_doc
+        collections['reportes_seguimiento'].document.return_value.get.return_value = _snapshot(exists=False)
+        collections['historial_avance_reportes'].where.return_value.order_by.return_value.stream.return_value = hist_docs
+        collections['evidencias_avance_reportes'].where.return_value.stream.return_value = [ev_doc]
+        mock_db.collection.side_effect = lambda name: collections[name]
+
+        response = await aclient.get("/api/v1/reportes/rep-1/historial")
+        assert response.status_code == 200
+        historial = response.json()["data"]["historial"]
+        assert [h['evidencias'] for h in historial] == [
+            [], [{'tipo': 'foto', 'url': 'https://s3/foto.jpg', 'descripcion': None}]
+        ]
+        # Una sola consulta 'in' para todos los avances
+        collections['evidencias_avance_reportes'].where.assert_called_once_with(
+            'historial_avance_id', 'in', ['hist-0', 'hist-1']
+        )
 
 
 # ==================== TESTS: AUTH ROUTES ====================#
 class TestAuthRoutes:
     """Tests para rutas de autenticación"""
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_validate_session_success(self, mock_auth):
+    async def test_validate_session_success(self, mock_auth, make_mock_user, aclient):
         """Test POST /auth/validate-session - Éxito"""
         # Configurar mock
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-123'
-        mock_user.email = 'test@example.com'
-        mock_user.display_name = 'Test User'
-        mock_user.email_verified = True
-        mock_user.disabled = False
+        mock_user = make_mock_user()
         
         mock_auth.verify_id_token.return_value = {'uid': 'test-uid-123'}
         mock_auth.get_user.return_value = mock_user
         
-        headers = {"Authorization": "Bearer mock-token"}
-        response = client.post("/auth/validate-session", headers=headers)
+        response = await aclient.post("/auth/validate-session", headers=_AUTH_HEADERS)
         assert response.status_code == 200
         data = response.json()
         assert data["valid"] is True
         assert "user" in data
         assert data["user"]["uid"] == "test-uid-123"
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_validate_session_invalid_token(self, mock_auth):
+    async def test_validate_session_invalid_token(self, mock_auth, aclient):
         """Test POST /auth/validate-session - Token inválido"""
-        mock_auth.verify_id_token.side_effect = Exception("Invalid token")
-        headers = {"Authorization": "Bearer invalid-token"}
-        response = client.post("/auth/validate-session", headers=headers)
+        mock_auth.verify_id_token.side_effect = _INVALID_TOKEN_ERR
+        response = await aclient.post("/auth/validate-session", headers=_INVALID_AUTH_HEADERS)
         assert response.status_code == 401
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_login_user_success(self, mock_auth):
+    async def test_login_user_success(self, mock_auth, make_mock_user, aclient):
         """Test POST /auth/login - Éxito"""
         # Configurar mock
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-123'
-        mock_user.email = 'test@example.com'
-        mock_user.display_name = 'Test User'
-        mock_user.email_verified = True
+        mock_user = make_mock_user()
         
         mock_auth.verify_id_token.return_value = {'uid': 'test-uid-123'}
         mock_auth.get_user.return_value = mock_user
         
-        login_data = {
-            "id_token": "mock-valid-token"
-        }
-        response = client.post("/auth/login", json=login_data)
+        response = await aclient.post("/auth/login", content=_LOGIN_BODY, headers=_JSON_HEADERS)
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert "user" in data
         assert data["user"]["email"] == "test@example.com"
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_login_user_invalid_token(self, mock_auth):
+    async def test_login_user_invalid_token(self, mock_auth, aclient):
         """Test POST /auth/login - Token inválido"""
-        mock_auth.verify_id_token.side_effect = Exception("Invalid token")
-        login_data = {
-            "id_token": "invalid-token"
-        }
-        response = client.post("/auth/login", json=login_data)
+        mock_auth.verify_id_token.side_effect = _INVALID_TOKEN_ERR
+        response = await aclient.post("/auth/login", content=_LOGIN_INVALID_BODY, headers=_JSON_HEADERS)
         assert response.status_code == 401
     
-    def test_register_health_check(self):
+    async def test_register_health_check(self, aclient):
         """Test GET /auth/register/health-check"""
-        response = client.get("/auth/register/health-check")
+        response = await aclient.get("/auth/register/health-check")
         assert response.status_code == 200
         data = response.json()
-        assert data["firebase_auth"] == "available"
-        assert data["firestore"] == "available"
+        assert {"firebase_auth": "available", "firestore": "available"}.items() <= data.items()
     
-    @patch('app.routes.auth_routes.db')
-    @patch('app.routes.auth_routes.auth_client')
-    def test_register_user_success(self, mock_auth, mock_db):
+    async def test_register_user_success(self, mock_auth, mock_db, make_mock_user, aclient):
         """Test POST /auth/register - Éxito"""
         # Configurar mock
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-new'
-        mock_user.email = 'newuser@example.com'
+        mock_user = make_mock_user(uid='test-uid-new', email='newuser@example.com')
         
         mock_auth.create_user.return_value = mock_user
         
@@ -481,34 +1157,21 @@ class TestAuthRoutes:
         mock_collection.document.return_value = mock_doc
         mock_db.collection.return_value = mock_collection
         
-        register_data = {
-            "email": "newuser@example.com",
-            "password": "SecurePass123!",
-            "full_name": "New User",
-            "cellphone": "1234567890",
-            "grupo": "Centro Test"
-        }
-        response = client.post("/auth/register", json=register_data)
+        response = await aclient.post("/auth/register", content=_REGISTER_BODY, headers=_JSON_HEADERS)
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert data["message"] == "Usuario registrado exitosamente"
         assert "uid" in data
     
-    def test_register_user_invalid_email(self):
+    async def test_register_user_invalid_email(self, aclient):
         """Test POST /auth/register - Email inválido"""
-        register_data = {
-            "email": "invalid-email",
-            "password": "SecurePass123!",
-            "full_name": "New User",
-            "cellphone": "1234567890",
-            "grupo": "Centro Test"
-        }
-        response = client.post("/auth/register", json=register_data)
+        response = await aclient.post(
+            "/auth/register", content=_REGISTER_INVALID_EMAIL_BODY, headers=_JSON_HEADERS
+        )
         assert response.status_code == 422  # Validation error
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_change_password_success(self, mock_auth):
+    async def test_change_password_success(self, mock_auth, aclient):
         """Test POST /auth/change-password - Éxito"""
         mock_auth.update_user.return_value = None
         
@@ -516,28 +1179,25 @@ class TestAuthRoutes:
             "uid": "test-uid-123",
             "new_password": "NewSecurePass123!"
         }
-        response = client.post("/auth/change-password", data=form_data)
+        response = await aclient.post("/auth/change-password", data=form_data)
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert data["message"] == "Contraseña actualizada exitosamente"
     
-    def test_workload_identity_status(self):
+    async def test_workload_identity_status(self, aclient):
         """Test GET /auth/workload-identity/status"""
-        response = client.get("/auth/workload-identity/status")
+        response = await aclient.get("/auth/workload-identity/status")
         assert response.status_code == 200
         data = response.json()
-        assert data["workload_identity"] == "configured"
-        assert data["status"] == "active"
+        assert {"workload_identity": "configured", "status": "active"}.items() <= data.items()
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_google_auth_success(self, mock_auth):
+    async def test_google_auth_success(self, mock_auth, make_mock_user, aclient):
         """Test POST /auth/google - Éxito"""
         # Configurar mock
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-google'
-        mock_user.email = 'google@example.com'
-        mock_user.display_name = 'Google User'
+        mock_user = make_mock_user(
+            uid='test-uid-google', email='google@example.com', display_name='Google User'
+        )
         
         mock_auth.verify_id_token.return_value = {'uid': 'test-uid-google'}
         mock_auth.get_user.return_value = mock_user
@@ -546,26 +1206,22 @@ class TestAuthRoutes:
         form_data = {
             "google_token": "mock-google-token"
         }
-        response = client.post("/auth/google", data=form_data)
+        response = await aclient.post("/auth/google", data=form_data)
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert "token" in data
-        assert "user" in data
+        assert {"token", "user"} <= data.keys()
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_google_auth_invalid_token(self, mock_auth):
+    async def test_google_auth_invalid_token(self, mock_auth, aclient):
         """Test POST /auth/google - Token inválido"""
-        mock_auth.verify_id_token.side_effect = Exception("Invalid token")
+        mock_auth.verify_id_token.side_effect = _INVALID_TOKEN_ERR
         form_data = {
             "google_token": "invalid-token"
         }
-        response = client.post("/auth/google", data=form_data)
+        response = await aclient.post("/auth/google", data=form_data)
         assert response.status_code == 401
     
-    @patch('app.routes.auth_routes.db')
-    @patch('app.routes.auth_routes.auth_client')
-    def test_delete_user_success(self, mock_auth, mock_db):
+    async def test_delete_user_success(self, mock_auth, mock_db, aclient):
         """Test DELETE /auth/user/{uid} - Éxito"""
         mock_auth.delete_user.return_value = None
         
@@ -575,147 +1231,127 @@ class TestAuthRoutes:
         mock_collection.document.return_value = mock_doc
         mock_db.collection.return_value = mock_collection
         
-        response = client.delete("/auth/user/test-uid-123")
+        response = await aclient.delete("/auth/user/test-uid-123")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert "Usuario" in data["message"]
     
-    def test_list_system_users(self, mock_firebase_db):
+    async def test_list_system_users(self, mock_firebase_db, aclient):
         """Test GET /admin/users"""
-        response = client.get("/admin/users")
+        response = await aclient.get("/admin/users")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
-        assert "data" in data
-        assert "count" in data
+        assert {"data", "count"} <= data.keys()
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_list_users_from_auth(self, mock_auth):
+    async def test_list_users_from_auth(self, mock_auth, make_mock_user, aclient):
         """Test GET /auth/admin/users"""
         # Configurar mock
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-123'
-        mock_user.email = 'test@example.com'
-        mock_user.display_name = 'Test User'
-        mock_user.email_verified = True
-        mock_user.disabled = False
-        mock_user.user_metadata = Mock()
-        mock_user.user_metadata.creation_timestamp = 1609459200000
+        mock_user = make_mock_user()
         
         mock_list = Mock()
         mock_list.iterate_all.return_value = [mock_user]
         mock_auth.list_users.return_value = mock_list
         
-        response = client.get("/auth/admin/users")
+        response = await aclient.get("/auth/admin/users")
         assert response.status_code == 200
         data = response.json()
-        assert "users" in data
-        assert "total" in data
+        assert {"users", "total"} <= data.keys()
         assert isinstance(data["users"], list)
     
-    def test_list_super_admins(self):
+    async def test_list_super_admins(self, aclient):
         """Test GET /auth/admin/users/super-admins"""
-        response = client.get("/auth/admin/users/super-admins")
+        response = await aclient.get("/auth/admin/users/super-admins")
         assert response.status_code == 200
         data = response.json()
-        assert "users" in data
-        assert "total" in data
+        assert {"users", "total"} <= data.keys()
     
-    def test_get_user_details(self):
+    async def test_get_user_details(self, aclient):
         """Test GET /auth/admin/users/{uid}"""
-        response = client.get("/auth/admin/users/test-uid-123")
+        response = await aclient.get("/auth/admin/users/test-uid-123")
         assert response.status_code == 200
         data = response.json()
         assert "uid" in data
     
-    def test_update_user_info(self):
+    async def test_update_user_info(self, aclient):
         """Test PUT /auth/admin/users/{uid}"""
-        response = client.put("/auth/admin/users/test-uid-123")
+        response = await aclient.put("/auth/admin/users/test-uid-123")
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
     
-    def test_assign_roles_to_user(self):
+    async def test_assign_roles_to_user(self, aclient):
         """Test POST /auth/admin/users/{uid}/roles"""
-        role_data = {
-            "roles": ["admin", "editor"]
-        }
-        response = client.post("/auth/admin/users/test-uid-123/roles", json=role_data)
+        response = await aclient.post(
+            "/auth/admin/users/test-uid-123/roles", content=_ROLES_BODY, headers=_JSON_HEADERS
+        )
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
         assert "roles" in data
     
-    def test_grant_temporary_permission(self):
+    async def test_grant_temporary_permission(self, aclient):
         """Test POST /auth/admin/users/{uid}/temporary-permissions"""
-        permission_data = {
-            "permission": "edit:documents",
-            "expires_at": "2026-12-31T23:59:59Z"
-        }
-        response = client.post(
+        response = await aclient.post(
             "/auth/admin/users/test-uid-123/temporary-permissions",
-            json=permission_data
+            content=_PERMISSION_BODY,
+            headers=_JSON_HEADERS
         )
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
     
-    def test_revoke_temporary_permission(self):
+    async def test_revoke_temporary_permission(self, aclient):
         """Test DELETE /auth/admin/users/{uid}/temporary-permissions/{permission}"""
-        response = client.delete(
+        response = await aclient.delete(
             "/auth/admin/users/test-uid-123/temporary-permissions/edit:documents"
         )
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
     
-    def test_list_roles(self):
+    async def test_list_roles(self, aclient):
         """Test GET /auth/admin/roles"""
-        response = client.get("/auth/admin/roles")
+        response = await aclient.get("/auth/admin/roles")
         assert response.status_code == 200
         data = response.json()
         assert "roles" in data
     
-    def test_get_role_details(self):
+    async def test_get_role_details(self, aclient):
         """Test GET /auth/admin/roles/{role_id}"""
-        response = client.get("/auth/admin/roles/admin")
+        response = await aclient.get("/auth/admin/roles/admin")
         assert response.status_code == 200
         data = response.json()
         assert "role_id" in data
     
-    def test_get_audit_logs(self):
+    async def test_get_audit_logs(self, aclient):
         """Test GET /auth/admin/audit-logs"""
-        response = client.get("/auth/admin/audit-logs")
+        response = await aclient.get("/auth/admin/audit-logs")
         assert response.status_code == 200
         data = response.json()
-        assert "logs" in data
-        assert "total" in data
+        assert {"logs", "total"} <= data.keys()
     
-    def test_get_system_stats(self):
+    async def test_get_system_stats(self, aclient):
         """Test GET /auth/admin/system/stats"""
-        response = client.get("/auth/admin/system/stats")
+        response = await aclient.get("/auth/admin/system/stats")
         assert response.status_code == 200
         data = response.json()
-        assert "total_users" in data
-        assert "total_roles" in data
+        assert {"total_users", "total_roles"} <= data.keys()
     
-    @patch('app.routes.auth_routes.auth_client')
-    def test_get_firebase_config_with_valid_token(self, mock_auth):
+    async def test_get_firebase_config_with_valid_token(self, mock_auth, aclient):
         """Test GET /auth/config - Con token válido"""
         mock_auth.verify_id_token.return_value = {'uid': 'test-uid-123'}
         
-        headers = {"Authorization": "Bearer valid-token"}
-        response = client.get("/auth/config", headers=headers)
+        response = await aclient.get("/auth/config", headers=_AUTH_HEADERS)
         assert response.status_code == 200
         data = response.json()
-        assert "apiKey" in data
-        assert "projectId" in data
         assert data["projectId"] == "dagma-85aad"
+        assert "apiKey" in data
     
-    def test_get_firebase_config_without_token(self):
+    async def test_get_firebase_config_without_token(self, aclient):
         """Test GET /auth/config - Sin token"""
-        response = client.get("/auth/config")
+        response = await aclient.get("/auth/config")
         assert response.status_code == 403  # Forbidden without auth
 
 
@@ -725,139 +1361,74 @@ class TestValidations:
     
     def test_validate_point_coordinates_valid(self):
         """Test validación de coordenadas Point - Válidas"""
-        from app.routes.artefacto_360_routes import validate_coordinates
-        coordinates = [-76.5225, 3.4516]
-        assert validate_coordinates(coordinates, "Point") is True
+        assert validate_coordinates(_POINT_COORDS, "Point") is True
     
     def test_validate_point_coordinates_invalid_longitude(self):
         """Test validación de coordenadas Point - Longitud inválida"""
-        from app.routes.artefacto_360_routes import validate_coordinates
-        coordinates = [-200, 3.4516]  # Longitud fuera de rango
         with pytest.raises(ValueError, match="Longitud inválida"):
-            validate_coordinates(coordinates, "Point")
+            validate_coordinates(_INVALID_POINT_LON, "Point")
     
     def test_validate_point_coordinates_invalid_latitude(self):
         """Test validación de coordenadas Point - Latitud inválida"""
-        from app.routes.artefacto_360_routes import validate_coordinates
-        coordinates = [-76.5225, 100]  # Latitud fuera de rango
         with pytest.raises(ValueError, match="Latitud inválida"):
-            validate_coordinates(coordinates, "Point")
+            validate_coordinates(_INVALID_POINT_LAT, "Point")
     
     def test_validate_linestring_coordinates_valid(self):
         """Test validación de coordenadas LineString - Válidas"""
-        from app.routes.artefacto_360_routes import validate_coordinates
-        coordinates = [[-76.5225, 3.4516], [-76.5226, 3.4517]]
-        assert validate_coordinates(coordinates, "LineString") is True
+        assert validate_coordinates(_LINESTRING_COORDS, "LineString") is True
     
     def test_validate_linestring_coordinates_insufficient_points(self):
         """Test validación de coordenadas LineString - Puntos insuficientes"""
-        from app.routes.artefacto_360_routes import validate_coordinates
         coordinates = [[-76.5225, 3.4516]]  # Solo un punto
         with pytest.raises(ValueError, match="debe tener al menos 2 puntos"):
             validate_coordinates(coordinates, "LineString")
-    
+
+    def test_validate_linestring_coordinates_out_of_range(self):
+        """Test validación de coordenadas LineString - Punto fuera de rango"""
+        coordinates = [[-76.5225, 3.4516], [-76.5226, 95.0]]  # Latitud fuera de rango
+        with pytest.raises(ValueError, match="Coordenadas fuera de rango"):
+            validate_coordinates(coordinates, "LineString")
+
     def test_validate_polygon_coordinates_valid(self):
         """Test validación de coordenadas Polygon - Válidas"""
-        from app.routes.artefacto_360_routes import validate_coordinates
-        coordinates = [[
-            [-76.5225, 3.4516],
-            [-76.5226, 3.4517],
-            [-76.5227, 3.4518],
-            [-76.5225, 3.4516]  # Cerrar el polígono
-        ]]
-        assert validate_coordinates(coordinates, "Polygon") is True
+        assert validate_coordinates(_POLYGON_COORDS, "Polygon") is True
 
 
 # ==================== TESTS DE UTILIDADES ====================#
 class TestUtilities:
     """Tests de funciones auxiliares"""
     
-    def test_clean_nan_values_with_nan(self):
-        """Test limpiar valores NaN"""
-        from app.routes.artefacto_360_routes import clean_nan_values
-        import math
-        
-        data = {
-            "valid": 123,
-            "invalid_nan": float('nan'),
-            "invalid_inf": float('inf'),
-            "nested": {
-                "value": float('nan')
-            }
-        }
-        
-        cleaned = clean_nan_values(data)
-        assert cleaned["valid"] == 123
-        assert cleaned["invalid_nan"] is None
-        assert cleaned["invalid_inf"] is None
-        assert cleaned["nested"]["value"] is None
-    
-    def test_clean_nan_values_with_list(self):
-        """Test limpiar valores NaN en listas"""
-        from app.routes.artefacto_360_routes import clean_nan_values
-        import math
-        
-        data = [1, float('nan'), 3, float('inf')]
-        cleaned = clean_nan_values(data)
-        assert cleaned == [1, None, 3, None]
-    
-    def test_validate_photo_file_valid_jpeg(self):
-        """Test validar archivo de foto - JPEG válido"""
-        from app.routes.artefacto_360_routes import validate_photo_file
-        
-        mock_file = Mock()
-        mock_file.content_type = "image/jpeg"
-        mock_file.filename = "test.jpg"
-        
-        assert validate_photo_file(mock_file) is True
-    
-    def test_validate_photo_file_valid_png(self):
-        """Test validar archivo de foto - PNG válido"""
-        from app.routes.artefacto_360_routes import validate_photo_file
-        
-        mock_file = Mock()
-        mock_file.content_type = "image/png"
-        mock_file.filename = "test.png"
-        
-        assert validate_photo_file(mock_file) is True
-    
-    def test_validate_photo_file_invalid_type(self):
-        """Test validar archivo de foto - Tipo inválido"""
-        from app.routes.artefacto_360_routes import validate_photo_file
-        
-        mock_file = Mock()
-        mock_file.content_type = "application/pdf"
-        mock_file.filename = "test.pdf"
-        
-        with pytest.raises(ValueError, match="Tipo de archivo no permitido"):
-            validate_photo_file(mock_file)
-    
-    def test_validate_photo_file_invalid_extension(self):
-        """Test validar archivo de foto - Extensión inválida"""
-        from app.routes.artefacto_360_routes import validate_photo_file
-        
-        mock_file = Mock()
-        mock_file.content_type = "image/jpeg"
-        mock_file.filename = "test.txt"  # Extensión no permitida
-        
-        with pytest.raises(ValueError, match="Extensión no permitida"):
-            validate_photo_file(mock_file)
+    @pytest.mark.parametrize("filename, content_type, size, error", [
+        ("test.jpg", "image/jpeg", None, None),
+        ("test.png", "image/png", None, None),
+        ("test.jpg", "image/jpeg", 30 * 1024 * 1024, "demasiado grande"),
+        ("test.pdf", "application/pdf", None, "Tipo de archivo no permitido"),
+        ("test.txt", "image/jpeg", None, "Extensión no permitida"),
+    ], ids=["valid_jpeg", "valid_png", "too_large", "invalid_type", "invalid_extension"])
+    def test_validate_photo_file(self, filename, content_type, size, error):
+        """Test validar archivo de foto (tipo MIME, extensión y tamaño)"""
+        archivo = _upload(filename, content_type, size=size)
+
+        if error is None:
+            assert validate_photo_file(archivo) is True
+        else:
+            with pytest.raises(ValueError, match=error):
+                validate_photo_file(archivo)
 
 
 # ==================== TESTS DE INTEGRACIÓN ====================#
 class TestIntegration:
     """Tests de integración entre endpoints"""
     
-    @patch('app.routes.auth_routes.db')
-    @patch('app.routes.auth_routes.auth_client')
-    def test_full_user_registration_and_login_flow(self, mock_auth, mock_db):
+    async def test_full_user_registration_and_login_flow(self, mock_auth, mock_db, make_mock_user, aclient):
         """Test flujo completo: Registro + Login"""
         # Configurar mocks
-        mock_user = Mock()
-        mock_user.uid = 'test-uid-integration'
-        mock_user.email = 'integration@example.com'
-        mock_user.display_name = 'Integration Test User'
-        mock_user.email_verified = False
+        mock_user = make_mock_user(
+            uid='test-uid-integration',
+            email='integration@example.com',
+            display_name='Integration Test User',
+            email_verified=False
+        )
         
         mock_auth.create_user.return_value = mock_user
         mock_auth.verify_id_token.return_value = {'uid': 'test-uid-integration'}
@@ -870,45 +1441,31 @@ class TestIntegration:
         mock_db.collection.return_value = mock_collection
         
         # 1. Registrar usuario
-        register_data = {
-            "email": "integration@example.com",
-            "password": "SecurePass123!",
-            "full_name": "Integration Test User",
-            "cellphone": "9876543210",
-            "grupo": "Centro Integration"
-        }
-        register_response = client.post("/auth/register", json=register_data)
+        register_response = await aclient.post(
+            "/auth/register", content=_INTEGRATION_REGISTER_BODY, headers=_JSON_HEADERS
+        )
         assert register_response.status_code == 200
         uid = register_response.json()["uid"]
         
         # 2. Login con el usuario
-        login_data = {
-            "id_token": "mock-token-for-new-user"
-        }
-        login_response = client.post("/auth/login", json=login_data)
+        login_response = await aclient.post(
+            "/auth/login", content=_INTEGRATION_LOGIN_BODY, headers=_JSON_HEADERS
+        )
         assert login_response.status_code == 200
         assert login_response.json()["success"] is True
     
-    @patch.dict('os.environ', {
-        'AWS_ACCESS_KEY_ID': 'test-key',
-        'AWS_SECRET_ACCESS_KEY': 'test-secret',
-        'S3_BUCKET_NAME': '360-dagma-photos'
-    })
-    def test_full_reconocimiento_flow(self, mock_firebase_db, mock_s3_client):
+    async def test_full_reconocimiento_flow(self, mock_firebase_db, mock_s3_client,
+                                            base_form_data, sample_image_file, aclient):
         """Test flujo completo: Crear reconocimiento + Obtener reportes + Eliminar"""
         # 1. Crear reconocimiento
         form_data = {
-            'tipo_intervencion': 'Mantenimiento',
+            **base_form_data,
             'descripcion_intervencion': 'Test integración',
-            'direccion': 'Calle Test',
-            'coordinates_type': 'Point',
-            'coordinates_data': '[-76.5225, 3.4516]'
-        }
-        files = {
-            'photos': ('test.jpg', io.BytesIO(b'fake-image'), 'image/jpeg')
+            'direccion': 'Calle Test'
         }
+        files = {'photos': sample_image_file}
         
-        post_response = client.post(
+        post_response = await aclient.post(
             "/grupo-operativo/reconocimiento",
             data=form_data,
             files=files
@@ -916,16 +1473,43 @@ class TestIntegration:
         assert post_response.status_code == 200
         reporte_id = post_response.json()["id"]
         
-        # 2. Obtener reportes
-        get_response = client.get("/grupo-operativo/reportes")
+        # 2. Obtener reportes (el mock retorna el reconocimiento recién creado)
+        query = mock_firebase_db.collection.return_value.order_by.return_value.order_by.return_value
+        query.limit.return_value.stream.return_value = [
+            _snapshot(reporte_id, {'created_at_ts': datetime(2024, 1, 15, 10, tzinfo=timezone.utc)})
+        ]
+        get_response = await aclient.get("/grupo-operativo/reportes")
         assert get_response.status_code == 200
+        assert [r["id"] for r in get_response.json()["data"]] == [reporte_id]
         
-        # 3. Eliminar reporte
-        delete_response = client.delete(
+        # 3. Eliminar reporte (sin subcolecciones)
+        mock_firebase_db.collection.return_value.document.return_value.collections.return_value = []
+        delete_response = await aclient.delete(
             "/grupo-operativo/eliminar-reporte",
             params={"reporte_id": reporte_id}
         )
-        assert delete_response.status_code == 200
+        assert_json(delete_response, success=True, id=reporte_id)
+
+
+@pytest.mark.emulator
+@pytest.mark.integration
+class TestFirestoreEmulator:
+    """Tests contra el emulador de Firestore (pytest --use-emulator)"""
+
+    async def test_get_reportes_emulator(self, emulator_db, aclient):
+        """Test GET /grupo-operativo/reportes leyendo documentos reales del emulador"""
+        emulator_db.collection('reconocimientos_dagma').document('rep-emulador').set({
+            'tipo_intervencion': 'Mantenimiento',
+            'direccion': 'Calle 5 #10-20',
+            'created_at': '2024-01-15T10:00:00+00:00',
+            'created_at_ts': datetime(2024, 1, 15, 10, tzinfo=timezone.utc)
+        })
+
+        data = assert_json(
+            await aclient.get("/grupo-operativo/reportes", params={"cursor": ""}),
+            success=True, count=1
+        )
+        assert data["data"][0]["id"] == 'rep-emulador'
 
 
 # ==================== CONFIGURACIÓN DE PYTEST ====================#